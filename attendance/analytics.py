@@ -0,0 +1,257 @@
+"""
+Attendance matrix analytics per class.
+
+get_matrix() loads a class's attendance into a students x sessions matrix:
+one scan of its records plus the decoded bitmaps of its archived sessions.
+Percentages, absence streaks, rolling rates, turnout and session correlation
+are then computed on whole arrays with numpy instead of per student, as are
+the end-of-term projections of project_attendance().
+
+The matrix is cached per class. Code that changes a class's records,
+sessions or roster calls invalidate(); the next read rebuilds the entry.
+numpy is imported on first use (like reportlab) so that web and worker
+processes that never compute analytics do not pay for loading it.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from .models import ArchivedSession, AttendanceRecord, AttendanceSession, Classroom
+
+
+def _cache():
+    return caches[settings.ATTENDANCE_ANALYTICS_CACHE]
+
+
+def _key(classroom_id):
+    return f"analytics:classroom:{classroom_id}"
+
+
+class AttendanceMatrix:
+    """
+    Attendance of one class. Rows are the enrolled students by ID, columns
+    the class's sessions by date and start time. present[i, j] is True when
+    student i was marked present in session j; marked[i, j] when they have
+    any mark (present or absent) in it.
+    """
+
+    def __init__(self, classroom_id, student_ids, session_ids, dates, present, marked):
+        self.classroom_id = classroom_id
+        self.student_ids = student_ids
+        self.session_ids = session_ids
+        self.dates = dates
+        self.present = present
+        self.marked = marked
+
+    @classmethod
+    def build(cls, classroom):
+        """
+        Load a class's matrix from the database
+        Args:
+            classroom: Classroom object or ID
+        Returns:
+            AttendanceMatrix
+        """
+        import numpy as np
+
+        classroom_id = getattr(classroom, 'pk', classroom)
+        student_ids = np.fromiter(
+            Classroom.students.through.objects.filter(classroom_id=classroom_id)
+            .order_by('student_id').values_list('student_id', flat=True),
+            dtype=np.int64,
+        )
+        sessions = list(
+            AttendanceSession.objects.filter(classroom_id=classroom_id)
+            .order_by('date', 'startTime', 'sessionId').values_list('sessionId', 'date')
+        )
+        session_ids = np.array([session_id for session_id, _ in sessions], dtype=np.int64)
+        dates = np.array([day for _, day in sessions], dtype='datetime64[D]')
+        matrix = cls(
+            classroom_id, student_ids, session_ids, dates,
+            present=np.zeros((len(student_ids), len(session_ids)), dtype=bool),
+            marked=np.zeros((len(student_ids), len(session_ids)), dtype=bool),
+        )
+
+        records = np.array(
+            AttendanceRecord.objects.filter(session__classroom_id=classroom_id)
+            .values_list('student_id', 'session_id', 'status'),
+            dtype=np.int64,
+        ).reshape(-1, 3)
+        matrix._place(records[:, 0], records[:, 1], records[:, 2].astype(bool))
+
+        archived = ArchivedSession.objects.filter(session__classroom_id=classroom_id).values_list(
+            'session_id', 'roster', 'presentBits', 'rosterSize'
+        )
+        for session_id, roster, bits, size in archived.iterator():
+            matrix._place(
+                np.frombuffer(roster, dtype='<u4').astype(np.int64),
+                np.full(size, session_id, dtype=np.int64),
+                np.unpackbits(np.frombuffer(bits, dtype=np.uint8), count=size, bitorder='little').astype(bool),
+            )
+        return matrix
+
+    def _place(self, student_ids, session_ids, statuses):
+        """Write marks into the matrix; marks of students no longer enrolled are dropped"""
+        import numpy as np
+
+        if not len(self.student_ids) or not len(student_ids):
+            return
+        rows = np.minimum(np.searchsorted(self.student_ids, student_ids), len(self.student_ids) - 1)
+        enrolled = self.student_ids[rows] == student_ids
+        order = np.argsort(self.session_ids)
+        columns = order[np.searchsorted(self.session_ids, session_ids, sorter=order)]
+        rows, columns = rows[enrolled], columns[enrolled]
+        self.present[rows, columns] = statuses[enrolled]
+        self.marked[rows, columns] = True
+
+    @property
+    def held(self):
+        """Number of sessions of the class, the denominator of its percentages"""
+        return len(self.session_ids)
+
+    def present_counts(self):
+        """Sessions each student was present in"""
+        return self.present.sum(axis=1)
+
+    def percentages(self):
+        """Attendance percentage of each student over all sessions of the class, like AttendanceSummary"""
+        import numpy as np
+
+        if not self.held:
+            return np.zeros(len(self.student_ids))
+        return np.round(self.present_counts() * 100.0 / self.held, 2)
+
+    def longest_absence_streaks(self):
+        """
+        Longest run of consecutive sessions each student was marked absent in.
+        Unmarked sessions (not taken yet, or scheduled in the future) end a run.
+        """
+        import numpy as np
+
+        rows, width = len(self.student_ids), self.held + 1
+        streaks = np.zeros(rows, dtype=np.int64)
+        if not rows or not self.held:
+            return streaks
+        # A False column after every row keeps runs from continuing onto the next row
+        absent = np.zeros((rows, width), dtype=np.int8)
+        absent[:, :-1] = self.marked & ~self.present
+        edges = np.diff(np.concatenate(([0], absent.ravel())))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        np.maximum.at(streaks, starts // width, ends - starts)
+        return streaks
+
+    def rolling_rates(self, days=28):
+        """
+        Attendance percentage of each student over the `days` days ending on
+        the date of each session
+        Returns:
+            ndarray: students x sessions percentages
+        """
+        import numpy as np
+
+        low = np.searchsorted(self.dates, self.dates - np.timedelta64(days - 1, 'D'), side='left')
+        high = np.searchsorted(self.dates, self.dates, side='right')
+        running = np.zeros((len(self.student_ids), self.held + 1), dtype=np.int64)
+        np.cumsum(self.present, axis=1, out=running[:, 1:])
+        return (running[:, high] - running[:, low]) * 100.0 / (high - low)
+
+    def recent_rates(self, as_of=None, days=28):
+        """
+        Attendance percentage of each student over the sessions of the `days`
+        days up to and including as_of (default today in the app's timezone)
+        Returns:
+            ndarray: one percentage per student, or None when no session falls in the window
+        """
+        import numpy as np
+
+        as_of = np.datetime64(as_of or timezone.localdate(), 'D')
+        low = np.searchsorted(self.dates, as_of - np.timedelta64(days - 1, 'D'), side='left')
+        high = np.searchsorted(self.dates, as_of, side='right')
+        if high == low:
+            return None
+        return self.present[:, low:high].sum(axis=1) * 100.0 / (high - low)
+
+    def turnout(self):
+        """Percentage of the enrolled students present in each session"""
+        import numpy as np
+
+        if not len(self.student_ids):
+            return np.zeros(self.held)
+        return self.present.sum(axis=0) * 100.0 / len(self.student_ids)
+
+    def session_correlation(self):
+        """
+        Pearson correlation of attendance between every pair of sessions
+        Returns:
+            ndarray: sessions x sessions; NaN for sessions everyone or nobody attended
+        """
+        import numpy as np
+
+        if not len(self.student_ids):
+            return np.full((self.held, self.held), np.nan)
+        values = self.present.astype(np.float64)
+        values -= values.mean(axis=0)
+        covariance = values.T @ values
+        spread = np.sqrt(np.diag(covariance))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return covariance / np.outer(spread, spread)
+
+
+def project_attendance(present, total, remaining, threshold):
+    """
+    Project attendance to the end of term for many students at once. All
+    arguments but threshold are equal-length sequences, one entry per
+    student and class.
+    Args:
+        present: Sessions attended so far
+        total: Sessions of the class, held and still to come
+        remaining: Sessions of the class that have not ended yet
+        threshold: Required attendance percentage
+    Returns:
+        dict of ndarrays: percentage (so far, over the sessions already held),
+            best (percentage when attending every remaining session), needed
+            (further sessions to attend to reach the threshold) and reachable
+    """
+    import numpy as np
+
+    present = np.asarray(present, dtype=np.int64)
+    total = np.asarray(total, dtype=np.int64)
+    remaining = np.asarray(remaining, dtype=np.int64)
+    held = total - remaining
+    with np.errstate(invalid='ignore', divide='ignore'):
+        percentage = np.where(held > 0, present * 100.0 / held, 0.0)
+        best = np.where(total > 0, (present + remaining) * 100.0 / total, 0.0)
+    # Rounded first so that e.g. 75% of 4 sessions needs exactly 3, not 3.0000000001
+    needed = np.maximum(np.ceil(np.round(threshold * total / 100.0 - present, 9)), 0).astype(np.int64)
+    return {
+        'percentage': np.round(percentage, 2),
+        'best': np.round(best, 2),
+        'needed': needed,
+        'reachable': needed <= remaining,
+    }
+
+
+def get_matrix(classroom):
+    """
+    Return the attendance matrix of a class, from the cache when possible
+    Args:
+        classroom: Classroom object or ID
+    Returns:
+        AttendanceMatrix
+    """
+    key = _key(getattr(classroom, 'pk', classroom))
+    matrix = _cache().get(key)
+    if matrix is None:
+        matrix = AttendanceMatrix.build(classroom)
+        _cache().set(key, matrix, settings.ATTENDANCE_ANALYTICS_CACHE_TIMEOUT)
+    return matrix
+
+
+def invalidate(classroom_ids):
+    """Drop the cached matrices of the given classes"""
+    keys = [_key(classroom_id) for classroom_id in set(classroom_ids) if classroom_id is not None]
+    if keys:
+        _cache().delete_many(keys)
+        # Again after commit, in case a read during the transaction cached the old rows
+        transaction.on_commit(lambda: _cache().delete_many(keys))
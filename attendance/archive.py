@@ -0,0 +1,176 @@
+"""
+Packed archive of historical attendance.
+
+compact_sessions() moves the records of closed sessions older than a cutoff
+into one ArchivedSession row per session (a frozen roster plus a presence
+bitmap), which takes a few bytes per student instead of a record row and
+its index entries. restore_sessions() turns them back into records.
+
+Archived sessions are read-only. The read helpers below return archived
+and live attendance in the same shape, so reports, exports and summary
+rebuilds do not need to know where a session is stored.
+"""
+import time
+from django.db import transaction
+from django.db.models import Max, Min, Sum
+from .models import ArchivedSession, AttendanceRecord, AttendanceSession, Student
+
+
+class CompactionResult:
+    def __init__(self):
+        self.batches = 0
+        self.sessions = 0
+        self.records = 0
+        self.seconds = 0.0
+
+
+def archive_of(session):
+    """The ArchivedSession of a session, or None; free when loaded with select_related('archive')"""
+    try:
+        return session.archive
+    except ArchivedSession.DoesNotExist:
+        return None
+
+
+def session_statuses(session_ids):
+    """
+    Decode the archived sessions among session_ids
+    Returns:
+        dict: session ID -> {student_id: status}; live sessions are left out
+    """
+    return {
+        archived.session_id: archived.statuses()
+        for archived in ArchivedSession.objects.filter(session_id__in=list(session_ids))
+    }
+
+
+def session_rows(session):
+    """
+    Attendance of one session, archived or live, in studKey order
+    Args:
+        session: AttendanceSession (select_related('archive') saves a query)
+    Returns:
+        iterable: (studKey, name, status) tuples
+    """
+    archived = archive_of(session)
+    if archived is None:
+        return AttendanceRecord.objects.filter(session=session).order_by('student__studKey').values_list(
+            'student__studKey', 'student__name', 'status'
+        ).iterator()
+    statuses = archived.statuses()
+    # Students deleted since the session was archived drop out here, as their records would have
+    students = Student.objects.filter(pk__in=list(statuses)).order_by('studKey').values_list(
+        'studId', 'studKey', 'name'
+    )
+    return ((stud_key, name, statuses[student_id]) for student_id, stud_key, name in students.iterator())
+
+
+def present_counts(classroom, student_ids=None):
+    """
+    Count archived sessions of a class each student was present in, by
+    walking the set bits of each bitmap
+    Args:
+        classroom: Classroom object or ID
+        student_ids: Only count these students (default all)
+    Returns:
+        dict: student ID -> sessions present (students never present are left out)
+    """
+    wanted = None if student_ids is None else set(student_ids)
+    counts = {}
+    for archived in ArchivedSession.objects.filter(session__classroom=classroom, presentCount__gt=0).only(
+        'roster', 'presentBits'
+    ).iterator():
+        roster = archived.student_ids()
+        for index in archived.present_indexes():
+            student_id = roster[index]
+            if wanted is None or student_id in wanted:
+                counts[student_id] = counts.get(student_id, 0) + 1
+    return counts
+
+
+def marked_count(session):
+    """Number of students marked in a session, archived or live"""
+    archived = ArchivedSession.objects.filter(session=session).values_list('rosterSize', flat=True).first()
+    if archived is not None:
+        return archived
+    return AttendanceRecord.objects.filter(session=session).count()
+
+
+def marked_on(day):
+    """Number of students marked in archived sessions on a day"""
+    return ArchivedSession.objects.filter(session__date=day).aggregate(total=Sum('rosterSize'))['total'] or 0
+
+
+def compact_sessions(before, batch_size=500):
+    """
+    Archive closed sessions dated before a cutoff, one transaction per
+    primary key range of sessions
+    Args:
+        before: Sessions with an earlier date are archived
+        batch_size: Width of each session ID range
+    Returns:
+        CompactionResult
+    """
+    result = CompactionResult()
+    started = time.perf_counter()
+    candidates = AttendanceSession.objects.filter(date__lt=before, is_active=False, archive__isnull=True)
+    bounds = candidates.aggregate(low=Min('sessionId'), high=Max('sessionId'))
+    if bounds['low'] is None:
+        return result
+
+    for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+        with transaction.atomic():
+            session_ids = list(
+                candidates.filter(sessionId__gte=start, sessionId__lt=start + batch_size)
+                .select_for_update(of=('self',)).values_list('sessionId', flat=True)
+            )
+            if not session_ids:
+                continue
+            statuses = {session_id: {} for session_id in session_ids}
+            records = AttendanceRecord.objects.filter(session_id__in=session_ids)
+            for session_id, student_id, status in records.values_list('session_id', 'student_id', 'status').iterator():
+                statuses[session_id][student_id] = status
+
+            ArchivedSession.objects.bulk_create([
+                ArchivedSession.pack(session_id, session_statuses) for session_id, session_statuses in statuses.items()
+            ])
+            result.records += records.delete()[0]
+            result.sessions += len(session_ids)
+        result.batches += 1
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+@transaction.atomic
+def restore_sessions(session_ids):
+    """
+    Turn archived sessions back into records, e.g. to correct old attendance
+    Returns:
+        int: Number of records created
+    """
+    # Imported here because services imports this module
+    from .services import AttendanceService, CounterService
+
+    archived = list(
+        ArchivedSession.objects.select_for_update(of=('self',)).filter(session_id__in=list(session_ids))
+        .select_related('session')
+    )
+    statuses = {entry.session: entry.statuses() for entry in archived}
+    existing = set(
+        Student.objects.filter(pk__in={student_id for marks in statuses.values() for student_id in marks})
+        .values_list('pk', flat=True)
+    )
+    records = []
+    dropped = {}
+    for session, marks in statuses.items():
+        for student_id, status in marks.items():
+            if student_id in existing:
+                records.append(AttendanceRecord(session=session, student_id=student_id, status=status))
+            else:
+                # Deleted while archived: the record would have been deleted with the student
+                name = CounterService.daily('marked', session.date)
+                dropped[name] = dropped.get(name, 0) - 1
+    AttendanceRecord.objects.bulk_create(records, batch_size=AttendanceService.BULK_BATCH_SIZE)
+    CounterService.add_many(dropped)
+    ArchivedSession.objects.filter(session_id__in=[entry.session_id for entry in archived]).delete()
+    return len(records)
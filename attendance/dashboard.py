@@ -0,0 +1,94 @@
+"""
+Per-teacher cache of today's schedule for the teacher dashboard.
+
+The cached value holds every active session of the teacher for the day as
+plain values; sessions that have already ended are dropped at request time,
+so the entry stays valid all day. Signal handlers (see signals.py) delete a
+teacher's entry when one of their classes or today's sessions change; code
+that writes sessions in bulk calls invalidate_classrooms() itself.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import AttendanceSession, Classroom, Teacher
+
+
+def _cache():
+    return caches[settings.ATTENDANCE_DASHBOARD_CACHE]
+
+
+def _key(user_id, day):
+    return f"dashboard:teacher:{user_id}:{day.isoformat()}"
+
+
+def today():
+    return timezone.now().date()
+
+
+def load_schedule(teacher, day):
+    """
+    Read a teacher's active sessions for a day from the database
+    Returns:
+        list: dicts with the session fields the dashboard shows, by start time
+    """
+    return list(
+        AttendanceSession.objects.filter(classroom__teacher=teacher, date=day, is_active=True)
+        .order_by('startTime')
+        .values(
+            'sessionId', 'date', 'startTime', 'endTime',
+            className=F('classroom__className'), subName=F('classroom__subject__subName'),
+        )
+    )
+
+
+def get_schedule(user, day=None):
+    """
+    Return today's sessions of the teacher logged in as `user`, from the cache when possible
+    Args:
+        user: User of the teacher
+        day: Date of the schedule (defaults to today)
+    Returns:
+        list: session dicts (see load_schedule), or None if the user is not a teacher
+    """
+    day = day or today()
+    key = _key(user.pk, day)
+    schedule = _cache().get(key)
+    if schedule is None:
+        teacher = Teacher.objects.filter(user=user).first()
+        if teacher is None:
+            return None
+        schedule = load_schedule(teacher, day)
+        _cache().set(key, schedule, settings.ATTENDANCE_DASHBOARD_CACHE_TIMEOUT)
+    return schedule
+
+
+def open_sessions(schedule, now=None):
+    """Sessions of a cached schedule that have not ended yet"""
+    current_time = (now or timezone.now()).time()
+    return [session for session in schedule if session['endTime'] >= current_time]
+
+
+def _invalidate_users(user_ids):
+    day = today()
+    keys = [_key(user_id, day) for user_id in set(user_ids)]
+    _cache().delete_many(keys)
+    # Again after commit, in case a dashboard read during the transaction cached the old rows
+    transaction.on_commit(lambda: _cache().delete_many(keys))
+
+
+def invalidate_teachers(teacher_ids):
+    """Drop today's cached schedule of the given teachers"""
+    teacher_ids = {teacher_id for teacher_id in teacher_ids if teacher_id is not None}
+    if teacher_ids:
+        _invalidate_users(Teacher.objects.filter(id__in=teacher_ids).values_list('user_id', flat=True))
+
+
+def invalidate_classrooms(classroom_ids):
+    """Drop today's cached schedule of the teachers of the given classes"""
+    classroom_ids = {classroom_id for classroom_id in classroom_ids if classroom_id is not None}
+    if classroom_ids:
+        _invalidate_users(
+            Classroom.objects.filter(classId__in=classroom_ids).values_list('teacher__user_id', flat=True)
+        )
@@ -0,0 +1,160 @@
+"""
+Streaming exports of raw attendance data.
+Rows are read with .iterator() (a server-side cursor on PostgreSQL) and
+serialized chunk by chunk, so memory use does not depend on the export size.
+Archived sessions (see archive.py) are decoded a chunk of sessions at a time
+and exported in the same columns, with an empty record_id.
+"""
+import csv
+import zlib
+from .models import ArchivedSession, AttendanceRecord, Student
+
+EXPORT_CHUNK_SIZE = 5000
+
+# (ORM lookup, CSV column)
+EXPORT_COLUMNS = [
+    ('recordId', 'record_id'),
+    ('session_id', 'session_id'),
+    ('session__date', 'date'),
+    ('session__startTime', 'start_time'),
+    ('session__endTime', 'end_time'),
+    ('session__classroom_id', 'class_id'),
+    ('session__classroom__className', 'class_name'),
+    ('session__classroom__year', 'year'),
+    ('session__classroom__semester', 'semester'),
+    ('session__classroom__subject__subName', 'subject'),
+    ('session__classroom__department__deptName', 'department'),
+    ('student_id', 'student_id'),
+    ('student__studKey', 'stud_key'),
+    ('student__name', 'student_name'),
+    ('status', 'present'),
+]
+
+
+def _filter_sessions(queryset, prefix, date_from, date_to, department_id, classroom_id):
+    if date_from:
+        queryset = queryset.filter(**{f'{prefix}date__gte': date_from})
+    if date_to:
+        queryset = queryset.filter(**{f'{prefix}date__lte': date_to})
+    if department_id:
+        queryset = queryset.filter(**{f'{prefix}classroom__department_id': department_id})
+    if classroom_id:
+        queryset = queryset.filter(**{f'{prefix}classroom_id': classroom_id})
+    return queryset
+
+
+def export_queryset(date_from=None, date_to=None, department_id=None, classroom_id=None):
+    """
+    Build the filtered, flat queryset of live records behind the export
+    Args:
+        date_from: First session date to include
+        date_to: Last session date to include
+        department_id: Only classes of this department
+        classroom_id: Only this class
+    Returns:
+        QuerySet: value tuples in EXPORT_COLUMNS order
+    """
+    records = _filter_sessions(
+        AttendanceRecord.objects.all(), 'session__', date_from, date_to, department_id, classroom_id
+    )
+    return records.order_by('recordId').values_list(*[lookup for lookup, _ in EXPORT_COLUMNS])
+
+
+# EXPORT_COLUMNS of the session part, in order (everything between session_id and student_id)
+SESSION_COLUMNS = [lookup for lookup, _ in EXPORT_COLUMNS[2:11]]
+
+
+def archived_rows(date_from=None, date_to=None, department_id=None, classroom_id=None,
+                  chunk_size=200):
+    """
+    Rows of archived sessions matching the export filters, in EXPORT_COLUMNS order
+    Yields:
+        tuple: one row per archived record
+    """
+    archived = _filter_sessions(
+        ArchivedSession.objects.all(), 'session__', date_from, date_to, department_id, classroom_id
+    ).order_by('session_id')
+    chunk = []
+    for entry in archived.iterator(chunk_size=chunk_size):
+        chunk.append(entry)
+        if len(chunk) == chunk_size:
+            yield from _decode_chunk(chunk)
+            chunk = []
+    if chunk:
+        yield from _decode_chunk(chunk)
+
+
+def _decode_chunk(chunk):
+    """Rows of a chunk of ArchivedSession, with one query for sessions and one for students"""
+    sessions = {
+        row[0]: row[1:]
+        for row in ArchivedSession.objects.filter(pk__in=[entry.pk for entry in chunk]).values_list(
+            'session_id', *SESSION_COLUMNS
+        )
+    }
+    statuses = {entry.session_id: entry.statuses() for entry in chunk}
+    students = {
+        student_id: (stud_key, name)
+        for student_id, stud_key, name in Student.objects.filter(
+            pk__in={student_id for marks in statuses.values() for student_id in marks}
+        ).values_list('studId', 'studKey', 'name')
+    }
+    for session_id, marks in statuses.items():
+        for student_id, status in marks.items():
+            if student_id in students:
+                yield (None, session_id, *sessions[session_id], student_id, *students[student_id], status)
+
+
+def export_rows(**filters):
+    """
+    Everything the export contains: archived sessions first, then live records
+    Args:
+        filters: as for export_queryset()
+    Yields:
+        tuple: rows in EXPORT_COLUMNS order
+    """
+    yield from archived_rows(**filters)
+    yield from export_queryset(**filters).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+class Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Serialize value tuples to CSV text, yielding roughly chunk_size rows at a time
+    Args:
+        rows: QuerySet or iterable of value tuples in EXPORT_COLUMNS order
+    Yields:
+        str: CSV text
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow([column for _, column in EXPORT_COLUMNS])
+    if hasattr(rows, 'iterator'):
+        rows = rows.iterator(chunk_size=chunk_size)
+    buffer = []
+    for row in rows:
+        buffer.append(writer.writerow(row))
+        if len(buffer) >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def gzip_stream(chunks):
+    """
+    Compress a stream of text chunks into a gzip file on the fly
+    Yields:
+        bytes: gzip data
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
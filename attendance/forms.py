@@ -1,5 +1,7 @@
 from django import forms
 from .models import *
+from .scheduling import WEEKDAY_CHOICES
+import datetime
 
 class StudentForm(forms.ModelForm):
     class Meta:
@@ -13,6 +15,28 @@ class StudentForm(forms.ModelForm):
             'department': forms.Select(attrs={'class': 'w-full px-3 py-2 border rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500'}),  # ADD THIS
         }
 
+class StudentImportForm(forms.Form):
+    file = forms.FileField(
+        help_text="CSV or XLSX with columns: studKey, name, email, phone, department",
+        widget=forms.ClearableFileInput(attrs={'accept': '.csv,.xlsx', 'class': 'w-full px-3 py-2 border rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500'}),
+    )
+    update_existing = forms.BooleanField(
+        required=False,
+        label="Update students whose studKey already exists",
+    )
+    classroom = forms.ModelChoiceField(
+        queryset=Classroom.objects.select_related('subject'),
+        required=False,
+        label="Enroll imported students into class",
+        widget=forms.Select(attrs={'class': 'w-full px-3 py-2 border rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500'}),
+    )
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        if not upload.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError("Upload a .csv or .xlsx file")
+        return upload
+
 class TeacherForm(forms.ModelForm):
     first_name = forms.CharField(max_length=30)
     last_name = forms.CharField(max_length=30)
@@ -81,6 +105,8 @@ class ClassroomForm(forms.ModelForm):  # CHANGED FROM ClassroomForm
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # Teacher.__str__ reads the user; load it with the choices
+        self.fields['teacher'].queryset = Teacher.objects.select_related('user')
         if 'department' in self.data:
             try:
                 department_id = int(self.data.get('department'))
@@ -92,6 +118,14 @@ class ClassroomForm(forms.ModelForm):  # CHANGED FROM ClassroomForm
         else:
             self.fields['students'].queryset = Student.objects.none()
 
+        # The queryset above validates the submitted ids; the widget only renders the
+        # students already selected and the page loads others from the roster API
+        selected = [getattr(value, 'pk', value) for value in self['students'].value() or []]
+        self.fields['students'].widget.choices = [
+            (student.pk, str(student))
+            for student in self.fields['students'].queryset.filter(pk__in=[pk for pk in selected if str(pk).isdigit()])
+        ]
+
 class AttendanceSessionForm(forms.ModelForm):
     class Meta:
         model = AttendanceSession
@@ -101,4 +135,55 @@ class AttendanceSessionForm(forms.ModelForm):
             'date': forms.DateInput(attrs={'type': 'date', 'class': 'w-full px-3 py-2 border rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500'}),
             'startTime': forms.TimeInput(attrs={'type': 'time', 'class': 'w-full px-3 py-2 border rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500'}),
             'endTime': forms.TimeInput(attrs={'type': 'time', 'class': 'w-full px-3 py-2 border rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500'}),
-        }
\ No newline at end of file
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Classroom.__str__ reads the subject; load it with the choices
+        self.fields['classroom'].queryset = Classroom.objects.select_related('subject')
+
+class TimetableForm(forms.Form):
+    classrooms = forms.ModelMultipleChoiceField(
+        queryset=Classroom.objects.select_related('subject'),
+        widget=forms.SelectMultiple(attrs={'class': 'w-full px-3 py-2 border rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500'}),
+    )
+    weekdays = forms.TypedMultipleChoiceField(
+        choices=WEEKDAY_CHOICES,
+        coerce=int,
+        widget=forms.CheckboxSelectMultiple,
+    )
+    start_time = forms.TimeField(widget=forms.TimeInput(attrs={'type': 'time', 'class': 'w-full px-3 py-2 border rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500'}))
+    end_time = forms.TimeField(widget=forms.TimeInput(attrs={'type': 'time', 'class': 'w-full px-3 py-2 border rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500'}))
+    start_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date', 'class': 'w-full px-3 py-2 border rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500'}))
+    end_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date', 'class': 'w-full px-3 py-2 border rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500'}))
+    holidays = forms.CharField(
+        required=False,
+        help_text="Dates to skip, one per line (YYYY-MM-DD)",
+        widget=forms.Textarea(attrs={'rows': 3, 'class': 'w-full px-3 py-2 border rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500'}),
+    )
+
+    # Longest range a single rule may cover
+    MAX_DAYS = 366
+
+    def clean_holidays(self):
+        holidays = []
+        for line in self.cleaned_data['holidays'].replace(',', '\n').splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                holidays.append(datetime.date.fromisoformat(line))
+            except ValueError:
+                raise forms.ValidationError(f"Invalid date: {line}")
+        return holidays
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+        if start_date and end_date:
+            if end_date < start_date:
+                raise forms.ValidationError("End date must not be before start date")
+            if (end_date - start_date).days > self.MAX_DAYS:
+                raise forms.ValidationError(f"A timetable can cover at most {self.MAX_DAYS} days")
+        return cleaned_data
\ No newline at end of file
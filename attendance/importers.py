@@ -0,0 +1,222 @@
+"""
+Bulk student import from CSV or XLSX files.
+Rows are validated in batches against the database with set lookups (one
+query for existing studKeys and one for emails per batch) and written with
+bulk_create / bulk_update, so the cost per row is independent of table size.
+"""
+import csv
+import io
+import zipfile
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from . import pdfcache
+from .models import Department, Student, Classroom
+from .services import SummaryService, RosterService, CounterService
+
+COLUMNS = ['studKey', 'name', 'email', 'phone', 'department']
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.enrolled = 0
+        self.errors = []  # (row number, studKey, message)
+
+    @property
+    def total(self):
+        return self.created + self.updated + len(self.errors)
+
+
+def _cell_text(value):
+    """Text of a spreadsheet cell; whole numbers are stored as floats, so 1001.0 reads as '1001'"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def read_rows(uploaded, filename):
+    """
+    Read student rows from an uploaded CSV or XLSX file
+    Args:
+        uploaded: binary file object
+        filename: original name, used to pick the format
+    Yields:
+        dict: column name -> cell value (as text)
+    Raises:
+        ValueError: if the file cannot be parsed
+    """
+    if filename.lower().endswith('.xlsx'):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError("Reading .xlsx files requires the openpyxl package")
+        try:
+            sheet = load_workbook(uploaded, read_only=True, data_only=True).active
+        except (zipfile.BadZipFile, KeyError, OSError) as e:
+            raise ValueError(f"not a valid .xlsx file ({e})")
+        rows = sheet.iter_rows(values_only=True)
+        header = [_cell_text(cell) for cell in next(rows, [])]
+        for values in rows:
+            yield {column: _cell_text(value) for column, value in zip(header, values)}
+    else:
+        text = io.TextIOWrapper(uploaded, encoding='utf-8-sig', newline='')
+        try:
+            for row in csv.DictReader(text):
+                # Cells beyond the header (listed under None) are ignored
+                yield {
+                    column.strip(): (value or '').strip() for column, value in row.items() if column is not None
+                }
+        except csv.Error as e:
+            # e.g. NUL bytes in a binary file uploaded as CSV
+            raise ValueError(f"malformed CSV ({e})")
+
+
+class StudentImporter:
+    """Imports students in batches; see read_rows() for the expected columns"""
+
+    def __init__(self, update_existing=False, classroom=None, batch_size=900):
+        self.update_existing = update_existing
+        self.classroom = classroom
+        self.batch_size = batch_size
+        self.departments = {
+            name.lower(): dept_id for dept_id, name in Department.objects.values_list('deptId', 'deptName')
+        }
+        # studKey/email seen earlier in the file, to catch duplicates inside the upload
+        self.seen_keys = set()
+        self.seen_emails = set()
+
+    @transaction.atomic
+    def run(self, rows):
+        """
+        Validate and write all rows
+        Args:
+            rows: iterable of dicts as produced by read_rows()
+        Returns:
+            ImportResult
+        """
+        result = ImportResult()
+        batch = []
+        # Row 1 is the header
+        for row_number, row in enumerate(rows, start=2):
+            if not any(row.values()):
+                continue
+            batch.append((row_number, row))
+            if len(batch) >= self.batch_size:
+                self._import_batch(batch, result)
+                batch = []
+        if batch:
+            self._import_batch(batch, result)
+        return result
+
+    def _clean(self, row):
+        """Return (field values, error message) for one row"""
+        stud_key = row.get('studKey', '')
+        name = row.get('name', '')
+        email = row.get('email', '') or None
+        phone = row.get('phone', '') or None
+        department_name = row.get('department', '')
+
+        if not stud_key:
+            return None, "studKey is required"
+        if len(stud_key) > 20:
+            return None, "studKey is longer than 20 characters"
+        if not name:
+            return None, "name is required"
+        if len(name) > 100:
+            return None, "name is longer than 100 characters"
+        if email:
+            try:
+                validate_email(email)
+            except ValidationError:
+                return None, f"invalid email '{email}'"
+        if phone and len(phone) > 15:
+            return None, "phone is longer than 15 characters"
+        department_id = None
+        if department_name:
+            department_id = self.departments.get(department_name.lower())
+            if department_id is None:
+                return None, f"unknown department '{department_name}'"
+
+        return {
+            'studKey': stud_key,
+            'name': name,
+            'email': email,
+            'phone': phone,
+            'department_id': department_id,
+        }, None
+
+    def _import_batch(self, batch, result):
+        cleaned = []
+        for row_number, row in batch:
+            values, error = self._clean(row)
+            if error:
+                result.errors.append((row_number, row.get('studKey', ''), error))
+            elif values['studKey'] in self.seen_keys:
+                result.errors.append((row_number, values['studKey'], "duplicate studKey in file"))
+            elif values['email'] and values['email'] in self.seen_emails:
+                result.errors.append((row_number, values['studKey'], "duplicate email in file"))
+            else:
+                self.seen_keys.add(values['studKey'])
+                if values['email']:
+                    self.seen_emails.add(values['email'])
+                cleaned.append((row_number, values))
+
+        keys = [values['studKey'] for _, values in cleaned]
+        emails = [values['email'] for _, values in cleaned if values['email']]
+        existing = {
+            stud_key: (stud_id, department_id)
+            for stud_key, stud_id, department_id in Student.objects.filter(studKey__in=keys).values_list(
+                'studKey', 'studId', 'department_id'
+            )
+        }
+        email_owners = dict(Student.objects.filter(email__in=emails).values_list('email', 'studKey'))
+
+        to_create = []
+        to_update = []
+        # Rosters changed by this batch: new departments plus the old ones of updated students
+        touched_departments = set()
+        for row_number, values in cleaned:
+            stud_key = values['studKey']
+            owner = email_owners.get(values['email'])
+            if owner is not None and owner != stud_key:
+                result.errors.append((row_number, stud_key, f"email already used by {owner}"))
+            elif stud_key in existing:
+                if self.update_existing:
+                    stud_id, previous_department_id = existing[stud_key]
+                    to_update.append(Student(studId=stud_id, **values))
+                    touched_departments.update([previous_department_id, values['department_id']])
+                else:
+                    result.errors.append((row_number, stud_key, "studKey already exists"))
+            else:
+                to_create.append(Student(**values))
+                touched_departments.add(values['department_id'])
+
+        Student.objects.bulk_create(to_create, batch_size=500)
+        Student.objects.bulk_update(to_update, ['name', 'email', 'phone', 'department'], batch_size=500)
+        # bulk_update sends no signals; renamed students change their session PDFs
+        pdfcache.students_changed(student.studId for student in to_update)
+        RosterService.touch(touched_departments)
+        CounterService.add('students', len(to_create))
+        result.created += len(to_create)
+        result.updated += len(to_update)
+
+        if self.classroom is not None and (to_create or to_update):
+            imported_keys = [student.studKey for student in to_create + to_update]
+            student_ids = list(Student.objects.filter(studKey__in=imported_keys).values_list('studId', flat=True))
+            Through = Classroom.students.through
+            # Updated students may already be in the class; only the others are enrolled now
+            enrolled = set(Through.objects.filter(
+                classroom_id=self.classroom.classId, student_id__in=student_ids
+            ).values_list('student_id', flat=True))
+            student_ids = [student_id for student_id in student_ids if student_id not in enrolled]
+            Through.objects.bulk_create([
+                Through(classroom_id=self.classroom.classId, student_id=student_id)
+                for student_id in student_ids
+            ], batch_size=500, ignore_conflicts=True)
+            if student_ids:
+                SummaryService.students_enrolled(self.classroom, student_ids)
+            result.enrolled += len(student_ids)
@@ -0,0 +1,207 @@
+"""
+Background report jobs.
+
+Heavy reports are queued as ReportJob rows and rendered by the
+run_report_worker management command instead of inside a web worker. The
+worker claims the oldest queued job with a conditional UPDATE (so several
+workers never take the same job), writes the result to a file under
+ATTENDANCE_REPORT_JOB_DIR and records progress on the row, which the
+report job page polls. Finished jobs and their files are removed after
+ATTENDANCE_REPORT_JOB_TTL seconds.
+"""
+import csv
+import datetime
+import io
+import math
+import os
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from .models import AttendanceSession, Classroom, ReportJob
+from .pdfcache import session_fingerprint
+from .services import ReportGenerator
+
+
+class JobError(Exception):
+    """Expected failure; the message is shown to the user as is"""
+
+
+class ProgressReporter:
+    """Writes a job's progress to its row, at most once per step of `every` percent"""
+
+    def __init__(self, job_id, every=5):
+        self.job_id = job_id
+        self.every = every
+        self.reported = 0
+
+    def __call__(self, percent):
+        percent = max(0, min(99, int(percent)))
+        if percent - self.reported >= self.every:
+            ReportJob.objects.filter(pk=self.job_id).update(progress=percent)
+            self.reported = percent
+
+
+def render_session_pdf(params, out, progress):
+    session = AttendanceSession.objects.select_related('classroom__subject', 'archive').filter(
+        pk=params.get('session_id')
+    ).first()
+    if session is None:
+        raise JobError("Session not found")
+    out.write(ReportGenerator.get_cached_attendance_pdf(session, session_fingerprint(session)))
+    return f"attendance_report_{session.pk}.pdf"
+
+
+def render_register_pdf(params, out, progress):
+    classroom = Classroom.objects.select_related('subject').filter(pk=params.get('class_id')).first()
+    if classroom is None:
+        raise JobError("Class not found")
+    sessions = AttendanceSession.objects.filter(classroom=classroom).count()
+    students = classroom.students.count()
+    pages = (
+        max(1, math.ceil(sessions / ReportGenerator.REGISTER_SESSIONS_PER_PAGE))
+        * max(1, math.ceil(students / ReportGenerator.REGISTER_STUDENTS_PER_PAGE))
+    )
+    # begin() and finish() are one chunk each; every other chunk is a page
+    for number, chunk in enumerate(ReportGenerator.stream_register_pdf(classroom)):
+        out.write(chunk)
+        progress(100 * number / pages)
+    return f"attendance_register_{classroom.classId}.pdf"
+
+
+def render_defaulters(params, out, progress):
+    threshold = float(params.get('threshold', 75.0))
+    classroom, defaulters = ReportGenerator.get_defaulter_list(params.get('class_id'), threshold)
+    if classroom is None:
+        raise JobError("Class not found")
+    progress(50)
+    text = io.TextIOWrapper(out, encoding='utf-8', newline='')
+    writer = csv.writer(text)
+    writer.writerow(['studKey', 'name', 'present', 'total', 'percentage'])
+    for row in defaulters:
+        writer.writerow([row['student'].studKey, row['student'].name, row['present'], row['total'], row['percentage']])
+    text.flush()
+    text.detach()
+    return f"defaulters_{classroom.classId}_{threshold:g}.csv"
+
+
+# kind -> (renderer, file extension, content type)
+RENDERERS = {
+    'session_pdf': (render_session_pdf, '.pdf', 'application/pdf'),
+    'register_pdf': (render_register_pdf, '.pdf', 'application/pdf'),
+    'defaulters': (render_defaulters, '.csv', 'text/csv'),
+}
+
+
+def content_type(job):
+    return RENDERERS[job.kind][2]
+
+
+def result_path(job):
+    return os.path.join(settings.ATTENDANCE_REPORT_JOB_DIR, job.resultFile)
+
+
+def enqueue(kind, params, user=None):
+    """
+    Queue a report for the worker
+    Args:
+        kind: key of RENDERERS
+        params: JSON-serializable arguments of the renderer
+        user: User requesting the report
+    Returns:
+        ReportJob
+    """
+    if kind not in RENDERERS:
+        raise ValueError(f"Unknown report kind '{kind}'")
+    return ReportJob.objects.create(kind=kind, params=params, requestedBy=user)
+
+
+def claim_next():
+    """
+    Mark the oldest queued job as running
+    Returns:
+        int: ID of the claimed job, or None when the queue is empty
+    """
+    while True:
+        job_id = ReportJob.objects.filter(status='queued').order_by('created', 'jobId').values_list(
+            'jobId', flat=True
+        ).first()
+        if job_id is None:
+            return None
+        # Another worker may have claimed it since the SELECT; only one UPDATE matches
+        if ReportJob.objects.filter(pk=job_id, status='queued').update(status='running', started=timezone.now()):
+            return job_id
+
+
+def run_job(job_id):
+    """
+    Render a claimed job to its result file and record the outcome on the row
+    Returns:
+        ReportJob: the job after it finished or failed
+    """
+    job = ReportJob.objects.get(pk=job_id)
+    render, extension, _ = RENDERERS[job.kind]
+    directory = settings.ATTENDANCE_REPORT_JOB_DIR
+    os.makedirs(directory, exist_ok=True)
+    result_file = f"job-{job.pk}{extension}"
+    path = os.path.join(directory, result_file)
+    partial = f"{path}.part"
+
+    try:
+        with open(partial, 'wb') as out:
+            download_name = render(job.params, out, ProgressReporter(job.pk))
+        os.replace(partial, path)
+    except Exception as e:
+        if os.path.exists(partial):
+            os.remove(partial)
+        job.status = 'failed'
+        job.error = str(e) if isinstance(e, JobError) else f"{type(e).__name__}: {e}"
+    else:
+        job.status = 'done'
+        job.progress = 100
+        job.resultFile = result_file
+        job.downloadName = download_name
+
+    job.finished = timezone.now()
+    job.expires = job.finished + datetime.timedelta(seconds=settings.ATTENDANCE_REPORT_JOB_TTL)
+    job.save(update_fields=['status', 'progress', 'error', 'resultFile', 'downloadName', 'finished', 'expires'])
+    return job
+
+
+def run_job_in_worker(job_id):
+    """run_job for pool threads/processes, which each hold their own connection"""
+    try:
+        job = run_job(job_id)
+        return job.jobId, job.status, job.error
+    finally:
+        connection.close()
+
+
+def requeue_stale(older_than):
+    """
+    Put back jobs left running by a worker that died
+    Args:
+        older_than: seconds a job may run before it is considered abandoned
+    Returns:
+        int: Number of jobs requeued
+    """
+    cutoff = timezone.now() - datetime.timedelta(seconds=older_than)
+    return ReportJob.objects.filter(status='running', started__lt=cutoff).update(
+        status='queued', progress=0, started=None
+    )
+
+
+def cleanup_expired(now=None):
+    """
+    Delete finished jobs past their expiry time together with their result files
+    Returns:
+        int: Number of jobs deleted
+    """
+    expired = list(ReportJob.objects.filter(expires__lt=now or timezone.now()).only('jobId', 'resultFile'))
+    for job in expired:
+        if job.resultFile:
+            try:
+                os.remove(result_path(job))
+            except FileNotFoundError:
+                pass
+    ReportJob.objects.filter(pk__in=[job.pk for job in expired]).delete()
+    return len(expired)
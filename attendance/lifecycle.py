@@ -0,0 +1,109 @@
+"""
+Session lifecycle sweeper.
+
+Sessions stay is_active until they are swept after their end time, which
+keeps the "today's active sessions" lookups (teacher dashboard) small. The
+sweep walks the candidate sessions in primary key ranges and commits after
+each range, so no lock is held for longer than one batch. Optionally the
+ended sessions nobody submitted are filled with absent records first.
+
+Run it with the sweep_sessions management command, or let
+run_report_worker run it every ATTENDANCE_SESSION_SWEEP_INTERVAL seconds.
+"""
+import time
+from django.db import transaction
+from django.db.models import Exists, Max, Min, OuterRef, Q
+from django.utils import timezone
+from . import dashboard
+from .models import AttendanceRecord, AttendanceSession, Classroom
+from .services import AttendanceService
+
+
+class SweepResult:
+    def __init__(self):
+        self.batches = 0
+        self.deactivated = 0
+        self.marked_sessions = 0
+        self.marked_records = 0
+        self.mark_seconds = 0.0
+        self.deactivate_seconds = 0.0
+
+    @property
+    def seconds(self):
+        return self.mark_seconds + self.deactivate_seconds
+
+
+def ended_sessions(now=None):
+    """Active sessions whose end time has passed"""
+    now = timezone.localtime(now or timezone.now())
+    return AttendanceSession.objects.filter(is_active=True).filter(
+        Q(date__lt=now.date()) | Q(date=now.date(), endTime__lt=now.time())
+    )
+
+
+def mark_unsubmitted_absent(sessions):
+    """
+    Write absent records for the whole roster of each session without records.
+    markedAt is left empty, so an offline sync of the real attendance still wins.
+    Args:
+        sessions: AttendanceSession queryset
+    Returns:
+        tuple: (sessions marked, records created)
+    """
+    unsubmitted = list(
+        sessions.filter(~Exists(AttendanceRecord.objects.filter(session=OuterRef('pk'))))
+        .only('sessionId', 'classroom_id', 'date')
+    )
+    if not unsubmitted:
+        return 0, 0
+
+    rosters = {}
+    for classroom_id, student_id in Classroom.students.through.objects.filter(
+        classroom_id__in={session.classroom_id for session in unsubmitted}
+    ).values_list('classroom_id', 'student_id'):
+        rosters.setdefault(classroom_id, []).append(student_id)
+
+    changes = [
+        (session, dict.fromkeys(rosters.get(session.classroom_id, []), False))
+        for session in unsubmitted
+    ]
+    results = AttendanceService.write_many(changes, marked_at={session.pk: None for session in unsubmitted})
+    return len(unsubmitted), sum(counts['created'] for counts in results.values())
+
+
+def sweep_sessions(now=None, batch_size=1000, mark_absent=False):
+    """
+    Deactivate ended sessions, one transaction per primary key range
+    Args:
+        now: Time to sweep as of (default now)
+        batch_size: Width of each primary key range
+        mark_absent: Fill ended sessions that have no records with absent records first
+    Returns:
+        SweepResult
+    """
+    now = now or timezone.now()
+    today = timezone.localtime(now).date()
+    result = SweepResult()
+    bounds = ended_sessions(now).aggregate(low=Min('sessionId'), high=Max('sessionId'))
+    if bounds['low'] is None:
+        return result
+
+    for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+        with transaction.atomic():
+            batch = ended_sessions(now).filter(sessionId__gte=start, sessionId__lt=start + batch_size)
+
+            if mark_absent:
+                started = time.perf_counter()
+                sessions, records = mark_unsubmitted_absent(batch)
+                result.marked_sessions += sessions
+                result.marked_records += records
+                result.mark_seconds += time.perf_counter() - started
+
+            started = time.perf_counter()
+            # Only today's schedule is cached; drop it for the teachers whose sessions close
+            closing_today = list(batch.filter(date=today).values_list('classroom_id', flat=True).distinct())
+            result.deactivated += batch.update(is_active=False)
+            dashboard.invalidate_classrooms(closing_today)
+            result.deactivate_seconds += time.perf_counter() - started
+        result.batches += 1
+    return result
@@ -0,0 +1,42 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from attendance.archive import compact_sessions, restore_sessions
+
+
+class Command(BaseCommand):
+    help = "Pack the records of closed sessions older than a cutoff into the archive, or restore archived sessions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', help="Archive sessions dated before this day (YYYY-MM-DD)")
+        parser.add_argument('--older-than', type=int, default=365,
+                            help="Archive sessions more than this many days old (default 365)")
+        parser.add_argument('--batch-size', type=int, default=500, help="Session IDs per transaction")
+        parser.add_argument('--restore', nargs='+', type=int, metavar='SESSION_ID',
+                            help="Turn these archived sessions back into records instead")
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            created = restore_sessions(options['restore'])
+            self.stdout.write(self.style.SUCCESS(f"Restored {created} record(s)"))
+            return
+
+        if options['before']:
+            try:
+                before = parse_date(options['before'])
+            except ValueError:
+                # Well formed but not a real date, e.g. 2025-02-30
+                before = None
+            if before is None:
+                raise CommandError(f"Invalid date: {options['before']}")
+        else:
+            before = timezone.localdate() - datetime.timedelta(days=options['older_than'])
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        result = compact_sessions(before, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {result.sessions} session(s) dated before {before}, {result.records} record(s) removed, "
+            f"in {result.batches} batch(es), {result.seconds:.2f}s"
+        ))
@@ -0,0 +1,80 @@
+import datetime
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from attendance import analytics
+from attendance.models import AttendanceRecord, Student
+from attendance.services import AttendanceService, SummaryService
+from attendance.synthetic import build_classroom
+
+
+class Rollback(Exception):
+    """Raised to discard the synthetic data once a run is measured"""
+
+
+class Command(BaseCommand):
+    help = ("Compare the per-student get_attendance_percentage loop with the attendance matrix "
+            "(analytics.get_matrix) on a synthetic class")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=500)
+        parser.add_argument('--sessions', type=int, default=200)
+        parser.add_argument('--present-rate', type=float, default=0.85,
+                            help="Share of synthetic records marked present")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def run(self, options):
+        num_students, num_sessions = options['students'], options['sessions']
+        classroom, sessions = build_classroom(
+            num_students, num_sessions=num_sessions, prefix='bench-analytics',
+            start_date=datetime.date.today() - datetime.timedelta(days=num_sessions - 1),
+        )
+        students = list(Student.objects.filter(classroom=classroom).order_by('studId'))
+        rng = random.Random(options['seed'])
+        AttendanceRecord.objects.bulk_create([
+            AttendanceRecord(session=session, student=student, status=rng.random() < options['present_rate'])
+            for session in sessions
+            for student in students
+        ], batch_size=AttendanceService.BULK_BATCH_SIZE)
+        SummaryService.sync_classroom(classroom)
+        self.stdout.write(f"{num_students} students x {num_sessions} sessions")
+
+        loop = self.measure(
+            'loop', lambda: [AttendanceService.get_attendance_percentage(student, classroom) for student in students]
+        )
+
+        def all_figures(matrix):
+            return (
+                matrix.percentages(), matrix.longest_absence_streaks(), matrix.rolling_rates(),
+                matrix.turnout(), matrix.session_correlation(),
+            )
+
+        analytics.invalidate([classroom.pk])
+        self.measure('build', lambda: analytics.get_matrix(classroom))
+        matrix = analytics.get_matrix(classroom)
+        self.measure('cached', lambda: analytics.get_matrix(classroom).percentages())
+        self.measure('figures', lambda: all_figures(matrix))
+
+        drift = max(
+            (abs(expected - actual) for expected, actual in zip(loop, matrix.percentages().tolist())),
+            default=0.0,
+        )
+        self.stdout.write(f"max difference between loop and matrix percentages: {drift:.4f}")
+
+    def measure(self, label, func):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            result = func()
+            elapsed = (time.perf_counter() - started) * 1000
+        self.stdout.write(f"{label:>8} {len(queries):>6} queries {elapsed:>9.1f} ms")
+        return result
@@ -0,0 +1,50 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from attendance.services import AttendanceService
+from attendance.synthetic import build_classroom
+
+
+class Rollback(Exception):
+    """Raised to discard the synthetic data once a run is measured"""
+
+
+class Command(BaseCommand):
+    help = "Measure queries and time taken by AttendanceService.bulk_mark_attendance for growing rosters"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='30,180,1000,5000',
+                            help="Comma separated roster sizes to benchmark")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        self.stdout.write(f"{'students':>8} {'pass':>8} {'queries':>8} {'ms':>9}  counts")
+        for size in sizes:
+            try:
+                with transaction.atomic():
+                    self.run_size(size)
+                    raise Rollback()
+            except Rollback:
+                pass
+
+    def run_size(self, size):
+        classroom, sessions = build_classroom(size, prefix=f"bench-{size}")
+        session = sessions[0]
+        roster = list(classroom.students.values_list('studId', flat=True))
+
+        # First pass inserts everything, second flips half, third is a no-op
+        passes = [
+            ('insert', roster[::2]),
+            ('update', roster[1::2]),
+            ('noop', roster[1::2]),
+        ]
+        for label, present_ids in passes:
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                counts = AttendanceService.bulk_mark_attendance(session, present_ids)
+                elapsed = (time.perf_counter() - started) * 1000
+            self.stdout.write(
+                f"{size:>8} {label:>8} {len(queries):>8} {elapsed:>9.1f}  "
+                f"created={counts['created']} updated={counts['updated']} unchanged={counts['unchanged']}"
+            )
@@ -0,0 +1,44 @@
+import statistics
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter so that nothing is imported yet
+PROBE = """
+import os, sys, time
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'attendance_ms.settings')
+started = time.perf_counter()
+from attendance_ms.wsgi import application
+booted = time.perf_counter()
+from django.test import Client
+response = Client(HTTP_HOST='localhost').get(sys.argv[1])
+finished = time.perf_counter()
+print((booted - started) * 1000, (finished - booted) * 1000, response.status_code)
+"""
+
+
+class Command(BaseCommand):
+    help = "Measure worker import time and first-request latency in fresh interpreters"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help="Number of fresh processes to start")
+        parser.add_argument('--path', default='/login/', help="URL requested after boot")
+
+    def handle(self, *args, **options):
+        boot, first = [], []
+        for _ in range(options['runs']):
+            result = subprocess.run(
+                [sys.executable, '-c', PROBE, options['path']],
+                cwd=settings.BASE_DIR, capture_output=True, text=True,
+            )
+            if result.returncode != 0:
+                raise CommandError(result.stderr.strip())
+            boot_ms, first_ms, status = result.stdout.split()[-3:]
+            boot.append(float(boot_ms))
+            first.append(float(first_ms))
+
+        self.stdout.write(f"{'':>14} {'median ms':>10} {'min ms':>8}")
+        for label, timings in (('import wsgi', boot), ('first request', first)):
+            self.stdout.write(f"{label:>14} {statistics.median(timings):>10.1f} {min(timings):>8.1f}")
+        self.stdout.write(f"status {status} for {options['path']}")
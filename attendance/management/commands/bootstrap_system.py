@@ -0,0 +1,40 @@
+import os
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from attendance.models import Department, Subject
+
+
+class Command(BaseCommand):
+    help = "Create the admin account and default department/subject if they are missing (safe to re-run)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--admin-username', default='admin')
+        parser.add_argument('--admin-email', default='admin@example.com')
+        parser.add_argument('--admin-password', default=os.environ.get('ADMIN_PASSWORD', '123'),
+                            help="Password for a newly created admin (default: $ADMIN_PASSWORD or '123')")
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        username = options['admin_username']
+        if not User.objects.filter(username=username).exists():
+            User.objects.create_superuser(
+                username=username,
+                email=options['admin_email'],
+                password=options['admin_password'],
+            )
+            self.stdout.write(f"Admin user created: {username}")
+
+        if not Department.objects.exists():
+            Department.objects.create(deptName="Computer Engineering")
+            self.stdout.write("Default department created")
+
+        if not Subject.objects.exists():
+            Subject.objects.create(
+                subName="Data Structures",
+                credits=4,
+                department=Department.objects.first(),
+            )
+            self.stdout.write("Default subject created")
+
+        self.stdout.write(self.style.SUCCESS("System initialized"))
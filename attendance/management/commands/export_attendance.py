@@ -0,0 +1,41 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from attendance.exports import export_rows, iter_csv, gzip_stream
+
+
+class Command(BaseCommand):
+    help = "Stream raw attendance records (joined with student, session, class and subject) to CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help="First session date (YYYY-MM-DD)")
+        parser.add_argument('--to', dest='date_to', help="Last session date (YYYY-MM-DD)")
+        parser.add_argument('--department', type=int, help="Department ID")
+        parser.add_argument('--classroom', type=int, help="Classroom ID")
+        parser.add_argument('--gzip', action='store_true', help="Compress the output with gzip")
+        parser.add_argument('--output', default='-', help="Output file (default stdout)")
+
+    def handle(self, *args, **options):
+        filters = {'department_id': options['department'], 'classroom_id': options['classroom']}
+        for option in ('date_from', 'date_to'):
+            if options[option]:
+                try:
+                    filters[option] = parse_date(options[option])
+                except ValueError:
+                    # Well formed but not a real date, e.g. 2025-02-30
+                    filters[option] = None
+                if filters[option] is None:
+                    raise CommandError(f"Invalid date: {options[option]}")
+
+        chunks = iter_csv(export_rows(**filters))
+        if options['gzip']:
+            output = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+            chunks = gzip_stream(chunks)
+        else:
+            output = sys.stdout if options['output'] == '-' else open(options['output'], 'w', newline='')
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if options['output'] != '-':
+                output.close()
@@ -0,0 +1,46 @@
+import csv
+import time
+from django.core.management.base import BaseCommand, CommandError
+from attendance.importers import StudentImporter, read_rows
+from attendance.models import Classroom
+
+
+class Command(BaseCommand):
+    help = "Bulk import students from a CSV or XLSX file (columns: studKey, name, email, phone, department)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or XLSX file")
+        parser.add_argument('--update', action='store_true',
+                            help="Update students whose studKey already exists instead of reporting them")
+        parser.add_argument('--classroom', type=int, help="Enroll imported students into this classroom ID")
+        parser.add_argument('--errors', help="Write the row-level error report to this CSV file")
+
+    def handle(self, *args, **options):
+        classroom = None
+        if options['classroom']:
+            classroom = Classroom.objects.filter(pk=options['classroom']).first()
+            if classroom is None:
+                raise CommandError(f"Classroom {options['classroom']} does not exist")
+
+        started = time.perf_counter()
+        importer = StudentImporter(update_existing=options['update'], classroom=classroom)
+        try:
+            with open(options['path'], 'rb') as upload:
+                result = importer.run(read_rows(upload, options['path']))
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            raise CommandError(f"Could not read {options['path']}: {e}")
+        elapsed = time.perf_counter() - started
+
+        if options['errors']:
+            with open(options['errors'], 'w', newline='') as report:
+                writer = csv.writer(report)
+                writer.writerow(['row', 'studKey', 'error'])
+                writer.writerows(result.errors)
+        else:
+            for row_number, stud_key, message in result.errors:
+                self.stderr.write(f"row {row_number} ({stud_key or '-'}): {message}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result.created}, updated {result.updated}, enrolled {result.enrolled}, "
+            f"skipped {len(result.errors)} in {elapsed:.2f}s"
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from attendance.models import Classroom
+from attendance.services import SummaryService
+
+
+class Command(BaseCommand):
+    help = "Rebuild AttendanceSummary from raw sessions and records, or verify it with --verify"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--classroom', type=int, action='append',
+                            help="Only process this classroom ID (can be repeated)")
+        parser.add_argument('--verify', action='store_true',
+                            help="Report drift without writing; exits non-zero if any is found")
+
+    def handle(self, *args, **options):
+        classrooms = Classroom.objects.order_by('classId')
+        if options['classroom']:
+            classrooms = classrooms.filter(classId__in=options['classroom'])
+
+        commit = not options['verify']
+        total_drift = 0
+        for classroom in classrooms:
+            drift = SummaryService.sync_classroom(classroom, commit=commit)
+            total_drift += drift
+            if drift:
+                self.stdout.write(f"{classroom.className} (#{classroom.classId}): {drift} row(s) out of date")
+
+        if commit:
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt summaries, {total_drift} row(s) repaired"))
+        elif total_drift:
+            self.stderr.write(self.style.ERROR(f"Summary drift found in {total_drift} row(s)"))
+            raise SystemExit(1)
+        else:
+            self.stdout.write(self.style.SUCCESS("Summaries match the attendance records"))
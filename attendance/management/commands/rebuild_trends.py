@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from attendance import trends
+
+
+class Command(BaseCommand):
+    help = "Recompute the weekly and monthly attendance trend buckets from the records and archived sessions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--classroom', type=int, action='append',
+                            help="Only process this classroom ID (can be repeated)")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            stored = trends.rebuild(options['classroom'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {stored} trend bucket(s)"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from attendance.services import CounterService
+
+
+class Command(BaseCommand):
+    help = "Recount the admin dashboard counters and repair drift, or only report it with --verify"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help="Report drift without writing; exits non-zero if any is found")
+
+    def handle(self, *args, **options):
+        commit = not options['verify']
+        drift = CounterService.reconcile(commit=commit)
+        for name, stored, counted in drift:
+            self.stdout.write(f"{name}: stored {stored}, counted {counted}")
+
+        if commit:
+            self.stdout.write(self.style.SUCCESS(f"Reconciled counters, {len(drift)} repaired"))
+        elif drift:
+            self.stderr.write(self.style.ERROR(f"{len(drift)} counter(s) have drifted"))
+            raise SystemExit(1)
+        else:
+            self.stdout.write(self.style.SUCCESS("Counters match the tables"))
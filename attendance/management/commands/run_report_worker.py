@@ -0,0 +1,93 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from attendance import jobs
+from attendance.lifecycle import sweep_sessions
+
+CLEANUP_INTERVAL = 15 * 60
+
+
+class Command(BaseCommand):
+    help = ("Process queued report jobs with a pool of threads or processes; "
+            "also sweeps ended sessions every ATTENDANCE_SESSION_SWEEP_INTERVAL seconds")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help="Jobs rendered at the same time")
+        parser.add_argument('--processes', action='store_true',
+                            help="Render in worker processes instead of threads (uses more cores)")
+        parser.add_argument('--poll', type=float, default=2.0, help="Seconds between queue checks when idle")
+        parser.add_argument('--stale-after', type=int, default=60 * 60,
+                            help="Requeue jobs that have been running longer than this many seconds at startup")
+        parser.add_argument('--once', action='store_true', help="Exit when the queue is empty")
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        requeued = jobs.requeue_stale(options['stale_after'])
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} abandoned job(s)")
+
+        if options['processes']:
+            # Fresh interpreters rather than forks, so no database connection is shared
+            pool = ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup
+            )
+        else:
+            pool = ThreadPoolExecutor(workers)
+
+        running = set()
+        last_cleanup = 0
+        last_sweep = 0
+        with pool:
+            while True:
+                if time.monotonic() - last_cleanup > CLEANUP_INTERVAL:
+                    removed = jobs.cleanup_expired()
+                    if removed:
+                        self.stdout.write(f"Removed {removed} expired job(s)")
+                    last_cleanup = time.monotonic()
+
+                interval = settings.ATTENDANCE_SESSION_SWEEP_INTERVAL
+                if interval is not None and time.monotonic() - last_sweep > interval:
+                    self.sweep()
+                    last_sweep = time.monotonic()
+
+                while len(running) < workers:
+                    job_id = jobs.claim_next()
+                    if job_id is None:
+                        break
+                    self.stdout.write(f"Job {job_id} started")
+                    running.add(pool.submit(jobs.run_job_in_worker, job_id))
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+
+                done, running = wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.report(future)
+
+    def sweep(self):
+        result = sweep_sessions(
+            batch_size=settings.ATTENDANCE_SESSION_SWEEP_BATCH_SIZE,
+            mark_absent=settings.ATTENDANCE_SESSION_SWEEP_MARK_ABSENT,
+        )
+        if result.deactivated or result.marked_sessions:
+            self.stdout.write(
+                f"Swept sessions: {result.deactivated} deactivated, {result.marked_sessions} marked absent "
+                f"in {result.seconds:.2f}s"
+            )
+
+    def report(self, future):
+        try:
+            job_id, status, error = future.result()
+        except Exception as e:
+            self.stderr.write(f"Worker crashed: {type(e).__name__}: {e}")
+            return
+        if status == 'done':
+            self.stdout.write(self.style.SUCCESS(f"Job {job_id} done"))
+        else:
+            self.stderr.write(f"Job {job_id} failed: {error}")
@@ -0,0 +1,173 @@
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from attendance.models import Classroom
+from attendance.services import ReportGenerator
+
+FIELDS = ['classId', 'className', 'subject', 'department', 'year', 'semester',
+          'studKey', 'name', 'present', 'total', 'percentage']
+
+
+def init_worker():
+    """Make sure Django is set up in the worker (needed with the spawn start method)"""
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def sweep_shard(shard_index, classroom_ids, threshold):
+    """
+    Compute the defaulters of a group of classrooms in a worker process.
+    Each worker opens its own database connection on first use.
+    Returns:
+        tuple: (shard index, list of row dicts, elapsed seconds)
+    """
+    started = time.perf_counter()
+    rows = []
+    for classroom_id in classroom_ids:
+        classroom, defaulters = ReportGenerator.get_defaulter_list(classroom_id, threshold)
+        if classroom is None:
+            continue
+        for defaulter in defaulters:
+            student = defaulter['student']
+            rows.append({
+                'classId': classroom.classId,
+                'className': classroom.className,
+                'subject': classroom.subject.subName,
+                'department': classroom.department.deptName,
+                'year': classroom.year,
+                'semester': classroom.semester,
+                'studKey': student.studKey,
+                'name': student.name,
+                'present': defaulter['present'],
+                'total': defaulter['total'],
+                'percentage': defaulter['percentage'],
+            })
+    connections.close_all()
+    return shard_index, rows, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = "Compute defaulters across all classrooms in parallel and stream them to CSV or JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=75.0,
+                            help="Minimum attendance percentage required (default 75)")
+        parser.add_argument('--department', help="Department ID or name")
+        parser.add_argument('--year', choices=[choice for choice, _ in Classroom.YEAR_CHOICES])
+        parser.add_argument('--semester', choices=[choice for choice, _ in Classroom.SEMESTER_CHOICES])
+        parser.add_argument('--format', choices=['csv', 'json'], default='csv')
+        parser.add_argument('--output', default='-', help="Output file (default stdout)")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Worker processes; 1 runs everything in this process")
+        parser.add_argument('--shard-size', type=int, default=25,
+                            help="Classrooms handled per worker task")
+
+    def handle(self, *args, **options):
+        classrooms = Classroom.objects.order_by('classId')
+        department = options['department']
+        if department:
+            if department.isdigit():
+                classrooms = classrooms.filter(department_id=int(department))
+            else:
+                classrooms = classrooms.filter(department__deptName=department)
+        if options['year']:
+            classrooms = classrooms.filter(year=options['year'])
+        if options['semester']:
+            classrooms = classrooms.filter(semester=options['semester'])
+
+        classroom_ids = list(classrooms.values_list('classId', flat=True))
+        shard_size = options['shard_size']
+        if shard_size < 1:
+            raise CommandError("--shard-size must be at least 1")
+        shards = [classroom_ids[i:i + shard_size] for i in range(0, len(classroom_ids), shard_size)]
+        self.stderr.write(f"Sweeping {len(classroom_ids)} classroom(s) in {len(shards)} shard(s)")
+
+        output = sys.stdout if options['output'] == '-' else open(options['output'], 'w', newline='')
+        try:
+            writer = self.make_writer(output, options['format'])
+            timings = self.run_shards(shards, options['threshold'], options['workers'], writer)
+            writer.close()
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        self.report_timings(timings)
+
+    def run_shards(self, shards, threshold, workers, writer):
+        timings = []
+
+        def collect(shard_index, rows, elapsed):
+            for row in rows:
+                writer.write(row)
+            timings.append((shard_index, len(shards[shard_index]), len(rows), elapsed))
+            self.stderr.write(
+                f"[{len(timings)}/{len(shards)}] shard {shard_index}: "
+                f"{len(shards[shard_index])} classroom(s), {len(rows)} defaulter(s) in {elapsed:.2f}s"
+            )
+
+        if workers <= 1:
+            for shard_index, classroom_ids in enumerate(shards):
+                collect(*sweep_shard(shard_index, classroom_ids, threshold))
+            return timings
+
+        # Forked workers must not share the parent's open connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            futures = [
+                pool.submit(sweep_shard, shard_index, classroom_ids, threshold)
+                for shard_index, classroom_ids in enumerate(shards)
+            ]
+            for future in as_completed(futures):
+                collect(*future.result())
+        return timings
+
+    def make_writer(self, output, fmt):
+        return JSONStreamWriter(output) if fmt == 'json' else CSVStreamWriter(output)
+
+    def report_timings(self, timings):
+        if not timings:
+            self.stderr.write("No classrooms matched")
+            return
+        self.stderr.write(f"{'shard':>6} {'classes':>8} {'rows':>8} {'seconds':>9}")
+        for shard_index, classes, rows, elapsed in sorted(timings):
+            self.stderr.write(f"{shard_index:>6} {classes:>8} {rows:>8} {elapsed:>9.2f}")
+        durations = [elapsed for _, _, _, elapsed in timings]
+        self.stderr.write(self.style.SUCCESS(
+            f"{sum(rows for _, _, rows, _ in timings)} defaulter(s); shard time "
+            f"min {min(durations):.2f}s / mean {sum(durations) / len(durations):.2f}s / max {max(durations):.2f}s"
+        ))
+
+
+class CSVStreamWriter:
+    def __init__(self, output):
+        self.writer = csv.DictWriter(output, fieldnames=FIELDS)
+        self.writer.writeheader()
+
+    def write(self, row):
+        self.writer.writerow(row)
+
+    def close(self):
+        pass
+
+
+class JSONStreamWriter:
+    """Writes a JSON array one element at a time"""
+
+    def __init__(self, output):
+        self.output = output
+        self.first = True
+        self.output.write('[')
+
+    def write(self, row):
+        self.output.write(('\n' if self.first else ',\n') + json.dumps(row))
+        self.first = False
+
+    def close(self):
+        self.output.write('\n]\n')
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from attendance.lifecycle import sweep_sessions
+
+
+class Command(BaseCommand):
+    help = "Deactivate ended attendance sessions in batches, optionally marking unsubmitted ones absent"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.ATTENDANCE_SESSION_SWEEP_BATCH_SIZE,
+                            help="Session IDs per transaction")
+        parser.add_argument('--mark-absent', action='store_true',
+                            help="Record every student absent in ended sessions that were never submitted")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        result = sweep_sessions(batch_size=options['batch_size'], mark_absent=options['mark_absent'])
+
+        if options['mark_absent']:
+            self.stdout.write(
+                f"Marked {result.marked_sessions} unsubmitted session(s) absent "
+                f"({result.marked_records} record(s)) in {result.mark_seconds:.2f}s"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Deactivated {result.deactivated} session(s) in {result.batches} batch(es), "
+            f"{result.deactivate_seconds:.2f}s"
+        ))
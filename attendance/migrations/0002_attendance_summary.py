@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+from django.db.models import Count, Q
+
+
+def populate_summaries(apps, schema_editor):
+    """Build the summary rows for data that existed before this migration"""
+    Classroom = apps.get_model('attendance', 'Classroom')
+    AttendanceSession = apps.get_model('attendance', 'AttendanceSession')
+    AttendanceSummary = apps.get_model('attendance', 'AttendanceSummary')
+
+    for classroom in Classroom.objects.all():
+        held = AttendanceSession.objects.filter(classroom=classroom).count()
+        students = classroom.students.annotate(
+            present=Count(
+                'attendancerecord',
+                filter=Q(attendancerecord__session__classroom=classroom, attendancerecord__status=True),
+            )
+        ).values_list('pk', 'present')
+        AttendanceSummary.objects.bulk_create([
+            AttendanceSummary(student_id=student_id, classroom=classroom,
+                              sessionsHeld=held, sessionsPresent=present)
+            for student_id, present in students
+        ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSummary',
+            fields=[
+                ('summaryId', models.AutoField(primary_key=True, serialize=False)),
+                ('sessionsHeld', models.PositiveIntegerField(default=0)),
+                ('sessionsPresent', models.PositiveIntegerField(default=0)),
+                ('lastUpdated', models.DateTimeField(default=django.utils.timezone.now)),
+                ('classroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='attendance.classroom')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='attendance.student')),
+            ],
+            options={
+                'db_table': 'attendance_summary',
+                'unique_together': {('student', 'classroom')},
+            },
+        ),
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0002_attendance_summary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendancesession',
+            index=models.Index(fields=['date', 'startTime', 'sessionId'], name='session_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='classroom',
+            index=models.Index(fields=['className', 'classId'], name='classroom_name_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_roster_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendancerecord',
+            name='session',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='attendance.attendancesession'),
+        ),
+        migrations.AlterField(
+            model_name='attendancerecord',
+            name='student',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='attendance.student'),
+        ),
+        migrations.AlterField(
+            model_name='attendancesession',
+            name='classroom',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='attendance.classroom'),
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='department',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='attendance.department'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancerecord',
+            index=models.Index(fields=['student', 'status'], name='record_student_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancesession',
+            index=models.Index(fields=['classroom', 'date'], name='session_class_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancesession',
+            index=models.Index(fields=['date', 'is_active', 'endTime'], name='session_open_day_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:41
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counter',
+            fields=[
+                ('counterId', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+                ('lastUpdated', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'dashboard_counter',
+            },
+        ),
+    ]
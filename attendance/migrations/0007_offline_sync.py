@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('attendance', '0006_dashboard_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendancesession',
+            name='markedAt',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='SyncReceipt',
+            fields=[
+                ('receiptId', models.AutoField(primary_key=True, serialize=False)),
+                ('idempotencyKey', models.CharField(max_length=64)),
+                ('outcome', models.JSONField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('session', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='attendance.attendancesession')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'attendance_sync_receipt',
+                'unique_together': {('user', 'idempotencyKey')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0008_report_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedSession',
+            fields=[
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archive', serialize=False, to='attendance.attendancesession')),
+                ('roster', models.BinaryField()),
+                ('presentBits', models.BinaryField()),
+                ('rosterSize', models.PositiveIntegerField()),
+                ('presentCount', models.PositiveIntegerField()),
+                ('archivedAt', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'attendance_archive',
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+
+def populate_trends(apps, schema_editor):
+    """Build the week and month buckets for attendance taken before this migration"""
+    AttendanceRecord = apps.get_model('attendance', 'AttendanceRecord')
+    ArchivedSession = apps.get_model('attendance', 'ArchivedSession')
+    AttendanceTrend = apps.get_model('attendance', 'AttendanceTrend')
+
+    for period, trunc in (('week', TruncWeek), ('month', TruncMonth)):
+        counts = {}
+        records = AttendanceRecord.objects.annotate(start=trunc('session__date')).values_list(
+            'session__classroom_id', 'start'
+        ).annotate(present=Count('recordId', filter=Q(status=True)), marked=Count('recordId')).order_by()
+        archived = ArchivedSession.objects.annotate(start=trunc('session__date')).values_list(
+            'session__classroom_id', 'start'
+        ).annotate(present=Sum('presentCount'), marked=Sum('rosterSize')).order_by()
+        for rows in (records, archived):
+            for classroom_id, start, present, marked in rows:
+                totals = counts.setdefault((classroom_id, start), [0, 0])
+                totals[0] += present
+                totals[1] += marked
+        AttendanceTrend.objects.bulk_create([
+            AttendanceTrend(classroom_id=classroom_id, period=period, periodStart=start,
+                            present=present, marked=marked)
+            for (classroom_id, start), (present, marked) in counts.items()
+        ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0009_session_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceTrend',
+            fields=[
+                ('trendId', models.AutoField(primary_key=True, serialize=False)),
+                ('period', models.CharField(choices=[('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('periodStart', models.DateField()),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('marked', models.PositiveIntegerField(default=0)),
+                ('lastUpdated', models.DateTimeField(default=django.utils.timezone.now)),
+                ('classroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='attendance.classroom')),
+            ],
+            options={
+                'db_table': 'attendance_trend',
+                'indexes': [models.Index(fields=['period', 'periodStart'], name='trend_period_start_idx')],
+                'unique_together': {('classroom', 'period', 'periodStart')},
+            },
+        ),
+        migrations.RunPython(populate_trends, migrations.RunPython.noop),
+    ]
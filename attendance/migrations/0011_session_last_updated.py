@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0010_attendance_trends'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendancesession',
+            name='lastUpdated',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
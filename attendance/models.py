@@ -3,10 +3,15 @@ from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 import datetime
+import struct
 
 class Department(models.Model):
     deptId = models.AutoField(primary_key=True)
     deptName = models.CharField(max_length=100, unique=True)
+    # Bumped whenever a student joins, leaves or changes in this department;
+    # validators (ETag / Last-Modified) for the roster API
+    rosterVersion = models.PositiveIntegerField(default=0)
+    rosterUpdated = models.DateTimeField(default=timezone.now)
     
     def __str__(self):
         return self.deptName
@@ -32,13 +37,18 @@ class Student(models.Model):
     name = models.CharField(max_length=100)
     email = models.EmailField(unique=True, null=True, blank=True)
     phone = models.CharField(max_length=15, null=True, blank=True)
-    department = models.ForeignKey(Department, on_delete=models.CASCADE, null=True, blank=True)
+    # Indexed by student_dept_key_idx
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, null=True, blank=True, db_index=False)
 
     def __str__(self):
         return f"{self.name} ({self.studKey})"
     
     class Meta:
         db_table = 'student_list'
+        indexes = [
+            # Department roster in studKey order (roster API)
+            models.Index(fields=['department', 'studKey'], name='student_dept_key_idx'),
+        ]
 
 class Teacher(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -80,14 +90,25 @@ class Classroom(models.Model):
     
     class Meta:
         db_table = 'classroom_list'
+        indexes = [
+            # Sort key of the class list
+            models.Index(fields=['className', 'classId'], name='classroom_name_idx'),
+        ]
 
 class AttendanceSession(models.Model):
     sessionId = models.AutoField(primary_key=True)
-    classroom = models.ForeignKey(Classroom, on_delete=models.CASCADE)  # FIXED: Changed 'classroom' to 'Classroom'
+    # Indexed by session_class_date_idx
+    classroom = models.ForeignKey(Classroom, on_delete=models.CASCADE, db_index=False)  # FIXED: Changed 'classroom' to 'Classroom'
     date = models.DateField()
     startTime = models.TimeField()
     endTime = models.TimeField()
     is_active = models.BooleanField(default=True)
+    # Time of the latest attendance write (device time for offline syncs);
+    # older offline batches for the session lose to it
+    markedAt = models.DateTimeField(null=True, blank=True)
+    # Server time of the latest change to what the session PDF shows (its
+    # records, or the names of its students); part of the PDF fingerprint
+    lastUpdated = models.DateTimeField(null=True, blank=True)
     
     def clean(self):
         if self.endTime <= self.startTime:
@@ -107,6 +128,14 @@ class AttendanceSession(models.Model):
     
     class Meta:
         db_table = 'attendance_session'
+        indexes = [
+            # Sort key of the session list (keyset pagination)
+            models.Index(fields=['date', 'startTime', 'sessionId'], name='session_date_time_idx'),
+            # Sessions of a class by date (timetable clashes, registers, class filter)
+            models.Index(fields=['classroom', 'date'], name='session_class_date_idx'),
+            # Today's open sessions (teacher dashboard)
+            models.Index(fields=['date', 'is_active', 'endTime'], name='session_open_day_idx'),
+        ]
 
 class AttendanceRecord(models.Model):
     STATUS_CHOICES = [
@@ -115,14 +144,199 @@ class AttendanceRecord(models.Model):
     ]
     
     recordId = models.AutoField(primary_key=True)
-    session = models.ForeignKey(AttendanceSession, on_delete=models.CASCADE)
-    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    # Indexed by the (session, student) unique constraint
+    session = models.ForeignKey(AttendanceSession, on_delete=models.CASCADE, db_index=False)
+    # Indexed by record_student_status_idx
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, db_index=False)
     status = models.BooleanField(choices=STATUS_CHOICES, default=False)
     
     class Meta:
         db_table = 'attendance_record'
         unique_together = ['session', 'student']
+        indexes = [
+            # A student's records across sessions, optionally only presents
+            models.Index(fields=['student', 'status'], name='record_student_status_idx'),
+        ]
     
     def __str__(self):
         status = "Present" if self.status else "Absent"
-        return f"{self.student.name} - {status}"
\ No newline at end of file
+        return f"{self.student.name} - {status}"
+
+class AttendanceSummary(models.Model):
+    """Running attendance totals per student per class, kept in step by AttendanceService"""
+    summaryId = models.AutoField(primary_key=True)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    classroom = models.ForeignKey(Classroom, on_delete=models.CASCADE)
+    sessionsHeld = models.PositiveIntegerField(default=0)
+    sessionsPresent = models.PositiveIntegerField(default=0)
+    lastUpdated = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'attendance_summary'
+        unique_together = ['student', 'classroom']
+
+    def __str__(self):
+        return f"{self.student.name} - {self.sessionsPresent}/{self.sessionsHeld}"
+
+class Counter(models.Model):
+    """Row counts shown on the admin dashboard, kept in step by CounterService"""
+    counterId = models.AutoField(primary_key=True)
+    # Model total ('students') or daily count ('sessions:2025-01-31')
+    name = models.CharField(max_length=64, unique=True)
+    value = models.BigIntegerField(default=0)
+    lastUpdated = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'dashboard_counter'
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+class SyncReceipt(models.Model):
+    """Outcome of an offline sync entry, replayed when a device resends the same key"""
+    receiptId = models.AutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    idempotencyKey = models.CharField(max_length=64)
+    session = models.ForeignKey(AttendanceSession, on_delete=models.SET_NULL, null=True)
+    outcome = models.JSONField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'attendance_sync_receipt'
+        unique_together = ['user', 'idempotencyKey']
+
+    def __str__(self):
+        return f"{self.user} - {self.idempotencyKey}"
+
+
+class ReportJob(models.Model):
+    """A report rendered in the background by run_report_worker (see jobs.py)"""
+    KIND_CHOICES = [
+        ('session_pdf', 'Session PDF'),
+        ('register_pdf', 'Semester register'),
+        ('defaulters', 'Defaulter list'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    jobId = models.AutoField(primary_key=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    # Percent complete, updated by the worker while it runs
+    progress = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    # Result file name inside ATTENDANCE_REPORT_JOB_DIR and the name it is downloaded as
+    resultFile = models.CharField(max_length=100, blank=True)
+    downloadName = models.CharField(max_length=100, blank=True)
+    requestedBy = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    # Result and row are deleted after this time
+    expires = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'report_job'
+        indexes = [
+            # Workers claim the oldest queued job
+            models.Index(fields=['status', 'created'], name='report_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.jobId} ({self.status})"
+
+
+class ArchivedSession(models.Model):
+    """
+    Attendance of a closed session packed into one row (see archive.py).
+    roster holds the IDs of the students that had a record, ascending, as
+    little-endian uint32; bit i of presentBits (LSB first) is roster[i].
+    """
+    session = models.OneToOneField(
+        AttendanceSession, on_delete=models.CASCADE, primary_key=True, related_name='archive'
+    )
+    roster = models.BinaryField()
+    presentBits = models.BinaryField()
+    # Number of records the session had and how many were present (popcount of presentBits)
+    rosterSize = models.PositiveIntegerField()
+    presentCount = models.PositiveIntegerField()
+    archivedAt = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'attendance_archive'
+
+    @classmethod
+    def pack(cls, session_id, statuses):
+        """Build the archive row of a session from {student_id: status}"""
+        student_ids = sorted(statuses)
+        bits = 0
+        for index, student_id in enumerate(student_ids):
+            if statuses[student_id]:
+                bits |= 1 << index
+        return cls(
+            session_id=session_id,
+            roster=struct.pack(f'<{len(student_ids)}I', *student_ids),
+            presentBits=bits.to_bytes((len(student_ids) + 7) // 8, 'little'),
+            rosterSize=len(student_ids),
+            presentCount=bin(bits).count('1'),
+        )
+
+    def student_ids(self):
+        roster = bytes(self.roster)
+        return list(struct.unpack(f'<{len(roster) // 4}I', roster))
+
+    def bits(self):
+        return int.from_bytes(bytes(self.presentBits), 'little')
+
+    def present_indexes(self):
+        """Roster positions of the present students, read straight off the set bits"""
+        bits = self.bits()
+        while bits:
+            lowest = bits & -bits
+            yield lowest.bit_length() - 1
+            bits ^= lowest
+
+    def statuses(self):
+        """Decode to {student_id: status}"""
+        student_ids = self.student_ids()
+        statuses = dict.fromkeys(student_ids, False)
+        for index in self.present_indexes():
+            statuses[student_ids[index]] = True
+        return statuses
+
+    def __str__(self):
+        return f"Archive of session {self.session_id} ({self.presentCount}/{self.rosterSize} present)"
+
+
+class AttendanceTrend(models.Model):
+    """Present and marked record counts of a class per week or month (see trends.py)"""
+    PERIOD_CHOICES = [
+        ('week', 'Week'),
+        ('month', 'Month'),
+    ]
+
+    trendId = models.AutoField(primary_key=True)
+    classroom = models.ForeignKey(Classroom, on_delete=models.CASCADE)
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    # Monday of the week or first day of the month
+    periodStart = models.DateField()
+    present = models.PositiveIntegerField(default=0)
+    marked = models.PositiveIntegerField(default=0)
+    lastUpdated = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'attendance_trend'
+        unique_together = ['classroom', 'period', 'periodStart']
+        indexes = [
+            # Series of every class for a period type, oldest bucket first
+            models.Index(fields=['period', 'periodStart'], name='trend_period_start_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.classroom_id} {self.period} of {self.periodStart}: {self.present}/{self.marked}"
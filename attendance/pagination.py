@@ -0,0 +1,157 @@
+"""
+Keyset (cursor) pagination for list views.
+
+Instead of OFFSET, each page starts right after the sort key of the last row
+of the previous page, so with an index on the sort key every page costs the
+same no matter how deep the user has paged. The ordering must end with a
+unique field so that keys never tie.
+"""
+import base64
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    def __init__(self, queryset, ordering, per_page=50):
+        """
+        Args:
+            queryset: QuerySet to paginate (filters already applied); a .values()
+                queryset must include the ordering fields
+            ordering: field names, '-' prefix for descending; the last one must be unique
+            per_page: rows per page
+        """
+        self.queryset = queryset
+        self.ordering = list(ordering)
+        self.per_page = per_page
+        self.fields = [
+            queryset.model._meta.get_field(name.lstrip('-')) for name in self.ordering
+        ]
+
+    def encode_cursor(self, obj, direction, inclusive=False):
+        """
+        Args:
+            obj: row (instance or .values() dict) the page starts after or ends before
+            direction: 'next' or 'prev'
+            inclusive: the page includes obj itself
+        """
+        if isinstance(obj, dict):
+            # Row from .values(); rebuild just enough of an instance to serialize the key
+            obj = self.queryset.model(**{field.attname: obj[field.attname] for field in self.fields})
+        payload = {'k': [field.value_to_string(obj) for field in self.fields], 'd': direction}
+        if inclusive:
+            payload['i'] = 1
+        payload = json.dumps(payload, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def _key_cursor(self, values, direction):
+        """Cursor for the page starting (or ending) with the row whose key is `values`"""
+        row = self.queryset.model(**{field.attname: value for field, value in zip(self.fields, values)})
+        return self.encode_cursor(row, direction, inclusive=True)
+
+    def decode_cursor(self, cursor):
+        """
+        Returns:
+            tuple: (key values, direction, inclusive)
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            values = [field.to_python(value) for field, value in zip(self.fields, payload['k'])]
+            direction = payload['d']
+            inclusive = bool(payload.get('i'))
+        except (ValueError, KeyError, TypeError, AttributeError, ValidationError):
+            raise InvalidCursor(cursor)
+        if len(values) != len(self.fields) or direction not in ('next', 'prev'):
+            raise InvalidCursor(cursor)
+        return values, direction, inclusive
+
+    def _after(self, values, reverse, inclusive=False):
+        """
+        Q matching rows strictly after `values` in the ordering (before it when
+        reverse); inclusive also matches the row with exactly these values
+        """
+        condition = Q()
+        for position in range(len(self.ordering) - 1, -1, -1):
+            name = self.ordering[position].lstrip('-')
+            descending = self.ordering[position].startswith('-') != reverse
+            lookup = 'lt' if descending else 'gt'
+            if inclusive and position == len(self.ordering) - 1:
+                lookup += 'e'
+            term = Q(**{f"{name}__{lookup}": values[position]})
+            for earlier in range(position):
+                term &= Q(**{self.ordering[earlier].lstrip('-'): values[earlier]})
+            condition |= term
+        # Redundant bound on the leading column lets the planner use an index range scan
+        lead = self.ordering[0].lstrip('-')
+        lead_descending = self.ordering[0].startswith('-') != reverse
+        return Q(**{f"{lead}__{'lte' if lead_descending else 'gte'}": values[0]}) & condition
+
+    def page(self, cursor=None):
+        """
+        Return the page after (or before) the cursor
+        Raises:
+            InvalidCursor: if the cursor cannot be decoded
+        """
+        if not cursor:
+            rows = list(self.queryset.order_by(*self.ordering)[:self.per_page + 1])
+            more = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            return KeysetPage(
+                rows,
+                self.encode_cursor(rows[-1], 'next') if more else None,
+                None,
+            )
+
+        values, direction, inclusive = self.decode_cursor(cursor)
+        if direction == 'next':
+            rows = list(
+                self.queryset.filter(self._after(values, reverse=False, inclusive=inclusive))
+                .order_by(*self.ordering)[:self.per_page + 1]
+            )
+            more = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            return KeysetPage(
+                rows,
+                self.encode_cursor(rows[-1], 'next') if more else None,
+                # Nothing left after the cursor (rows were deleted): lead back to the page ending with its row
+                self.encode_cursor(rows[0], 'prev') if rows else self._key_cursor(values, 'prev'),
+            )
+
+        reversed_ordering = [name[1:] if name.startswith('-') else f"-{name}" for name in self.ordering]
+        rows = list(
+            self.queryset.filter(self._after(values, reverse=True, inclusive=inclusive))
+            .order_by(*reversed_ordering)[:self.per_page + 1]
+        )
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return KeysetPage(
+            rows,
+            self.encode_cursor(rows[-1], 'next') if rows else self._key_cursor(values, 'next'),
+            self.encode_cursor(rows[0], 'prev') if more else None,
+        )
@@ -0,0 +1,159 @@
+"""
+Disk cache for rendered session PDFs.
+
+Each session has one file, named after the session, that starts with the
+fingerprint of what it was rendered from; a file whose fingerprint differs
+from the session's current one is a miss, so a stale entry can never be
+served. The fingerprint is built from the session row alone (its header
+fields and lastUpdated, which every change to its records or to the names
+of its students bumps), so answering a conditional request reads no
+records. Marking attendance unlinks the session's file right away to free
+space, and the directory is kept under a size limit by evicting the least
+recently used files (hits refresh a file's modification time).
+"""
+import hashlib
+import os
+import tempfile
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from .models import AttendanceRecord, AttendanceSession, Classroom
+
+# Bump when the PDF layout or the cache file format changes so old renders are not reused
+RENDER_VERSION = 2
+
+HITS_KEY = 'pdfcache:hits'
+MISSES_KEY = 'pdfcache:misses'
+
+
+def session_fingerprint(session):
+    """
+    Hash everything the session PDF depends on
+    Args:
+        session: AttendanceSession with classroom and subject loaded
+    Returns:
+        str: hex digest used as cache key and ETag
+    """
+    return hashlib.sha1(repr((
+        RENDER_VERSION,
+        session.pk,
+        session.classroom.className,
+        session.classroom.subject.subName,
+        session.date.isoformat(),
+        session.startTime.isoformat(),
+        session.endTime.isoformat(),
+        session.lastUpdated.isoformat() if session.lastUpdated else None,
+    )).encode()).hexdigest()
+
+
+def students_changed(student_ids):
+    """
+    Bump lastUpdated of the sessions whose PDF shows these students, e.g.
+    after they were renamed or before they are deleted: sessions with their
+    records and archived sessions of their classes
+    Args:
+        student_ids: IDs of the students
+    """
+    student_ids = list(student_ids)
+    if not student_ids:
+        return
+    AttendanceSession.objects.filter(
+        Q(pk__in=AttendanceRecord.objects.filter(student_id__in=student_ids).values('session_id'))
+        | Q(
+            classroom__in=Classroom.students.through.objects.filter(student_id__in=student_ids).values('classroom_id'),
+            archive__isnull=False,
+        )
+    ).update(lastUpdated=timezone.now())
+
+
+def _increment(key):
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(key, 1, timeout=None)
+
+
+class PDFCache:
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, session_id):
+        return os.path.join(self.directory, f"session-{session_id}.pdf")
+
+    def _entries(self):
+        try:
+            return [entry for entry in os.scandir(self.directory) if entry.name.endswith('.pdf')]
+        except FileNotFoundError:
+            return []
+
+    def get(self, session_id, fingerprint):
+        """Return the cached bytes or None, counting the hit or miss"""
+        path = self._path(session_id)
+        try:
+            with open(path, 'rb') as handle:
+                stored = handle.readline().rstrip(b'\n').decode()
+                data = handle.read() if stored == fingerprint else None
+            if data is not None:
+                os.utime(path)
+        except FileNotFoundError:
+            data = None
+        _increment(MISSES_KEY if data is None else HITS_KEY)
+        return data
+
+    def put(self, session_id, fingerprint, data):
+        """Store a render atomically, replacing any older render of the same session"""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(fingerprint.encode() + b'\n')
+            handle.write(data)
+        os.replace(temp_path, self._path(session_id))
+        self.evict()
+
+    def invalidate(self, session_id):
+        self._remove(self._path(session_id))
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def stats(self):
+        sizes = []
+        for entry in self._entries():
+            try:
+                sizes.append(entry.stat().st_size)
+            except FileNotFoundError:
+                continue
+        return {
+            'hits': cache.get(HITS_KEY, 0),
+            'misses': cache.get(MISSES_KEY, 0),
+            'entries': len(sizes),
+            'bytes': sum(sizes),
+            'max_bytes': self.max_bytes,
+        }
+
+
+def get_pdf_cache():
+    return PDFCache(settings.ATTENDANCE_PDF_CACHE_DIR, settings.ATTENDANCE_PDF_CACHE_MAX_BYTES)
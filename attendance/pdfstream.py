@@ -0,0 +1,103 @@
+"""
+Minimal incremental PDF writer.
+
+reportlab's canvas keeps the whole document in memory until save(), so it
+cannot hand out bytes before the last page is drawn. This writer emits each
+page as soon as it is finished, which lets large reports be sent with a
+StreamingHttpResponse. Only the standard Helvetica fonts, text and lines are
+supported, which is all the tabular reports need.
+"""
+import zlib
+
+FONTS = {
+    'Helvetica': 'F1',
+    'Helvetica-Bold': 'F2',
+}
+
+
+def _escape(text):
+    data = str(text).encode('cp1252', 'replace')
+    return data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+class PDFPage:
+    """Collects the drawing operators of one page (coordinates in points, origin bottom-left)"""
+
+    def __init__(self):
+        self.ops = []
+        self.font = ('Helvetica', 10)
+
+    def setFont(self, name, size):
+        self.font = (name, size)
+
+    def drawString(self, x, y, text):
+        name, size = self.font
+        self.ops.append(b'BT /%s %.1f Tf %.2f %.2f Td (%s) Tj ET' % (
+            FONTS[name].encode(), size, x, y, _escape(text)))
+
+    def line(self, x1, y1, x2, y2):
+        self.ops.append(b'%.2f %.2f m %.2f %.2f l S' % (x1, y1, x2, y2))
+
+    def content(self):
+        return b'\n'.join(self.ops)
+
+
+class StreamingPDF:
+    """
+    Writes a PDF object by object.
+    Usage: yield begin(), then add_page(page) for each page, then finish().
+    """
+
+    def __init__(self, pagesize, title=None):
+        self.width, self.height = pagesize
+        self.title = title
+        self.offset = 0
+        self.offsets = {}
+        self.page_ids = []
+        # 1: catalog, 2: page tree, 3-4: fonts, 5: info; pages start at 6
+        self.next_id = 6
+
+    def _object(self, obj_id, body):
+        self.offsets[obj_id] = self.offset
+        data = b'%d 0 obj\n' % obj_id + body + b'\nendobj\n'
+        self.offset += len(data)
+        return data
+
+    def begin(self):
+        header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+        self.offset = len(header)
+        chunks = [header, self._object(1, b'<< /Type /Catalog /Pages 2 0 R >>')]
+        for obj_id, font in ((3, b'Helvetica'), (4, b'Helvetica-Bold')):
+            chunks.append(self._object(
+                obj_id, b'<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>' % font))
+        info = b'<< /Producer (Attendance Management System)'
+        if self.title:
+            info += b' /Title (%s)' % _escape(self.title)
+        chunks.append(self._object(5, info + b' >>'))
+        return b''.join(chunks)
+
+    def add_page(self, page):
+        stream = zlib.compress(page.content())
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self.page_ids.append(page_id)
+        return self._object(
+            content_id,
+            b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(stream) + stream + b'\nendstream',
+        ) + self._object(
+            page_id,
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] '
+            b'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>'
+            % (self.width, self.height, content_id),
+        )
+
+    def finish(self):
+        kids = b' '.join(b'%d 0 R' % page_id for page_id in self.page_ids)
+        data = self._object(2, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self.page_ids)))
+        xref_offset = self.offset
+        size = self.next_id
+        xref = [b'xref\n0 %d\n' % size, b'0000000000 65535 f \n']
+        for obj_id in range(1, size):
+            xref.append(b'%010d 00000 n \n' % self.offsets[obj_id])
+        trailer = b'trailer\n<< /Size %d /Root 1 0 R /Info 5 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (size, xref_offset)
+        return data + b''.join(xref) + trailer
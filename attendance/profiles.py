@@ -0,0 +1,132 @@
+"""
+Per-student attendance history across all of a student's classes.
+
+get_histories() answers for a batch of students with one query over the
+AttendanceSummary rows of their classes, which already hold the held and
+present counts of each (student, class) pair, archived sessions included.
+Each history is cached per student together with a version token of each
+of its classes. Writing attendance, sessions or rosters of a class replaces
+that class's token (invalidate_classrooms()), which makes every cached
+history that includes the class stale without having to find its students.
+Students joining or leaving a class are dropped with invalidate_students().
+"""
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from .models import AttendanceSummary
+
+
+def _cache():
+    return caches[settings.ATTENDANCE_PROFILE_CACHE]
+
+
+def _key(student_id):
+    return f"profile:student:{student_id}"
+
+
+def _version_key(classroom_id):
+    return f"profile:classroom:{classroom_id}"
+
+
+def _versions(classroom_ids):
+    """Current version token of each class, creating missing ones"""
+    keys = {classroom_id: _version_key(classroom_id) for classroom_id in classroom_ids}
+    found = _cache().get_many(keys.values())
+    missing = {key: uuid.uuid4().hex for key in keys.values() if key not in found}
+    if missing:
+        # add() keeps a token another process created in the meantime
+        for key, token in missing.items():
+            _cache().add(key, token, None)
+        found.update(_cache().get_many(missing))
+    return {classroom_id: found.get(key) for classroom_id, key in keys.items()}
+
+
+def percentage(present, held):
+    return round(present * 100.0 / held, 2) if held else 0.0
+
+
+def load_histories(student_ids):
+    """
+    Read the attendance of students in each of their classes
+    Args:
+        student_ids: IDs of the students
+    Returns:
+        dict: student ID -> history dict with 'classes' (per class counts and
+            percentage, by class name) and 'overall' counts and percentage
+    """
+    histories = {
+        student_id: {'studId': student_id, 'classes': [], 'overall': {'held': 0, 'present': 0, 'percentage': 0.0}}
+        for student_id in student_ids
+    }
+    rows = AttendanceSummary.objects.filter(student_id__in=list(histories)).order_by(
+        'student_id', 'classroom__className', 'classroom_id'
+    ).values_list(
+        'student_id', 'classroom_id', 'classroom__className', 'classroom__subject__subName',
+        'classroom__year', 'classroom__semester', 'sessionsHeld', 'sessionsPresent',
+    )
+    for student_id, classroom_id, class_name, subject_name, year, semester, held, present in rows:
+        history = histories[student_id]
+        history['classes'].append({
+            'classId': classroom_id, 'className': class_name, 'subName': subject_name,
+            'year': year, 'semester': semester,
+            'held': held, 'present': present, 'percentage': percentage(present, held),
+        })
+        history['overall']['held'] += held
+        history['overall']['present'] += present
+    for history in histories.values():
+        overall = history['overall']
+        overall['percentage'] = percentage(overall['present'], overall['held'])
+    return histories
+
+
+def get_histories(student_ids):
+    """
+    Return the attendance histories of students, from the cache when possible
+    Args:
+        student_ids: IDs of the students
+    Returns:
+        dict: student ID -> history (see load_histories)
+    """
+    student_ids = list(dict.fromkeys(student_ids))
+    cached = _cache().get_many([_key(student_id) for student_id in student_ids])
+    entries = {student_id: cached.get(_key(student_id)) for student_id in student_ids}
+
+    # A cached history is only valid while every one of its classes still has the version it was built with
+    classroom_ids = {classroom_id for entry in entries.values() if entry for classroom_id in entry['versions']}
+    current = _versions(classroom_ids) if classroom_ids else {}
+    histories = {}
+    for student_id, entry in entries.items():
+        if entry and all(current[classroom_id] == version for classroom_id, version in entry['versions'].items()):
+            histories[student_id] = entry['history']
+
+    missing = [student_id for student_id in student_ids if student_id not in histories]
+    if missing:
+        loaded = load_histories(missing)
+        versions = _versions({row['classId'] for history in loaded.values() for row in history['classes']})
+        _cache().set_many({
+            _key(student_id): {
+                'history': history,
+                'versions': {row['classId']: versions[row['classId']] for row in history['classes']},
+            }
+            for student_id, history in loaded.items()
+        }, settings.ATTENDANCE_PROFILE_CACHE_TIMEOUT)
+        histories.update(loaded)
+    return histories
+
+
+def invalidate_classrooms(classroom_ids):
+    """Make the cached histories of every student in the given classes stale"""
+    keys = [_version_key(classroom_id) for classroom_id in set(classroom_ids) if classroom_id is not None]
+    if keys:
+        _cache().delete_many(keys)
+        # Again after commit, in case a read during the transaction cached the old rows
+        transaction.on_commit(lambda: _cache().delete_many(keys))
+
+
+def invalidate_students(student_ids):
+    """Drop the cached histories of the given students, e.g. when they change classes"""
+    keys = [_key(student_id) for student_id in set(student_ids)]
+    if keys:
+        _cache().delete_many(keys)
+        transaction.on_commit(lambda: _cache().delete_many(keys))
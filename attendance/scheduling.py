@@ -0,0 +1,117 @@
+"""
+Recurring timetable generation for attendance sessions.
+A rule is expanded to concrete sessions in memory, checked against existing
+sessions with one date-range query per classroom, and written with
+bulk_create.
+"""
+import datetime
+from django.db import transaction
+from . import analytics, dashboard, profiles
+from .models import AttendanceSession
+from .services import SummaryService, CounterService
+
+WEEKDAY_CHOICES = [
+    (0, 'Monday'),
+    (1, 'Tuesday'),
+    (2, 'Wednesday'),
+    (3, 'Thursday'),
+    (4, 'Friday'),
+    (5, 'Saturday'),
+    (6, 'Sunday'),
+]
+
+
+class RecurrenceRule:
+    """Weekly pattern: the same time slot on the given weekdays between two dates"""
+
+    def __init__(self, weekdays, start_time, end_time, start_date, end_date, holidays=()):
+        self.weekdays = set(weekdays)
+        self.start_time = start_time
+        self.end_time = end_time
+        self.start_date = start_date
+        self.end_date = end_date
+        self.holidays = set(holidays)
+
+    def dates(self):
+        day = self.start_date
+        while day <= self.end_date:
+            if day.weekday() in self.weekdays and day not in self.holidays:
+                yield day
+            day += datetime.timedelta(days=1)
+
+
+class ClassroomPlan:
+    """Sessions to create for one classroom and the slots skipped because of clashes"""
+
+    def __init__(self, classroom):
+        self.classroom = classroom
+        self.sessions = []
+        self.clashes = []  # (date, existing session)
+
+
+def plan_timetable(classrooms, rule):
+    """
+    Expand a rule for each classroom without writing anything
+    Args:
+        classrooms: iterable of Classroom objects
+        rule: RecurrenceRule
+    Returns:
+        list: ClassroomPlan per classroom
+    Raises:
+        ValidationError: if the time slot fails AttendanceSession.clean()
+    """
+    dates = list(rule.dates())
+    plans = []
+    for classroom in classrooms:
+        plan = ClassroomPlan(classroom)
+        existing = {}
+        for session in AttendanceSession.objects.filter(
+            classroom=classroom, date__range=(rule.start_date, rule.end_date)
+        ).only('sessionId', 'date', 'startTime', 'endTime'):
+            existing.setdefault(session.date, []).append(session)
+
+        for day in dates:
+            session = AttendanceSession(
+                classroom=classroom, date=day, startTime=rule.start_time, endTime=rule.end_time
+            )
+            session.clean()
+            clash = next((
+                other for other in existing.get(day, [])
+                if other.startTime < rule.end_time and rule.start_time < other.endTime
+            ), None)
+            if clash is not None:
+                plan.clashes.append((day, clash))
+            else:
+                plan.sessions.append(session)
+        plans.append(plan)
+    return plans
+
+
+@transaction.atomic
+def create_timetable(plans):
+    """
+    Write planned sessions and count them in the attendance summaries
+    Returns:
+        int: Number of sessions created
+    """
+    created = 0
+    day = dashboard.today()
+    scheduled_today = []
+    per_day = {}
+    for plan in plans:
+        if not plan.sessions:
+            continue
+        AttendanceSession.objects.bulk_create(plan.sessions, batch_size=500)
+        SummaryService.session_created(plan.sessions[0], count=len(plan.sessions))
+        created += len(plan.sessions)
+        for session in plan.sessions:
+            name = CounterService.daily('sessions', session.date)
+            per_day[name] = per_day.get(name, 0) + 1
+        if any(session.date == day for session in plan.sessions):
+            scheduled_today.append(plan.classroom.classId)
+    # bulk_create sends no signals
+    CounterService.add_many(per_day)
+    dashboard.invalidate_classrooms(scheduled_today)
+    analytics.invalidate(plan.classroom.classId for plan in plans if plan.sessions)
+    profiles.invalidate_classrooms(plan.classroom.classId for plan in plans if plan.sessions)
+    return created
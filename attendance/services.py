@@ -1,14 +1,24 @@
+import datetime
 from django.db import transaction
-from django.db.models import Count, Q
+from django.db.models import Count, Exists, F, OuterRef, Q, Value, DecimalField, FilteredRelation
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from io import BytesIO
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.units import inch
-from .models import AttendanceRecord, AttendanceSession, Student, Classroom
+from .pdfstream import StreamingPDF, PDFPage
+from .pdfcache import get_pdf_cache
+from . import analytics, archive, profiles, trends
+from .models import (
+    AttendanceRecord, AttendanceSession, AttendanceSummary, Student, Classroom, Department,
+    Teacher, Subject, Counter, SyncReceipt, ArchivedSession,
+)
 
 class AttendanceService:
     """Service class for attendance-related business logic"""
     
+    # Rows per INSERT/UPDATE statement; keeps large rosters under SQLite's variable limit
+    BULK_BATCH_SIZE = 500
+
     @staticmethod
     @transaction.atomic
     def mark_attendance(session_id, present_student_ids):
@@ -20,23 +30,164 @@ class AttendanceService:
         """
         try:
             session = AttendanceSession.objects.get(pk=session_id)
-            class_students = session.classroom.students.all()
-            
-            # Create or update attendance records
-            for student in class_students:
-                status = student.studId in present_student_ids
-                AttendanceRecord.objects.update_or_create(
-                    session=session,
-                    student=student,
-                    defaults={'status': status}
-                )
-            
+            AttendanceService.bulk_mark_attendance(session, present_student_ids)
             return True, "Attendance marked successfully"
         except AttendanceSession.DoesNotExist:
             return False, "Session not found"
         except Exception as e:
             return False, f"Error marking attendance: {str(e)}"
-    
+
+    @staticmethod
+    @transaction.atomic
+    def bulk_mark_attendance(session, present_student_ids):
+        """
+        Write the attendance of a whole roster with a fixed number of queries
+        Args:
+            session: AttendanceSession object
+            present_student_ids: Iterable of student IDs marked as present
+        Returns:
+            dict: Number of records created, updated and left unchanged
+        """
+        present = set(present_student_ids)
+        roster_ids = session.classroom.students.values_list('studId', flat=True)
+        statuses = {student_id: student_id in present for student_id in roster_ids}
+        return AttendanceService.write_statuses(session, statuses)
+
+    @staticmethod
+    @transaction.atomic
+    def apply_changes(session, present_ids=(), absent_ids=()):
+        """
+        Apply only the checkboxes a teacher toggled, so the work done scales
+        with the size of the change instead of the class
+        Args:
+            session: AttendanceSession object
+            present_ids: Student IDs switched to present
+            absent_ids: Student IDs switched to absent
+        Returns:
+            dict: Number of records created, updated and left unchanged
+        Raises:
+            ValueError: if an ID is in both lists or not on the class roster
+        """
+        statuses = {student_id: False for student_id in absent_ids}
+        for student_id in present_ids:
+            if student_id in statuses:
+                raise ValueError(f"Student {student_id} is marked both present and absent")
+            statuses[student_id] = True
+        if not statuses:
+            return {'created': 0, 'updated': 0, 'unchanged': 0}
+
+        enrolled = set(
+            Student.objects.filter(
+                classroom=session.classroom_id, studId__in=list(statuses)
+            ).values_list('studId', flat=True)
+        )
+        unknown = sorted(set(statuses) - enrolled)
+        if unknown:
+            raise ValueError(f"Students not in this class: {', '.join(map(str, unknown))}")
+        return AttendanceService.write_statuses(session, statuses)
+
+    @staticmethod
+    @transaction.atomic
+    def write_statuses(session, statuses):
+        """
+        Apply a {student_id: status} mapping to the records of a session
+        (see write_many)
+        Args:
+            session: AttendanceSession object
+            statuses: dict mapping student IDs to True (present) / False (absent)
+        Returns:
+            dict: Number of records created, updated and left unchanged
+        """
+        return AttendanceService.write_many([(session, statuses)])[session.pk]
+
+    @staticmethod
+    @transaction.atomic
+    def write_many(changes, marked_at=None):
+        """
+        Apply {student_id: status} mappings to the records of several sessions.
+        Existing records of all sessions are loaded in one query and only rows
+        whose status differs are written: one batched INSERT for new rows and
+        at most one UPDATE per target status. The attendance summaries are
+        adjusted by the resulting present/absent deltas in the same transaction.
+        Args:
+            changes: list of (AttendanceSession, statuses) pairs, one per session
+            marked_at: dict of session ID -> time the attendance was taken
+                (default now), stored as the sessions' markedAt
+        Returns:
+            dict: session ID -> number of records created, updated and left unchanged
+        """
+        batch = AttendanceService.BULK_BATCH_SIZE
+        records = AttendanceRecord.objects.filter(session_id__in=[session.pk for session, _ in changes])
+        student_ids = {student_id for _, statuses in changes for student_id in statuses}
+        if len(student_ids) <= batch:
+            # Small changes only read their own rows; whole rosters read the sessions
+            records = records.filter(student_id__in=list(student_ids))
+        existing = {
+            (session_id, student_id): (record_id, status)
+            for record_id, session_id, student_id, status in records.values_list(
+                'recordId', 'session_id', 'student_id', 'status'
+            )
+        }
+
+        to_create = []
+        to_present = []
+        to_absent = []
+        # (classroom_id, student_id) -> change in present count
+        present_deltas = {}
+        # (classroom_id, date) -> change in present and marked records, for the trend buckets
+        trend_deltas = {}
+        marked = {}
+        results = {}
+        for session, statuses in changes:
+            counts = results[session.pk] = {'created': 0, 'updated': 0, 'unchanged': 0}
+            trend = trend_deltas.setdefault((session.classroom_id, session.date), [0, 0])
+            for student_id, status in statuses.items():
+                key = (session.classroom_id, student_id)
+                if (session.pk, student_id) not in existing:
+                    to_create.append(AttendanceRecord(session=session, student_id=student_id, status=status))
+                    counts['created'] += 1
+                    trend[1] += 1
+                    if status:
+                        present_deltas[key] = present_deltas.get(key, 0) + 1
+                        trend[0] += 1
+                    continue
+                record_id, current = existing[(session.pk, student_id)]
+                if current == status:
+                    counts['unchanged'] += 1
+                    continue
+                (to_present if status else to_absent).append(record_id)
+                counts['updated'] += 1
+                present_deltas[key] = present_deltas.get(key, 0) + (1 if status else -1)
+                trend[0] += 1 if status else -1
+            if counts['created']:
+                name = CounterService.daily('marked', session.date)
+                marked[name] = marked.get(name, 0) + counts['created']
+
+        AttendanceRecord.objects.bulk_create(to_create, batch_size=batch)
+        for status, record_ids in ((True, to_present), (False, to_absent)):
+            for start in range(0, len(record_ids), batch):
+                AttendanceRecord.objects.filter(recordId__in=record_ids[start:start + batch]).update(status=status)
+
+        now = timezone.now()
+        sessions = [session for session, _ in changes]
+        for session in sessions:
+            session.markedAt = (marked_at or {}).get(session.pk, now)
+        AttendanceSession.objects.bulk_update(sessions, ['markedAt'], batch_size=batch)
+
+        CounterService.add_many(marked)
+        SummaryService.apply_present_changes(present_deltas)
+        changed = [session for session, _ in changes if results[session.pk]['created'] or results[session.pk]['updated']]
+        if changed:
+            # Changes the sessions' PDF fingerprints; the cached renders are dropped to free space
+            AttendanceSession.objects.filter(pk__in=[session.pk for session in changed]).update(lastUpdated=now)
+        for session in changed:
+            session.lastUpdated = now
+            get_pdf_cache().invalidate(session.pk)
+        analytics.invalidate(session.classroom_id for session in changed)
+        profiles.invalidate_classrooms(session.classroom_id for session in changed)
+        trends.apply_changes(trend_deltas)
+        return results
+
     @staticmethod
     def get_attendance_percentage(student, classroom):
         """
@@ -48,25 +199,522 @@ class AttendanceService:
             float: Attendance percentage
         """
         try:
-            # Get all sessions for this class
-            sessions = AttendanceSession.objects.filter(classroom=classroom)
-            total_sessions = sessions.count()
-            
-            if total_sessions == 0:
-                return 0.0
-            
-            # Count present records
-            present_count = AttendanceRecord.objects.filter(
-                session__classroom=classroom,
-                student=student,
-                status=True
-            ).count()
-            
-            percentage = (present_count / total_sessions) * 100
-            return round(percentage, 2)
+            return AttendanceService.get_attendance_percentages([student], classroom).get(student.pk, 0.0)
         except Exception as e:
             return 0.0
 
+    @staticmethod
+    def get_attendance_percentages(students, classroom):
+        """
+        Calculate attendance percentages for many students of a class at once
+        Args:
+            students: Iterable of Student objects or student IDs
+            classroom: Classroom object
+        Returns:
+            dict: Student ID -> attendance percentage
+        """
+        student_ids = [getattr(student, 'pk', student) for student in students]
+        rows = AttendanceService.annotate_attendance(
+            Student.objects.filter(pk__in=student_ids), classroom
+        ).values_list('studId', 'percentage')
+        percentages = {student_id: 0.0 for student_id in student_ids}
+        percentages.update((student_id, float(percentage)) for student_id, percentage in rows)
+        return percentages
+
+    @staticmethod
+    def annotate_attendance(students, classroom):
+        """
+        Annotate a Student queryset with attendance figures for a class.
+        Figures are read from AttendanceSummary through a LEFT JOIN on its
+        (student, classroom) key, so no records are counted and students
+        without a summary row come out as 0%.
+        Args:
+            students: Student queryset
+            classroom: Classroom object or ID
+        Returns:
+            QuerySet: students annotated with present, total and percentage
+        """
+        return students.annotate(
+            summary=FilteredRelation(
+                'attendancesummary',
+                condition=Q(attendancesummary__classroom=classroom),
+            ),
+        ).annotate(
+            present=Coalesce(F('summary__sessionsPresent'), Value(0)),
+            total=Coalesce(F('summary__sessionsHeld'), Value(0)),
+        ).annotate(
+            # Rounded in SQL so threshold filters compare the same value that is displayed
+            percentage=Coalesce(
+                Round(
+                    Cast(F('present') * Value(100.0), DecimalField(max_digits=9, decimal_places=4))
+                    / NullIf(F('total'), Value(0)),
+                    2,
+                ),
+                Value(0),
+                output_field=DecimalField(max_digits=9, decimal_places=2),
+            ),
+        )
+
+class SummaryService:
+    """Keeps AttendanceSummary in step with sessions, rosters and records"""
+
+    @staticmethod
+    def apply_present_deltas(classroom_id, gained_student_ids, lost_student_ids):
+        """
+        Adjust present counts after records changed
+        Args:
+            classroom_id: ID of the class the records belong to
+            gained_student_ids: Students that went from absent/unmarked to present
+            lost_student_ids: Students that went from present to absent
+        """
+        deltas = {(classroom_id, student_id): 1 for student_id in gained_student_ids}
+        deltas.update({(classroom_id, student_id): -1 for student_id in lost_student_ids})
+        SummaryService.apply_present_changes(deltas)
+
+    @staticmethod
+    def apply_present_changes(deltas):
+        """
+        Adjust present counts across classes, one UPDATE per class and distinct delta
+        Args:
+            deltas: dict of (classroom_id, student_id) -> change in sessions present
+        """
+        groups = {}
+        for (classroom_id, student_id), delta in deltas.items():
+            if delta:
+                groups.setdefault((classroom_id, delta), []).append(student_id)
+        now = timezone.now()
+        batch = AttendanceService.BULK_BATCH_SIZE
+        for (classroom_id, delta), student_ids in groups.items():
+            for start in range(0, len(student_ids), batch):
+                AttendanceSummary.objects.filter(
+                    classroom_id=classroom_id,
+                    student_id__in=student_ids[start:start + batch],
+                ).update(sessionsPresent=F('sessionsPresent') + delta, lastUpdated=now)
+
+    @staticmethod
+    def session_created(session, count=1):
+        """Count newly scheduled session(s) of a class for every student in it"""
+        AttendanceSummary.objects.filter(classroom_id=session.classroom_id).update(
+            sessionsHeld=F('sessionsHeld') + count, lastUpdated=timezone.now()
+        )
+
+    @staticmethod
+    def session_deleted(session):
+        """Remove a session (and its present records) from the totals; call before deleting it"""
+        now = timezone.now()
+        summaries = AttendanceSummary.objects.filter(classroom_id=session.classroom_id)
+        archived = archive.session_statuses([session.pk]).get(session.pk)
+        if archived is None:
+            present = AttendanceRecord.objects.filter(session=session, status=True).values('student')
+        else:
+            present = [student_id for student_id, status in archived.items() if status]
+        summaries.filter(student__in=present).update(sessionsPresent=F('sessionsPresent') - 1)
+        summaries.update(sessionsHeld=F('sessionsHeld') - 1, lastUpdated=now)
+
+    @staticmethod
+    def students_enrolled(classroom, student_ids):
+        """
+        Create summary rows for students just added to a class
+        Args:
+            classroom: Classroom object
+            student_ids: IDs of the newly enrolled students
+        """
+        held = AttendanceSession.objects.filter(classroom=classroom).count()
+        # Students re-enrolled into a class may still have records from before
+        present = dict(
+            AttendanceRecord.objects.filter(
+                session__classroom=classroom, student_id__in=student_ids, status=True
+            ).order_by().values('student_id').annotate(count=Count('*')).values_list('student_id', 'count')
+        )
+        for student_id, count in archive.present_counts(classroom, student_ids).items():
+            present[student_id] = present.get(student_id, 0) + count
+        now = timezone.now()
+        AttendanceSummary.objects.bulk_create([
+            AttendanceSummary(
+                student_id=student_id, classroom=classroom,
+                sessionsHeld=held, sessionsPresent=present.get(student_id, 0), lastUpdated=now,
+            )
+            for student_id in student_ids
+        ], batch_size=AttendanceService.BULK_BATCH_SIZE, ignore_conflicts=True)
+        analytics.invalidate([classroom.pk])
+        profiles.invalidate_students(student_ids)
+
+    @staticmethod
+    def count_from_records(classroom):
+        """
+        Recompute the totals of a class from raw sessions, records and archived sessions
+        Args:
+            classroom: Classroom object
+        Returns:
+            dict: Student ID -> (sessions held, sessions present)
+        """
+        held = AttendanceSession.objects.filter(classroom=classroom).count()
+        students = classroom.students.annotate(
+            present=Count(
+                'attendancerecord',
+                filter=Q(attendancerecord__session__classroom=classroom, attendancerecord__status=True),
+            )
+        ).values_list('studId', 'present')
+        archived = archive.present_counts(classroom)
+        return {student_id: (held, present + archived.get(student_id, 0)) for student_id, present in students}
+
+    @staticmethod
+    @transaction.atomic
+    def sync_classroom(classroom, commit=True):
+        """
+        Rebuild the summary rows of a class, e.g. after its roster changed
+        Args:
+            classroom: Classroom object
+            commit: When False only report the drift without writing
+        Returns:
+            int: Number of rows that were missing, stale or no longer on the roster
+        """
+        expected = SummaryService.count_from_records(classroom)
+        current = {
+            student_id: (summary_id, held, present)
+            for summary_id, student_id, held, present in AttendanceSummary.objects.filter(
+                classroom=classroom
+            ).values_list('summaryId', 'student_id', 'sessionsHeld', 'sessionsPresent')
+        }
+
+        now = timezone.now()
+        to_create = []
+        to_update = []
+        for student_id, (held, present) in expected.items():
+            if student_id not in current:
+                to_create.append(AttendanceSummary(
+                    student_id=student_id, classroom=classroom,
+                    sessionsHeld=held, sessionsPresent=present, lastUpdated=now,
+                ))
+            elif current[student_id][1:] != (held, present):
+                to_update.append(AttendanceSummary(
+                    summaryId=current[student_id][0],
+                    sessionsHeld=held, sessionsPresent=present, lastUpdated=now,
+                ))
+        removed = [summary_id for student_id, (summary_id, _, _) in current.items() if student_id not in expected]
+        if not commit:
+            return len(to_create) + len(to_update) + len(removed)
+
+        batch = AttendanceService.BULK_BATCH_SIZE
+        AttendanceSummary.objects.bulk_create(to_create, batch_size=batch)
+        AttendanceSummary.objects.bulk_update(
+            to_update, ['sessionsHeld', 'sessionsPresent', 'lastUpdated'], batch_size=batch
+        )
+        for start in range(0, len(removed), batch):
+            AttendanceSummary.objects.filter(summaryId__in=removed[start:start + batch]).delete()
+        # Called after roster changes, which also change the class's matrix and its students' histories
+        analytics.invalidate([classroom.pk])
+        profiles.invalidate_classrooms([classroom.pk])
+        profiles.invalidate_students(
+            [summary.student_id for summary in to_create]
+            + [student_id for student_id, (summary_id, _, _) in current.items() if student_id not in expected]
+        )
+        return len(to_create) + len(to_update) + len(removed)
+
+class RosterService:
+    """Change versions of department rosters, used as HTTP validators by the roster API"""
+
+    @staticmethod
+    def touch(department_ids):
+        """
+        Mark department rosters as changed
+        Args:
+            department_ids: IDs of departments whose students changed (None entries are ignored)
+        """
+        department_ids = {department_id for department_id in department_ids if department_id is not None}
+        if department_ids:
+            Department.objects.filter(deptId__in=department_ids).update(
+                rosterVersion=F('rosterVersion') + 1, rosterUpdated=timezone.now()
+            )
+
+    @staticmethod
+    def state(department_id):
+        """
+        Returns:
+            tuple: (version, last change) of the roster, or None for an unknown department
+        """
+        return Department.objects.filter(deptId=department_id).values_list('rosterVersion', 'rosterUpdated').first()
+
+
+class CounterService:
+    """
+    Row counts behind the admin dashboard. Model totals are named after the
+    model ('students'); daily counts are '<name>:<YYYY-MM-DD>'. Writers adjust
+    counters inside their own transaction with add(); a counter that has no row
+    yet is computed from the tables the first time it is read, so add() only
+    touches existing rows and daily counters need no setup. The
+    reconcile_counters command repairs any drift.
+    """
+    TOTALS = {
+        'students': Student,
+        'teachers': Teacher,
+        'classes': Classroom,
+        'subjects': Subject,
+    }
+    # Daily counter name -> count for a date
+    DAILY = {
+        'sessions': lambda day: AttendanceSession.objects.filter(date=day).count(),
+        # Archived sessions count the records they were packed from
+        'marked': lambda day: AttendanceRecord.objects.filter(session__date=day).count() + archive.marked_on(day),
+    }
+
+    @staticmethod
+    def daily(name, day):
+        return f"{name}:{day.isoformat()}"
+
+    @staticmethod
+    def total_name(model):
+        return next(name for name, counted in CounterService.TOTALS.items() if counted is model)
+
+    @staticmethod
+    def add(name, delta):
+        CounterService.add_many({name: delta})
+
+    @staticmethod
+    def add_many(deltas):
+        """
+        Adjust several counters, one UPDATE per distinct delta
+        Args:
+            deltas: dict of counter name -> change
+        """
+        by_delta = {}
+        for name, delta in deltas.items():
+            if delta:
+                by_delta.setdefault(delta, []).append(name)
+        now = timezone.now()
+        batch = AttendanceService.BULK_BATCH_SIZE
+        for delta, names in by_delta.items():
+            for start in range(0, len(names), batch):
+                Counter.objects.filter(name__in=names[start:start + batch]).update(
+                    value=F('value') + delta, lastUpdated=now
+                )
+
+    @staticmethod
+    def count_from_tables(name):
+        """Count a counter's rows directly"""
+        if name in CounterService.TOTALS:
+            return CounterService.TOTALS[name].objects.count()
+        prefix, day = name.split(':', 1)
+        return CounterService.DAILY[prefix](datetime.date.fromisoformat(day))
+
+    @staticmethod
+    def read(names):
+        """
+        Current values of several counters in one query; missing counters are computed and stored
+        Returns:
+            dict: counter name -> value
+        """
+        values = dict(Counter.objects.filter(name__in=names).values_list('name', 'value'))
+        missing = [name for name in names if name not in values]
+        if missing:
+            computed = [Counter(name=name, value=CounterService.count_from_tables(name)) for name in missing]
+            Counter.objects.bulk_create(computed, ignore_conflicts=True)
+            values.update((counter.name, counter.value) for counter in computed)
+        return values
+
+    @staticmethod
+    def reconcile(commit=True):
+        """
+        Recount every stored counter
+        Args:
+            commit: Write corrected values; False only reports
+        Returns:
+            list: (name, stored value, counted value) for counters that had drifted
+        """
+        # Create missing totals and today's daily counters, so the first dashboard view of the day reads only
+        today = timezone.now().date()
+        CounterService.read(
+            list(CounterService.TOTALS) + [CounterService.daily(name, today) for name in CounterService.DAILY]
+        )
+        drift = []
+        for name in Counter.objects.order_by('name').values_list('name', flat=True):
+            # Holding the row lock while counting orders the recount with concurrent add()s
+            with transaction.atomic():
+                counter = Counter.objects.select_for_update().filter(name=name).first()
+                if counter is None:
+                    continue
+                counted = CounterService.count_from_tables(name)
+                if counted != counter.value:
+                    drift.append((name, counter.value, counted))
+                    if commit:
+                        counter.value = counted
+                        counter.lastUpdated = timezone.now()
+                        counter.save(update_fields=['value', 'lastUpdated'])
+        return drift
+
+
+class SyncService:
+    """
+    Batch sync for devices that mark attendance offline. Each entry carries a
+    client generated idempotency key, the session, the time it was marked on
+    the device and the students marked present/absent:
+
+        {"key": "...", "session_id": 12, "marked_at": "2025-01-31T09:05:00+05:30",
+         "present": [1, 2], "absent": [3]}
+
+    Conflicts are resolved per session by last write: an entry marked before
+    the session's markedAt is reported as stale and not applied. Outcomes of
+    applied and stale entries are kept, so a resent key returns the original
+    outcome instead of writing again.
+    """
+    MAX_KEY_LENGTH = 64
+    # Device clocks may run slightly ahead of the server
+    CLOCK_SKEW = datetime.timedelta(minutes=5)
+
+    @staticmethod
+    def parse_entry(entry):
+        """
+        Validate the shape of one entry
+        Returns:
+            dict: key, session_id, marked_at and statuses ({student_id: status})
+        Raises:
+            ValueError: with a message for the client
+        """
+        if not isinstance(entry, dict):
+            raise ValueError("Entry must be an object")
+        key = entry.get('key')
+        if not isinstance(key, str) or not 0 < len(key) <= SyncService.MAX_KEY_LENGTH:
+            raise ValueError(f"key must be a string of 1-{SyncService.MAX_KEY_LENGTH} characters")
+        try:
+            session_id = int(entry['session_id'])
+            marked_at = parse_datetime(entry['marked_at'])
+            if not isinstance(entry.get('present', []), list) or not isinstance(entry.get('absent', []), list):
+                raise TypeError()
+            present = [int(student_id) for student_id in entry.get('present', [])]
+            absent = [int(student_id) for student_id in entry.get('absent', [])]
+        except (KeyError, ValueError, TypeError):
+            raise ValueError("Expected session_id, marked_at and present/absent lists of student ids")
+        if marked_at is None:
+            raise ValueError("marked_at must be an ISO 8601 date and time")
+        if timezone.is_naive(marked_at):
+            marked_at = timezone.make_aware(marked_at)
+
+        statuses = {student_id: False for student_id in absent}
+        for student_id in present:
+            if student_id in statuses:
+                raise ValueError(f"Student {student_id} is marked both present and absent")
+            statuses[student_id] = True
+        return {'key': key, 'session_id': session_id, 'marked_at': marked_at, 'statuses': statuses}
+
+    @staticmethod
+    @transaction.atomic
+    def sync(user, entries):
+        """
+        Validate and apply a batch of offline entries in one transaction.
+        Sessions, roster membership and earlier receipts are each read with one
+        query for the whole batch; accepted entries are written together with
+        AttendanceService.write_many.
+        Args:
+            user: User of the teacher syncing; only their classes' sessions are accepted
+            entries: list of entry dicts as sent by the device
+        Returns:
+            list: outcome dict per entry, in order, with 'status' one of
+                'applied', 'stale' or 'rejected' ('replayed': True for resent keys)
+        """
+        outcomes = [None] * len(entries)
+        parsed = {}  # position -> parsed entry
+        seen_keys = set()
+        for position, entry in enumerate(entries):
+            try:
+                parsed[position] = SyncService.parse_entry(entry)
+            except ValueError as e:
+                key = entry.get('key') if isinstance(entry, dict) else None
+                outcomes[position] = {'key': key, 'status': 'rejected', 'error': str(e)}
+                continue
+            if parsed[position]['key'] in seen_keys:
+                outcomes[position] = SyncService._rejected(parsed.pop(position), "Duplicate key in batch")
+            else:
+                seen_keys.add(parsed[position]['key'])
+
+        receipts = dict(
+            SyncReceipt.objects.filter(user=user, idempotencyKey__in=list(seen_keys))
+            .values_list('idempotencyKey', 'outcome')
+        )
+        for position, entry in list(parsed.items()):
+            if entry['key'] in receipts:
+                outcomes[position] = dict(receipts[entry['key']], replayed=True)
+                del parsed[position]
+
+        sessions = AttendanceSession.objects.select_for_update(of=('self',)).filter(
+            pk__in={entry['session_id'] for entry in parsed.values()},
+            classroom__teacher__user=user,
+        ).in_bulk()
+        archived = set(ArchivedSession.objects.filter(session__in=list(sessions)).values_list('session_id', flat=True))
+        enrolled = set(
+            Classroom.students.through.objects.filter(
+                classroom_id__in={session.classroom_id for session in sessions.values()},
+                student_id__in={student_id for entry in parsed.values() for student_id in entry['statuses']},
+            ).values_list('classroom_id', 'student_id')
+        )
+
+        latest_allowed = timezone.now() + SyncService.CLOCK_SKEW
+        accepted = {}  # session ID -> position of the newest valid entry
+        for position, entry in parsed.items():
+            session = sessions.get(entry['session_id'])
+            # Inactive sessions are accepted: the sweeper closes sessions once they
+            # end, and offline devices sync after that
+            if session is None:
+                outcomes[position] = SyncService._rejected(entry, "Session not found")
+            elif session.pk in archived:
+                outcomes[position] = SyncService._rejected(entry, "Session is archived")
+            elif entry['marked_at'] > latest_allowed:
+                outcomes[position] = SyncService._rejected(entry, "marked_at is in the future")
+            elif timezone.localtime(entry['marked_at']).date() != session.date:
+                outcomes[position] = SyncService._rejected(entry, "marked_at is not on the session date")
+            else:
+                unknown = sorted(
+                    student_id for student_id in entry['statuses']
+                    if (session.classroom_id, student_id) not in enrolled
+                )
+                if unknown:
+                    outcomes[position] = SyncService._rejected(
+                        entry, f"Students not in this class: {', '.join(map(str, unknown))}"
+                    )
+                    continue
+                if session.markedAt is not None and entry['marked_at'] <= session.markedAt:
+                    outcomes[position] = SyncService._stale(entry, session.markedAt)
+                    continue
+                # Several entries for one session in a batch: the newest wins
+                other = accepted.get(session.pk)
+                if other is not None and parsed[other]['marked_at'] >= entry['marked_at']:
+                    outcomes[position] = SyncService._stale(entry, parsed[other]['marked_at'])
+                    continue
+                if other is not None:
+                    outcomes[other] = SyncService._stale(parsed[other], entry['marked_at'])
+                accepted[session.pk] = position
+
+        results = AttendanceService.write_many(
+            [(sessions[session_id], parsed[position]['statuses']) for session_id, position in accepted.items()],
+            marked_at={session_id: parsed[position]['marked_at'] for session_id, position in accepted.items()},
+        )
+        for session_id, position in accepted.items():
+            outcomes[position] = dict(
+                key=parsed[position]['key'], session_id=session_id, status='applied', **results[session_id]
+            )
+
+        SyncReceipt.objects.bulk_create([
+            SyncReceipt(
+                user=user, idempotencyKey=entry['key'], session_id=entry['session_id'],
+                outcome=outcomes[position],
+            )
+            for position, entry in parsed.items()
+            if outcomes[position]['status'] != 'rejected'
+        ])
+        return outcomes
+
+    @staticmethod
+    def _rejected(entry, error):
+        # Not stored: the device may fix the entry and resend it under the same key
+        return {'key': entry['key'], 'session_id': entry['session_id'], 'status': 'rejected', 'error': error}
+
+    @staticmethod
+    def _stale(entry, newer):
+        return {
+            'key': entry['key'], 'session_id': entry['session_id'], 'status': 'stale',
+            'markedAt': newer.isoformat(),
+        }
+
+
 class ReportGenerator:
     """Service class for report generation business logic"""
     
@@ -81,22 +729,92 @@ class ReportGenerator:
             tuple: (classroom, list of defaulters with percentages)
         """
         try:
-            classroom = Classroom.objects.get(pk=classroom_id)
-            students = classroom.students.all()
-            defaulters = []
-            
-            for student in students:
-                percentage = AttendanceService.get_attendance_percentage(student, classroom)
-                if percentage < threshold:
-                    defaulters.append({
-                        'student': student,
-                        'percentage': percentage
-                    })
-            
+            classroom = Classroom.objects.select_related('subject', 'department').get(pk=classroom_id)
+            students = AttendanceService.annotate_attendance(
+                classroom.students.all(), classroom
+            ).filter(percentage__lt=threshold).order_by('percentage', 'studKey')
+
+            defaulters = [
+                {
+                    'student': student,
+                    'present': student.present,
+                    'total': student.total,
+                    'percentage': float(student.percentage),
+                }
+                for student in students
+            ]
             return classroom, defaulters
         except Classroom.DoesNotExist:
             return None, []
     
+    @staticmethod
+    def get_projection(department_id, threshold=75.0, now=None):
+        """
+        Project the attendance of every student in every class of a department
+        to the end of term, counting the sessions still scheduled. Reads one
+        grouped count of sessions per class and the summary rows, then
+        projects all students at once (see analytics.project_attendance).
+        Args:
+            department_id: ID of the department
+            threshold: Required attendance percentage
+            now: Time sessions are counted as held or remaining from (default now);
+                sessions already marked count as held
+        Returns:
+            tuple: (department, list of classes, each a dict with its counts and students)
+        """
+        department = Department.objects.filter(pk=department_id).first()
+        if department is None:
+            return None, []
+
+        now = timezone.localtime(now or timezone.now())
+        upcoming = Q(date__gt=now.date()) | Q(date=now.date(), endTime__gte=now.time())
+        # A session in progress whose attendance is already taken counts as held, not remaining
+        upcoming &= ~Exists(AttendanceRecord.objects.filter(session=OuterRef('pk'))) & Q(archive__isnull=True)
+        sessions = {
+            classroom_id: (total, remaining)
+            for classroom_id, total, remaining in AttendanceSession.objects.filter(
+                classroom__department=department
+            ).values_list('classroom_id').annotate(
+                total=Count('sessionId'), remaining=Count('sessionId', filter=upcoming)
+            ).order_by()
+        }
+        rows = list(
+            AttendanceSummary.objects.filter(classroom__department=department).order_by(
+                'classroom__className', 'classroom_id', 'student__studKey'
+            ).values_list(
+                'classroom_id', 'classroom__className', 'classroom__subject__subName',
+                'student_id', 'student__studKey', 'student__name', 'sessionsPresent',
+            )
+        )
+        counts = [sessions.get(row[0], (0, 0)) for row in rows]
+        projection = analytics.project_attendance(
+            [row[6] for row in rows], [total for total, _ in counts], [remaining for _, remaining in counts], threshold
+        )
+        percentages, best, needed, reachable = (
+            projection[name].tolist() for name in ('percentage', 'best', 'needed', 'reachable')
+        )
+
+        classes = []
+        for index, row in enumerate(rows):
+            classroom_id, class_name, subject_name, student_id, stud_key, name, present = row
+            if not classes or classes[-1]['classId'] != classroom_id:
+                total, remaining = counts[index]
+                classes.append({
+                    'classId': classroom_id, 'className': class_name, 'subName': subject_name,
+                    'total': total, 'remaining': remaining, 'held': total - remaining, 'students': [],
+                })
+            classes[-1]['students'].append({
+                'studId': student_id,
+                'studKey': stud_key,
+                'name': name,
+                'present': present,
+                'percentage': percentages[index],
+                'best': best[index],
+                'needed': needed[index],
+                'reachable': reachable[index],
+            })
+        return department, classes
+
     @staticmethod
     def generate_attendance_pdf_for_session(session_id):
         """
@@ -106,9 +824,14 @@ class ReportGenerator:
         Returns:
             BytesIO: PDF file in memory buffer
         """
+        # reportlab is only needed here; importing it lazily keeps it out of worker boot
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.pagesizes import letter
+        from reportlab.lib.units import inch
+
         try:
-            session = AttendanceSession.objects.get(pk=session_id)
-            records = AttendanceRecord.objects.filter(session=session).select_related('student')
+            session = AttendanceSession.objects.select_related('classroom__subject', 'archive').get(pk=session_id)
+            rows = archive.session_rows(session)
             
             buffer = BytesIO()
             pdf = canvas.Canvas(buffer, pagesize=letter)
@@ -134,14 +857,14 @@ class ReportGenerator:
             # Table content
             pdf.setFont("Helvetica", 10)
             y_position = 8.1 * inch
-            for record in records:
+            for stud_key, name, present in rows:
                 if y_position < 1 * inch:  # New page if needed
                     pdf.showPage()
                     y_position = 10 * inch
                 
-                pdf.drawString(1 * inch, y_position, record.student.studKey)
-                pdf.drawString(2.5 * inch, y_position, record.student.name)
-                status = "Present" if record.status else "Absent"
+                pdf.drawString(1 * inch, y_position, stud_key)
+                pdf.drawString(2.5 * inch, y_position, name)
+                status = "Present" if present else "Absent"
                 pdf.drawString(5 * inch, y_position, status)
                 y_position -= 0.3 * inch
             
@@ -151,17 +874,157 @@ class ReportGenerator:
         except AttendanceSession.DoesNotExist:
             return None
 
-@staticmethod
-def deactivate_old_sessions():
-    """Deactivate sessions from previous days"""
-    from django.utils import timezone
-    from .models import AttendanceSession
-    
-    today = timezone.now().date()
-    # Deactivate sessions from previous days
-    old_sessions = AttendanceSession.objects.filter(
-        date__lt=today,
-        is_active=True
-    )
-    old_sessions.update(is_active=False)
-    return old_sessions.count()
\ No newline at end of file
+    @staticmethod
+    def get_cached_attendance_pdf(session, fingerprint):
+        """
+        Return the session PDF from the disk cache, rendering it on a miss
+        Args:
+            session: AttendanceSession object
+            fingerprint: session_fingerprint() of the session
+        Returns:
+            bytes: PDF file contents
+        """
+        pdf_cache = get_pdf_cache()
+        data = pdf_cache.get(session.pk, fingerprint)
+        if data is None:
+            data = ReportGenerator.generate_attendance_pdf_for_session(session.pk).getvalue()
+            pdf_cache.put(session.pk, fingerprint, data)
+        return data
+
+    # Register layout (landscape letter, points)
+    REGISTER_SESSIONS_PER_PAGE = 20
+    REGISTER_STUDENTS_PER_PAGE = 32
+    REGISTER_CHUNK_SIZE = 2000
+
+    @staticmethod
+    def stream_register_pdf(classroom):
+        """
+        Generate the semester register of a class (students x sessions grid)
+        page by page. Sessions are split into column blocks; for each block the
+        roster is read with .iterator() in studKey order and the block's
+        records are fetched one page of students at a time, so only one page
+        worth of rows is held at a time.
+        Args:
+            classroom: Classroom object
+        Yields:
+            bytes: consecutive chunks of the PDF file
+        """
+        from reportlab.lib.pagesizes import letter, landscape
+
+        pagesize = landscape(letter)
+        pdf = StreamingPDF(pagesize, title=f"Attendance Register - {classroom.className}")
+        yield pdf.begin()
+
+        sessions = list(
+            AttendanceSession.objects.filter(classroom=classroom)
+            .order_by('date', 'startTime', 'sessionId')
+            .values_list('sessionId', 'date')
+        )
+        per_page = ReportGenerator.REGISTER_SESSIONS_PER_PAGE
+        blocks = [sessions[i:i + per_page] for i in range(0, len(sessions), per_page)] or [[]]
+        page_number = 0
+        for block_index, block in enumerate(blocks):
+            for rows in ReportGenerator._register_rows(classroom, block):
+                page_number += 1
+                page = ReportGenerator._draw_register_page(
+                    classroom, block, rows, page_number, block_index + 1, len(blocks), pagesize
+                )
+                yield pdf.add_page(page)
+        yield pdf.finish()
+
+    @staticmethod
+    def _register_rows(classroom, block):
+        """
+        Yield the rows of one session block, one page at a time.
+        Each row is (studKey, name, {session_id: status}, percentage).
+        """
+        session_ids = [session_id for session_id, _ in block]
+        chunk_size = ReportGenerator.REGISTER_CHUNK_SIZE
+        roster = classroom.students.order_by('studKey').values_list(
+            'studId', 'studKey', 'name'
+        ).iterator(chunk_size=chunk_size)
+
+        # Archived sessions of the block have no records; their cells come from the bitmaps
+        archived = archive.session_statuses(session_ids)
+
+        page = []
+        emitted = False
+        for student in roster:
+            page.append(student)
+            if len(page) == ReportGenerator.REGISTER_STUDENTS_PER_PAGE:
+                yield ReportGenerator._register_page(classroom, page, session_ids, archived)
+                page = []
+                emitted = True
+        if page or not emitted:
+            yield ReportGenerator._register_page(classroom, page, session_ids, archived)
+
+    @staticmethod
+    def _register_page(classroom, students, session_ids, archived):
+        """
+        Cells and percentages of one page of students. Records are looked up
+        by student ID rather than merged in studKey order, which the database
+        collation may sort differently from Python.
+        """
+        cells = {student_id: {} for student_id, _, _ in students}
+        if session_ids and cells:
+            for student_id, session_id, status in AttendanceRecord.objects.filter(
+                session_id__in=session_ids, student_id__in=list(cells)
+            ).values_list('student_id', 'session_id', 'status'):
+                cells[student_id][session_id] = status
+        for session_id, statuses in archived.items():
+            for student_id, student_cells in cells.items():
+                if student_id in statuses:
+                    student_cells[session_id] = statuses[student_id]
+        return ReportGenerator._with_percentages(classroom, [
+            (student_id, stud_key, name, cells[student_id]) for student_id, stud_key, name in students
+        ])
+
+    @staticmethod
+    def _with_percentages(classroom, page):
+        percentages = AttendanceService.get_attendance_percentages(
+            [student_id for student_id, _, _, _ in page], classroom
+        )
+        return [
+            (stud_key, name, cells, percentages[student_id])
+            for student_id, stud_key, name, cells in page
+        ]
+
+    @staticmethod
+    def _draw_register_page(classroom, block, rows, page_number, block_number, block_count, pagesize):
+        width, height = pagesize
+        page = PDFPage()
+        left = 36
+        grid_left = 236
+        column = 24
+
+        page.setFont("Helvetica-Bold", 14)
+        page.drawString(left, height - 36, "Attendance Register")
+        page.setFont("Helvetica", 10)
+        page.drawString(left, height - 52, f"Class: {classroom.className}   Subject: {classroom.subject.subName}   "
+                                           f"{classroom.year} {classroom.semester}")
+        page.drawString(width - 150, height - 36, f"Page {page_number} (sessions {block_number}/{block_count})")
+
+        header_y = height - 80
+        page.setFont("Helvetica-Bold", 8)
+        page.drawString(left, header_y, "Student ID")
+        page.drawString(left + 70, header_y, "Student Name")
+        for index, (_, date) in enumerate(block):
+            page.drawString(grid_left + index * column, header_y + 9, date.strftime('%d'))
+            page.drawString(grid_left + index * column, header_y, date.strftime('%b'))
+        total_x = grid_left + ReportGenerator.REGISTER_SESSIONS_PER_PAGE * column
+        page.drawString(total_x, header_y, "Overall %")
+        page.line(left, header_y - 4, width - left, header_y - 4)
+
+        page.setFont("Helvetica", 8)
+        y = header_y - 16
+        for stud_key, name, cells, percentage in rows:
+            page.drawString(left, y, stud_key)
+            page.drawString(left + 70, y, name[:32])
+            for index, (session_id, _) in enumerate(block):
+                status = cells.get(session_id)
+                page.drawString(grid_left + index * column + 4, y, '-' if status is None else ('P' if status else 'A'))
+            page.drawString(total_x, y, f"{percentage:.2f}")
+            y -= 14
+        if not rows:
+            page.drawString(left, y, "No students enrolled.")
+        return page
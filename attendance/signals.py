@@ -0,0 +1,154 @@
+"""
+Model signal handlers. Bulk operations (bulk_create, update) do not send
+signals; code using them calls the matching service directly.
+"""
+from django.db.models import Count
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from . import analytics, archive, dashboard, pdfcache, profiles, trends
+from .models import AttendanceRecord, AttendanceSession, Classroom, Student, Subject
+from .services import CounterService, RosterService
+
+
+@receiver(pre_save, sender=Student)
+def remember_student_department(sender, instance, **kwargs):
+    # A student moving to another department changes the old roster too
+    instance._previous_department_id = None
+    instance._previous_label = None
+    if instance.pk is not None:
+        previous = Student.objects.filter(pk=instance.pk).values_list('department_id', 'studKey', 'name').first()
+        if previous is not None:
+            instance._previous_department_id = previous[0]
+            instance._previous_label = previous[1:]
+
+
+@receiver(post_save, sender=Student)
+def student_saved(sender, instance, **kwargs):
+    RosterService.touch([instance.department_id, getattr(instance, '_previous_department_id', None)])
+    previous = getattr(instance, '_previous_label', None)
+    if previous is not None and previous != (instance.studKey, instance.name):
+        # Session PDFs show the studKey and name
+        pdfcache.students_changed([instance.pk])
+
+
+@receiver(post_delete, sender=Student)
+def student_deleted(sender, instance, **kwargs):
+    RosterService.touch([instance.department_id])
+
+
+@receiver(pre_delete, sender=Student)
+def student_deleting(sender, instance, **kwargs):
+    # The student's records go with it. When a whole department is deleted a
+    # record can be subtracted twice (via its session and its student);
+    # reconcile_counters repairs that
+    per_day = (
+        AttendanceRecord.objects.filter(student=instance)
+        .values_list('session__date').annotate(records=Count('recordId'))
+    )
+    CounterService.add_many({CounterService.daily('marked', day): -records for day, records in per_day})
+    classroom_ids = list(instance.classroom_set.values_list('classId', flat=True))
+    analytics.invalidate(classroom_ids)
+    profiles.invalidate_classrooms(classroom_ids)
+    profiles.invalidate_students([instance.pk])
+    pdfcache.students_changed([instance.pk])
+
+
+@receiver(pre_save, sender=AttendanceSession)
+def remember_session_slot(sender, instance, **kwargs):
+    instance._previous_slot = None
+    if instance.pk is not None:
+        instance._previous_slot = (
+            AttendanceSession.objects.filter(pk=instance.pk).values_list('classroom_id', 'date').first()
+        )
+
+
+@receiver(post_save, sender=AttendanceSession)
+def session_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_slot', None)
+    if created:
+        CounterService.add(CounterService.daily('sessions', instance.date), 1)
+    elif previous and previous[1] != instance.date:
+        # Rescheduled: the session and its records move to another day
+        marked = archive.marked_count(instance)
+        CounterService.add_many({
+            CounterService.daily('sessions', previous[1]): -1,
+            CounterService.daily('sessions', instance.date): 1,
+            CounterService.daily('marked', previous[1]): -marked,
+            CounterService.daily('marked', instance.date): marked,
+        })
+
+    # A new, moved or rescheduled session is a new or reordered matrix column
+    analytics.invalidate([instance.classroom_id, previous[0] if previous else None])
+    profiles.invalidate_classrooms([instance.classroom_id, previous[0] if previous else None])
+    if previous and previous != (instance.classroom_id, instance.date):
+        # Its records move to another class or day, and so to other trend buckets
+        trends.refresh([previous, (instance.classroom_id, instance.date)])
+
+    # Only today's schedules are cached
+    day = dashboard.today()
+    classroom_ids = []
+    if instance.date == day:
+        classroom_ids.append(instance.classroom_id)
+    if previous and previous[1] == day:
+        classroom_ids.append(previous[0])
+    dashboard.invalidate_classrooms(classroom_ids)
+
+
+@receiver(pre_delete, sender=AttendanceSession)
+def session_deleting(sender, instance, **kwargs):
+    marked = archive.marked_count(instance)
+    CounterService.add_many({
+        CounterService.daily('sessions', instance.date): -1,
+        CounterService.daily('marked', instance.date): -marked,
+    })
+
+
+@receiver(post_delete, sender=AttendanceSession)
+def session_deleted(sender, instance, **kwargs):
+    analytics.invalidate([instance.classroom_id])
+    profiles.invalidate_classrooms([instance.classroom_id])
+    trends.refresh([(instance.classroom_id, instance.date)])
+    if instance.date == dashboard.today():
+        dashboard.invalidate_classrooms([instance.classroom_id])
+
+
+@receiver(pre_save, sender=Classroom)
+def remember_classroom_teacher(sender, instance, **kwargs):
+    instance._previous_teacher_id = None
+    if instance.pk is not None:
+        instance._previous_teacher_id = (
+            Classroom.objects.filter(pk=instance.pk).values_list('teacher_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Classroom)
+def classroom_saved(sender, instance, **kwargs):
+    dashboard.invalidate_teachers([instance.teacher_id, getattr(instance, '_previous_teacher_id', None)])
+
+
+@receiver(post_delete, sender=Classroom)
+def classroom_deleted(sender, instance, **kwargs):
+    dashboard.invalidate_teachers([instance.teacher_id])
+
+
+@receiver(post_save, sender=Subject)
+def subject_saved(sender, instance, created, **kwargs):
+    # Cached schedules show the subject name
+    if not created:
+        dashboard.invalidate_teachers(
+            Classroom.objects.filter(subject=instance).values_list('teacher_id', flat=True)
+        )
+
+
+def counted_model_saved(sender, instance, created, **kwargs):
+    if created:
+        CounterService.add(CounterService.total_name(sender), 1)
+
+
+def counted_model_deleted(sender, instance, **kwargs):
+    CounterService.add(CounterService.total_name(sender), -1)
+
+
+for counted_model in CounterService.TOTALS.values():
+    post_save.connect(counted_model_saved, sender=counted_model, dispatch_uid=f'counter-{counted_model.__name__}-saved')
+    post_delete.connect(counted_model_deleted, sender=counted_model, dispatch_uid=f'counter-{counted_model.__name__}-deleted')
@@ -0,0 +1,60 @@
+"""
+Synthetic data used by the benchmark commands.
+Everything is created with bulk inserts so large rosters are cheap to build.
+"""
+import datetime
+from django.contrib.auth.models import User
+from .models import Department, Subject, Student, Teacher, Classroom, AttendanceSession
+from .services import SummaryService, RosterService, CounterService
+
+
+def build_classroom(num_students, num_sessions=1, prefix='bench', start_date=None):
+    """
+    Create a department, teacher, subject and classroom with a synthetic roster
+    Args:
+        num_students: Number of students enrolled in the classroom
+        num_sessions: Number of daily sessions to schedule
+        prefix: Prefix for unique names so several classrooms can coexist
+        start_date: Date of the first session (defaults to today)
+    Returns:
+        tuple: (classroom, list of sessions)
+    """
+    department = Department.objects.create(deptName=f"{prefix} department")
+    subject = Subject.objects.create(subName=f"{prefix} subject", credits=4, department=department)
+    user = User.objects.create_user(username=f"{prefix}-teacher")
+    teacher = Teacher.objects.create(user=user, department=department)
+    classroom = Classroom.objects.create(
+        className=f"{prefix} class",
+        year='2025-26',
+        semester='Sem I',
+        teacher=teacher,
+        subject=subject,
+        department=department,
+    )
+
+    Student.objects.bulk_create([
+        Student(studKey=f"{prefix}-{i:06d}", name=f"Student {i}", department=department)
+        for i in range(num_students)
+    ], batch_size=500)
+    RosterService.touch([department.deptId])
+    CounterService.add('students', num_students)
+    student_ids = Student.objects.filter(department=department).values_list('studId', flat=True)
+    Classroom.students.through.objects.bulk_create([
+        Classroom.students.through(classroom_id=classroom.classId, student_id=student_id)
+        for student_id in student_ids
+    ], batch_size=500)
+
+    start_date = start_date or datetime.date.today()
+    AttendanceSession.objects.bulk_create([
+        AttendanceSession(
+            classroom=classroom,
+            date=start_date + datetime.timedelta(days=i),
+            startTime=datetime.time(9, 0),
+            endTime=datetime.time(10, 0),
+        )
+        for i in range(num_sessions)
+    ])
+    sessions = list(AttendanceSession.objects.filter(classroom=classroom).order_by('date'))
+    CounterService.add_many({CounterService.daily('sessions', session.date): 1 for session in sessions})
+    SummaryService.sync_classroom(classroom)
+    return classroom, sessions
@@ -1,3 +1,1418 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import os
+import re
+import tempfile
+import zlib
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from . import analytics, archive, dashboard, jobs, profiles, trends
+from .importers import StudentImporter, read_rows
+from .lifecycle import sweep_sessions
+from .models import *
+from .pagination import InvalidCursor, KeysetPaginator
+from .pdfcache import PDFCache, get_pdf_cache
+from .scheduling import RecurrenceRule, create_timetable, plan_timetable
+from .services import AttendanceService, CounterService, ReportGenerator, SummaryService, SyncService
+from .synthetic import build_classroom
 
-# Create your tests here.
+
+class QueryBudgetTests(TestCase):
+    """
+    Every page gets a fixed SQL query budget. Each view is measured with 10 and
+    with 1000 rows of seeded data: it must stay within its budget both times and
+    its query count must not grow with the data, which is how an N+1 in a
+    template shows up.
+    """
+    SMALL = 10
+    LARGE = 1000
+
+    # (url name, url kwargs, query string, role, max queries)
+    BUDGETS = [
+        ('dashboard', {}, {}, 'admin', 3),
+        ('dashboard', {}, {}, 'teacher', 5),
+        ('student-api', {}, {'department_id': '{department}'}, 'admin', 3),
+        ('student-roster-api', {}, {'department_id': '{department}'}, 'admin', 4),
+        ('student-list', {}, {}, 'admin', 5),
+        ('student-create', {}, {}, 'admin', 3),
+        ('student-update', {'pk': '{student}'}, {}, 'admin', 4),
+        ('student-attendance', {'pk': '{student}'}, {}, 'admin', 4),
+        ('teacher-list', {}, {}, 'admin', 5),
+        ('teacher-create', {}, {}, 'admin', 3),
+        ('teacher-update', {'pk': '{teacher}'}, {}, 'admin', 5),
+        ('department-list', {}, {}, 'admin', 3),
+        ('subject-list', {}, {}, 'admin', 3),
+        ('subject-update', {'pk': '{subject}'}, {}, 'admin', 4),
+        ('class-list', {}, {}, 'admin', 5),
+        ('class-create', {}, {}, 'admin', 5),
+        ('class-update', {'pk': '{classroom}'}, {}, 'admin', 9),
+        ('session-list', {}, {}, 'admin', 5),
+        ('session-create', {}, {}, 'admin', 3),
+        ('session-update', {'pk': '{session}'}, {}, 'admin', 4),
+        ('session-timetable', {}, {}, 'admin', 3),
+        ('student-import', {}, {}, 'admin', 3),
+        ('mark-attendance', {'session_id': '{session}'}, {}, 'teacher', 6),
+        ('report-dashboard', {}, {}, 'admin', 5),
+        ('defaulter-report', {}, {'class_id': '{classroom}', 'threshold': '75'}, 'admin', 4),
+        ('projection-report', {}, {'department_id': '{department}', 'threshold': '75', 'all': '1'}, 'admin', 5),
+        ('attendance-pdf', {}, {'session_id': '{session}'}, 'admin', 6),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(deptName="Budget department")
+        cls.admin = User.objects.create_superuser('budget-admin', 'admin@example.com', 'x')
+        teacher_user = User.objects.create_user('budget-teacher', first_name='Budget', last_name='Teacher')
+        cls.teacher = Teacher.objects.create(user=teacher_user, department=cls.department)
+        cls.subject = Subject.objects.create(subName="Budget subject", credits=4, department=cls.department)
+        cls.classroom = Classroom.objects.create(
+            className="Budget class", year='2025-26', semester='Sem I',
+            teacher=cls.teacher, subject=cls.subject, department=cls.department,
+        )
+        # Open for the whole day so the teacher can mark it whenever the suite runs
+        cls.session = AttendanceSession.objects.create(
+            classroom=cls.classroom, date=datetime.date.today(),
+            startTime=datetime.time(0, 0), endTime=datetime.time(23, 59, 59),
+        )
+        cls.seeded = 0
+
+    def seed(self, count):
+        """Add rows until every listed model has `count` of them"""
+        new = range(self.seeded, count)
+        self.seeded = count
+
+        User.objects.bulk_create([
+            User(username=f"seed-teacher-{i}", first_name="Seed", last_name=str(i)) for i in new
+        ])
+        users = User.objects.filter(username__startswith='seed-teacher-', teacher__isnull=True)
+        Teacher.objects.bulk_create([Teacher(user=user, department=self.department) for user in users])
+
+        Subject.objects.bulk_create([
+            Subject(subName=f"Seed subject {i}", credits=3, department=self.department) for i in new
+        ])
+        Classroom.objects.bulk_create([
+            Classroom(
+                className=f"Seed class {i:04d}", year='2025-26', semester='Sem I',
+                teacher=self.teacher, subject=self.subject, department=self.department,
+            )
+            for i in new
+        ])
+        Student.objects.bulk_create([
+            Student(studKey=f"SEED{i:05d}", name=f"Seed student {i}", department=self.department) for i in new
+        ])
+        students = list(Student.objects.filter(studKey__startswith='SEED').exclude(classroom=self.classroom))
+        self.classroom.students.add(*students)
+
+        classes = list(Classroom.objects.filter(className__startswith='Seed class'))
+        AttendanceSession.objects.bulk_create([
+            AttendanceSession(
+                classroom=classes[i % len(classes)], date=datetime.date.today(),
+                startTime=datetime.time(0, 0), endTime=datetime.time(23, 59, 59),
+            )
+            for i in new
+        ])
+        AttendanceRecord.objects.bulk_create([
+            AttendanceRecord(session=self.session, student=student, status=index % 2 == 0)
+            for index, student in enumerate(students)
+        ])
+        SummaryService.sync_classroom(self.classroom)
+        # Records written without write_many: mark the session changed as it would
+        AttendanceSession.objects.filter(pk=self.session.pk).update(lastUpdated=timezone.now())
+        # Bulk inserts skip the counter hooks; repair them as the periodic reconcile would
+        CounterService.reconcile()
+
+    def measure(self, name, kwargs, query, role):
+        placeholders = {
+            '{department}': self.department.pk,
+            '{student}': Student.objects.first().pk,
+            '{teacher}': self.teacher.pk,
+            '{subject}': self.subject.pk,
+            '{classroom}': self.classroom.pk,
+            '{session}': self.session.pk,
+        }
+        kwargs = {key: placeholders.get(value, value) for key, value in kwargs.items()}
+        query = {key: placeholders.get(value, value) for key, value in query.items()}
+        url = reverse(name, kwargs=kwargs)
+        self.client.force_login(self.admin if role == 'admin' else self.teacher.user)
+        # Budgets cover the uncached path
+        cache.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, query)
+            self.assertEqual(response.status_code, 200, f"{name} returned {response.status_code}")
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return len(queries)
+
+    def test_views_stay_within_query_budget(self):
+        with tempfile.TemporaryDirectory() as pdf_cache, \
+                override_settings(ATTENDANCE_PDF_CACHE_DIR=pdf_cache):
+            self.seed(self.SMALL)
+            small = [self.measure(*budget[:4]) for budget in self.BUDGETS]
+            self.seed(self.LARGE)
+            large = [self.measure(*budget[:4]) for budget in self.BUDGETS]
+
+        for budget, small_count, large_count in zip(self.BUDGETS, small, large):
+            name, role, limit = budget[0], budget[3], budget[4]
+            with self.subTest(view=name, role=role):
+                self.assertLessEqual(small_count, limit, f"{name}: {small_count} queries with {self.SMALL} rows")
+                self.assertLessEqual(large_count, limit, f"{name}: {large_count} queries with {self.LARGE} rows")
+                self.assertEqual(
+                    small_count, large_count,
+                    f"{name}: query count grew from {small_count} to {large_count} with more rows",
+                )
+
+
+class QueryPlanTests(TestCase):
+    """
+    Runs EXPLAIN on every statement the hot paths execute and fails when one
+    reads a whole table. SQLite reports a full scan as a bare "SCAN <table>";
+    on PostgreSQL sequential scans are disabled for the test so that a
+    "Seq Scan" node means no index can serve the query, whatever the table size.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(deptName="Plan department")
+        user = User.objects.create_user('plan-teacher')
+        cls.teacher = Teacher.objects.create(user=user, department=department)
+        subject = Subject.objects.create(subName="Plan subject", credits=4, department=department)
+        cls.classroom = Classroom.objects.create(
+            className="Plan class", year='2025-26', semester='Sem I',
+            teacher=cls.teacher, subject=subject, department=department,
+        )
+        Student.objects.bulk_create([
+            Student(studKey=f"PLAN{i:03d}", name=f"Plan student {i}", department=department) for i in range(20)
+        ])
+        cls.students = list(Student.objects.filter(department=department))
+        cls.classroom.students.add(*cls.students)
+        cls.session = AttendanceSession.objects.create(
+            classroom=cls.classroom, date=datetime.date.today(),
+            startTime=datetime.time(0, 0), endTime=datetime.time(23, 59, 59),
+        )
+        SummaryService.sync_classroom(cls.classroom)
+
+    def setUp(self):
+        # Cached pages (the teacher dashboard) would skip the queries under test
+        cache.clear()
+
+    def record_statements(self, func):
+        """Run func and return the (sql, params) of every SELECT/UPDATE/DELETE it executed"""
+        statements = []
+
+        def wrapper(execute, sql, params, many, context):
+            if sql.lstrip().split(None, 1)[0].upper() in ('SELECT', 'UPDATE', 'DELETE'):
+                statements.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(wrapper):
+            func()
+        self.assertTrue(statements, "nothing was executed")
+        return statements
+
+    def full_scans(self, sql, params):
+        """Tables the plan reads in full"""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+                details = [row[-1] for row in cursor.fetchall()]
+                return [detail.split()[1] for detail in details if re.fullmatch(r'SCAN \S+', detail)]
+            if connection.vendor == 'postgresql':
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                nodes, scans = [plan[0]['Plan']], []
+                while nodes:
+                    node = nodes.pop()
+                    if node['Node Type'] == 'Seq Scan':
+                        scans.append(node['Relation Name'])
+                    nodes.extend(node.get('Plans', []))
+                return scans
+        self.skipTest(f"no plan checks for {connection.vendor}")
+
+    def assertNoFullScans(self, statements):
+        for sql, params in statements:
+            with self.subTest(sql=sql):
+                self.assertEqual(self.full_scans(sql, params), [], f"full table scan in: {sql}")
+
+    def test_teacher_dashboard(self):
+        self.client.force_login(self.teacher.user)
+        self.assertNoFullScans(self.record_statements(lambda: self.client.get(reverse('dashboard'))))
+
+    def test_defaulter_list(self):
+        self.assertNoFullScans(self.record_statements(
+            lambda: ReportGenerator.get_defaulter_list(self.classroom.pk, 75.0)
+        ))
+
+    def test_mark_attendance(self):
+        present = [student.pk for student in self.students[::2]]
+        self.assertNoFullScans(self.record_statements(
+            lambda: AttendanceService.mark_attendance(self.session.pk, present)
+        ))
+        # Second pass updates existing records instead of creating them
+        present = [student.pk for student in self.students[1::2]]
+        self.assertNoFullScans(self.record_statements(
+            lambda: AttendanceService.mark_attendance(self.session.pk, present)
+        ))
+
+
+class MarkAttendanceChangesTests(TestCase):
+    """The JSON toggle endpoint of the mark attendance page"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.classroom, _ = build_classroom(3, num_sessions=0, prefix='changes')
+        cls.students = list(cls.classroom.students.order_by('studId'))
+        cls.session = AttendanceSession.objects.create(
+            classroom=cls.classroom, date=datetime.date.today(),
+            startTime=datetime.time(0, 0), endTime=datetime.time(23, 59, 59),
+        )
+
+    def post(self, payload):
+        self.client.force_login(self.classroom.teacher.user)
+        return self.client.post(
+            reverse('mark-attendance-changes', args=[self.session.pk]),
+            json.dumps(payload), content_type='application/json',
+        )
+
+    def test_marks_listed_students(self):
+        response = self.post({'present': [self.students[0].pk], 'absent': [self.students[1].pk]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            dict(AttendanceRecord.objects.filter(session=self.session).values_list('student_id', 'status')),
+            {self.students[0].pk: True, self.students[1].pk: False},
+        )
+
+    def test_rejects_ids_that_are_not_a_list(self):
+        for payload in ({'present': '12'}, {'present': {str(self.students[0].pk): True}}, {'absent': 5}):
+            with self.subTest(payload=payload):
+                self.assertEqual(self.post(payload).status_code, 400)
+        self.assertFalse(AttendanceRecord.objects.filter(session=self.session).exists())
+
+
+class SyncTests(TestCase):
+    """Offline batch sync: last write wins per session, keys replay, clocks ahead are capped"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.day = datetime.date.today() - datetime.timedelta(days=1)
+        cls.classroom, sessions = build_classroom(3, num_sessions=1, prefix='sync', start_date=cls.day)
+        cls.session = sessions[0]
+        cls.user = cls.classroom.teacher.user
+        cls.students = list(cls.classroom.students.order_by('studId').values_list('studId', flat=True))
+
+    def entry(self, key, hour, present=(), absent=()):
+        marked_at = datetime.datetime.combine(self.day, datetime.time(hour), tzinfo=datetime.timezone.utc)
+        return {
+            'key': key, 'session_id': self.session.pk, 'marked_at': marked_at.isoformat(),
+            'present': list(present), 'absent': list(absent),
+        }
+
+    def statuses(self):
+        return dict(AttendanceRecord.objects.filter(session=self.session).values_list('student_id', 'status'))
+
+    def test_newest_entry_wins(self):
+        first, second = self.students[:2]
+        outcomes = SyncService.sync(self.user, [
+            self.entry('late', 11, present=[first]),
+            self.entry('early', 10, absent=[first]),
+        ])
+        self.assertEqual([outcome['status'] for outcome in outcomes], ['applied', 'stale'])
+        self.assertEqual(self.statuses(), {first: True})
+
+        # Older than what the session already holds
+        outcomes = SyncService.sync(self.user, [self.entry('older', 9, absent=[first, second])])
+        self.assertEqual(outcomes[0]['status'], 'stale')
+        self.assertEqual(self.statuses(), {first: True})
+
+        outcomes = SyncService.sync(self.user, [self.entry('newer', 12, absent=[first], present=[second])])
+        self.assertEqual(outcomes[0]['status'], 'applied')
+        self.assertEqual(self.statuses(), {first: False, second: True})
+        self.assertEqual(SummaryService.sync_classroom(self.classroom, commit=False), 0)
+
+    def test_resent_key_returns_stored_outcome(self):
+        entry = self.entry('once', 10, present=self.students)
+        applied = SyncService.sync(self.user, [entry])[0]
+        AttendanceRecord.objects.filter(session=self.session).update(status=False)
+
+        replayed = SyncService.sync(self.user, [entry])[0]
+        self.assertTrue(replayed.pop('replayed'))
+        self.assertEqual(replayed, applied)
+        self.assertFalse(any(self.statuses().values()), "a replay must not write again")
+
+    def test_rejected_entries_are_not_stored(self):
+        outcomes = SyncService.sync(self.user, [
+            self.entry('stranger', 10, present=[0]),
+            {'key': 'shape', 'session_id': self.session.pk},
+        ])
+        self.assertEqual([outcome['status'] for outcome in outcomes], ['rejected', 'rejected'])
+        self.assertFalse(SyncReceipt.objects.exists())
+        self.assertEqual(self.statuses(), {})
+
+    def test_clock_skew(self):
+        entry = self.entry('skew', 0, present=self.students)
+        with mock.patch('django.utils.timezone.now', return_value=(
+            datetime.datetime.fromisoformat(entry['marked_at']) - SyncService.CLOCK_SKEW / 2
+        )):
+            self.assertEqual(SyncService.sync(self.user, [entry])[0]['status'], 'applied')
+
+        entry = self.entry('ahead', 1, present=self.students)
+        with mock.patch('django.utils.timezone.now', return_value=(
+            datetime.datetime.fromisoformat(entry['marked_at']) - SyncService.CLOCK_SKEW * 2
+        )):
+            self.assertEqual(SyncService.sync(self.user, [entry])[0]['status'], 'rejected')
+
+    def test_device_fetches_csrf_token_before_posting(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        url = reverse('attendance-sync')
+        body = json.dumps({'entries': [self.entry('device', 10, present=self.students)]})
+        self.assertEqual(client.post(url, body, content_type='application/json').status_code, 403)
+
+        token = client.get(url).json()['csrfToken']
+        response = client.post(url, body, content_type='application/json', HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['status'], 'applied')
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor paging of the admin lists"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.classroom, cls.sessions = build_classroom(1, num_sessions=7, prefix='paging')
+        cls.admin = User.objects.create_superuser('paging-admin', 'admin@example.com', 'x')
+
+    def paginator(self):
+        return KeysetPaginator(AttendanceSession.objects.all(), ['-date', '-startTime', '-sessionId'], per_page=3)
+
+    def test_next_cursors_visit_every_row_once(self):
+        paginator = self.paginator()
+        page = paginator.page()
+        seen = [session.pk for session in page]
+        while page.has_next:
+            page = paginator.page(page.next_cursor)
+            seen.extend(session.pk for session in page)
+        self.assertEqual(seen, [session.pk for session in sorted(self.sessions, key=lambda s: s.date, reverse=True)])
+
+    def test_previous_cursor_returns_previous_page(self):
+        paginator = self.paginator()
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        self.assertEqual(list(paginator.page(second.previous_cursor)), list(first))
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(InvalidCursor):
+            self.paginator().page('not-a-cursor')
+
+    def test_empty_page_leads_back(self):
+        paginator = self.paginator()
+        pages = [paginator.page()]
+        while pages[-1].has_next:
+            pages.append(paginator.page(pages[-1].next_cursor))
+        cursor = pages[-2].next_cursor
+        # The rows of the last page are deleted before it is requested
+        AttendanceSession.objects.filter(pk__in=[session.pk for session in pages[-1]]).delete()
+        empty = paginator.page(cursor)
+        self.assertEqual(list(empty), [])
+        self.assertTrue(empty.has_previous)
+        self.assertEqual(list(paginator.page(empty.previous_cursor)), list(pages[-2]))
+
+        # Likewise backwards, when everything before a page is gone
+        cursor = pages[1].previous_cursor
+        AttendanceSession.objects.filter(pk__in=[session.pk for session in pages[0]]).delete()
+        empty = paginator.page(cursor)
+        self.assertEqual(list(empty), [])
+        self.assertEqual(list(paginator.page(empty.next_cursor)), list(pages[1]))
+
+    def test_session_list_ignores_impossible_dates(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('session-list'), {'date_from': '2025-02-30', 'date_to': '2025-13-01'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['sessions']), 7)
+
+
+class ExportTests(TestCase):
+    """The streaming CSV export and its filters"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.day = datetime.date.today() - datetime.timedelta(days=1)
+        cls.classroom, sessions = build_classroom(2, num_sessions=2, prefix='export', start_date=cls.day)
+        students = list(cls.classroom.students.order_by('studId'))
+        AttendanceService.write_many([
+            (session, {student.pk: index == 0 for index, student in enumerate(students)}) for session in sessions
+        ])
+        cls.admin = User.objects.create_superuser('export-admin', 'admin@example.com', 'x')
+
+    def export(self, **params):
+        self.client.force_login(self.admin)
+        return self.client.get(reverse('attendance-export'), params)
+
+    def test_date_filter(self):
+        response = self.export(date_from=self.day.isoformat(), date_to=self.day.isoformat())
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(all(self.day.isoformat() in line for line in lines[1:]))
+
+    def test_rejects_invalid_dates(self):
+        for value in ('yesterday', '2025-02-30'):
+            with self.subTest(value=value):
+                self.assertEqual(self.export(date_from=value).status_code, 400)
+
+
+class TrendTests(TestCase):
+    """Trend buckets kept up to date by deltas must match a full rebuild"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Sessions on consecutive days crossing a week boundary
+        cls.classroom, cls.sessions = build_classroom(
+            4, num_sessions=9, prefix='trend', start_date=datetime.date(2025, 3, 27),
+        )
+        cls.students = list(cls.classroom.students.order_by('studId').values_list('studId', flat=True))
+        cls.admin = User.objects.create_superuser('trend-admin', 'admin@example.com', 'x')
+
+    def buckets(self):
+        return set(AttendanceTrend.objects.values_list('classroom_id', 'period', 'periodStart', 'present', 'marked'))
+
+    def assertMatchesRebuild(self):
+        incremental = self.buckets()
+        trends.rebuild()
+        self.assertEqual(incremental, self.buckets())
+
+    def test_marking_and_remarking(self):
+        AttendanceService.write_many([
+            (session, {student_id: index % 2 == 0 for index, student_id in enumerate(self.students)})
+            for session in self.sessions
+        ])
+        self.assertMatchesRebuild()
+        AttendanceService.write_many([
+            (self.sessions[0], {student_id: True for student_id in self.students}),
+            (self.sessions[5], {self.students[0]: False}),
+        ])
+        self.assertMatchesRebuild()
+
+    def test_moving_and_deleting_sessions(self):
+        AttendanceService.write_many([(session, {self.students[0]: True}) for session in self.sessions])
+        self.sessions[0].date = datetime.date(2025, 5, 2)
+        self.sessions[0].save()
+        self.assertMatchesRebuild()
+        self.sessions[1].delete()
+        self.assertMatchesRebuild()
+
+    def test_view_rejects_invalid_since(self):
+        self.client.force_login(self.admin)
+        for value in ('soon', '2025-02-30'):
+            with self.subTest(value=value):
+                response = self.client.get(reverse('attendance-trends'), {'since': value})
+                self.assertEqual(response.status_code, 400)
+
+
+class AnalyticsTests(TestCase):
+    """The attendance matrix of a class and its JSON view"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.classroom, cls.sessions = build_classroom(
+            3, num_sessions=5, prefix='analytics', start_date=datetime.date.today() - datetime.timedelta(days=4),
+        )
+        cls.students = list(cls.classroom.students.order_by('studId').values_list('studId', flat=True))
+        # Student 0 attends everything, student 1 misses sessions 1-3, student 2 is never marked
+        AttendanceService.write_many([
+            (session, {cls.students[0]: True, cls.students[1]: index not in (1, 2, 3)})
+            for index, session in enumerate(cls.sessions)
+        ])
+        cls.admin = User.objects.create_superuser('analytics-admin', 'admin@example.com', 'x')
+
+    def test_matrix_figures(self):
+        matrix = analytics.AttendanceMatrix.build(self.classroom)
+        self.assertEqual(matrix.student_ids.tolist(), self.students)
+        self.assertEqual(matrix.percentages().tolist(), [100.0, 40.0, 0.0])
+        self.assertEqual(
+            matrix.percentages().tolist(),
+            [AttendanceService.get_attendance_percentage(student, self.classroom)
+             for student in Student.objects.filter(pk__in=self.students).order_by('studId')],
+        )
+        self.assertEqual(matrix.longest_absence_streaks().tolist(), [0, 3, 0])
+        self.assertEqual(matrix.turnout().round(2).tolist(), [66.67, 33.33, 33.33, 33.33, 66.67])
+
+    def test_recent_rates_use_the_app_date(self):
+        matrix = analytics.AttendanceMatrix.build(self.classroom)
+        with mock.patch('django.utils.timezone.localdate', return_value=self.sessions[2].date):
+            self.assertEqual(matrix.recent_rates(days=1).tolist(), [100.0, 0.0, 0.0])
+            self.assertEqual(matrix.recent_rates(days=2).tolist(), [100.0, 0.0, 0.0])
+            self.assertEqual(matrix.recent_rates().tolist(), [100.0, 100 / 3, 0.0])
+        before = self.sessions[0].date - datetime.timedelta(days=1)
+        with mock.patch('django.utils.timezone.localdate', return_value=before):
+            self.assertIsNone(matrix.recent_rates(days=1))
+
+    def test_view_validates_class_id(self):
+        self.client.force_login(self.admin)
+        url = reverse('classroom-analytics')
+        self.assertEqual(self.client.get(url, {'class_id': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {'class_id': '999999'}).status_code, 404)
+        response = self.client.get(url, {'class_id': self.classroom.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['held'], 5)
+
+
+class ProjectionTests(TestCase):
+    """End-of-term projection of a department"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.classroom, cls.sessions = build_classroom(
+            2, num_sessions=4, prefix='projection', start_date=datetime.date(2025, 3, 10),
+        )
+        cls.students = list(cls.classroom.students.order_by('studId').values_list('studId', flat=True))
+        # The first two sessions are marked: student 0 attended both, student 1 neither
+        AttendanceService.write_many([
+            (session, {cls.students[0]: True, cls.students[1]: False}) for session in cls.sessions[:2]
+        ])
+        cls.admin = User.objects.create_superuser('projection-admin', 'admin@example.com', 'x')
+
+    def test_project_attendance(self):
+        projection = analytics.project_attendance([3, 0, 2], [4, 4, 10], [0, 1, 5], 75)
+        self.assertEqual(projection['percentage'].tolist(), [75.0, 0.0, 40.0])
+        self.assertEqual(projection['best'].tolist(), [75.0, 25.0, 70.0])
+        self.assertEqual(projection['needed'].tolist(), [0, 3, 6])
+        self.assertEqual(projection['reachable'].tolist(), [True, False, False])
+
+    def test_marked_session_in_progress_counts_as_held(self):
+        # During the second session, which is already marked
+        now = timezone.make_aware(datetime.datetime(2025, 3, 11, 9, 30))
+        department, classes = ReportGenerator.get_projection(self.classroom.department_id, 75, now=now)
+        self.assertEqual(department, self.classroom.department)
+        [classroom] = classes
+        self.assertEqual((classroom['held'], classroom['remaining']), (2, 2))
+        self.assertEqual(
+            [(student['percentage'], student['needed'], student['reachable']) for student in classroom['students']],
+            [(100.0, 1, True), (0.0, 3, False)],
+        )
+
+    def test_view_rejects_invalid_parameters(self):
+        self.client.force_login(self.admin)
+        url = reverse('projection-report')
+        department_id = self.classroom.department_id
+        for params in (
+            {'department_id': 'abc'},
+            {'department_id': department_id, 'threshold': 'high'},
+            {'department_id': department_id, 'threshold': 'nan'},
+            {'department_id': department_id, 'threshold': '150'},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+        self.assertEqual(self.client.get(url, {'department_id': department_id, 'threshold': '80'}).status_code, 200)
+
+
+class StudentImportTests(TestCase):
+    """Row validation and class enrolment of the student importer"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.classroom, _ = build_classroom(1, num_sessions=2, prefix='import')
+        cls.department = cls.classroom.department
+
+    def row(self, stud_key, name='Imported', email='', department=''):
+        return {'studKey': stud_key, 'name': name, 'email': email, 'phone': '', 'department': department}
+
+    def test_invalid_rows_are_reported(self):
+        rows = [
+            self.row('IMP1', email='one@example.com', department=self.department.deptName),
+            self.row('', name='No key'),
+            self.row('IMP2', name=''),
+            self.row('IMP3', email='not-an-email'),
+            self.row('IMP4', department='Nowhere'),
+            self.row('IMP1'),
+            self.row('IMP5', email='one@example.com'),
+            self.row('import-000000'),
+        ]
+        result = StudentImporter().run(rows)
+        self.assertEqual(result.created, 1)
+        self.assertEqual([(row_number, message) for row_number, _, message in result.errors], [
+            (3, "studKey is required"),
+            (4, "name is required"),
+            (5, "invalid email 'not-an-email'"),
+            (6, "unknown department 'Nowhere'"),
+            (7, "duplicate studKey in file"),
+            (8, "duplicate email in file"),
+            (9, "studKey already exists"),
+        ])
+        self.assertEqual(Student.objects.get(studKey='IMP1').department, self.department)
+
+    def test_enrolled_counts_only_new_members(self):
+        rows = [self.row('import-000000', name='Renamed'), self.row('IMP9')]
+        result = StudentImporter(update_existing=True, classroom=self.classroom).run(rows)
+        self.assertEqual((result.created, result.updated, result.enrolled), (1, 1, 1))
+        self.assertEqual(self.classroom.students.count(), 2)
+        self.assertEqual(
+            AttendanceSummary.objects.get(classroom=self.classroom, student__studKey='IMP9').sessionsHeld, 2
+        )
+
+    def test_unparseable_csv_is_a_form_error(self):
+        # An unterminated quote runs into the csv module's field size limit
+        data = b'studKey,name\n"' + b'x' * 200000
+        with self.assertRaises(ValueError):
+            list(read_rows(io.BytesIO(data), 'students.csv'))
+
+        self.client.force_login(User.objects.create_superuser('import-admin', 'admin@example.com', 'x'))
+        for name, content in (('students.csv', data), ('students.xlsx', b'not a workbook')):
+            with self.subTest(name=name):
+                response = self.client.post(reverse('student-import'), {'file': SimpleUploadedFile(name, content)})
+                self.assertContains(response, "Could not read file")
+
+    def test_extra_csv_cells_are_ignored(self):
+        rows = list(read_rows(io.BytesIO(b'studKey,name\nIMP1,One,surplus\n'), 'students.csv'))
+        self.assertEqual(rows, [{'studKey': 'IMP1', 'name': 'One'}])
+
+    def test_numeric_xlsx_cells(self):
+        from openpyxl import Workbook
+
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(['studKey', 'name', 'email', 'phone', 'department'])
+        sheet.append([1001, 'Numeric', None, 9876543210, None])
+        sheet.append([1002.0, 'Float', None, 12.5, None])
+        upload = io.BytesIO()
+        workbook.save(upload)
+        upload.seek(0)
+        rows = list(read_rows(upload, 'students.xlsx'))
+        self.assertEqual([(row['studKey'], row['phone'], row['email']) for row in rows],
+                         [('1001', '9876543210', ''), ('1002', '12.5', '')])
+        upload.seek(0)
+        self.assertEqual(StudentImporter().run(read_rows(upload, 'students.xlsx')).created, 2)
+        self.assertTrue(Student.objects.filter(studKey='1001').exists())
+
+
+class SummaryTests(TestCase):
+    """Attendance summaries adjusted by deltas must match a recount from the records"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.classroom, cls.sessions = build_classroom(
+            3, num_sessions=3, prefix='summary', start_date=datetime.date.today() - datetime.timedelta(days=3),
+        )
+        cls.students = list(cls.classroom.students.order_by('studId').values_list('studId', flat=True))
+
+    def counts(self):
+        return {
+            student_id: (held, present)
+            for student_id, held, present in AttendanceSummary.objects.filter(classroom=self.classroom).values_list(
+                'student_id', 'sessionsHeld', 'sessionsPresent'
+            )
+        }
+
+    def assertNoDrift(self):
+        self.assertEqual(SummaryService.sync_classroom(self.classroom, commit=False), 0)
+
+    def test_marking_and_remarking(self):
+        AttendanceService.write_many([
+            (session, {self.students[0]: True, self.students[1]: False}) for session in self.sessions
+        ])
+        self.assertEqual(self.counts(), {self.students[0]: (3, 3), self.students[1]: (3, 0), self.students[2]: (3, 0)})
+        self.assertNoDrift()
+
+        AttendanceService.write_many([(self.sessions[0], {self.students[0]: False, self.students[1]: True})])
+        self.assertEqual(self.counts(), {self.students[0]: (3, 2), self.students[1]: (3, 1), self.students[2]: (3, 0)})
+        self.assertNoDrift()
+
+    def test_session_created_and_deleted(self):
+        AttendanceService.write_many([(self.sessions[0], {self.students[0]: True})])
+        session = AttendanceSession.objects.create(
+            classroom=self.classroom, date=datetime.date.today(),
+            startTime=datetime.time(9, 0), endTime=datetime.time(10, 0),
+        )
+        SummaryService.session_created(session)
+        self.assertEqual(self.counts()[self.students[0]], (4, 1))
+        self.assertNoDrift()
+
+        SummaryService.session_deleted(self.sessions[0])
+        self.sessions[0].delete()
+        self.assertEqual(self.counts()[self.students[0]], (3, 0))
+        self.assertNoDrift()
+
+    def test_students_enrolled(self):
+        AttendanceService.write_many([(session, {self.students[0]: True}) for session in self.sessions])
+        student = Student.objects.create(studKey='summary-new', name="New student")
+        self.classroom.students.add(student)
+        SummaryService.students_enrolled(self.classroom, [student.pk])
+        self.assertEqual(self.counts()[student.pk], (3, 0))
+        self.assertNoDrift()
+
+    def test_mark_sync_archive_cycle(self):
+        AttendanceService.write_many([(self.sessions[0], {self.students[0]: True, self.students[1]: True})])
+        [outcome] = SyncService.sync(self.classroom.teacher.user, [{
+            'key': 'summary-cycle', 'session_id': self.sessions[1].pk,
+            'marked_at': datetime.datetime.combine(
+                self.sessions[1].date, datetime.time(12), tzinfo=datetime.timezone.utc
+            ).isoformat(),
+            'present': [self.students[0]], 'absent': [self.students[1], self.students[2]],
+        }])
+        self.assertEqual(outcome['status'], 'applied')
+        self.assertNoDrift()
+        AttendanceSession.objects.filter(classroom=self.classroom).update(is_active=False)
+        archive.compact_sessions(datetime.date.today())
+        self.assertEqual(ArchivedSession.objects.filter(session__classroom=self.classroom).count(), 3)
+        self.assertEqual(self.counts()[self.students[0]], (3, 2))
+        self.assertNoDrift()
+
+
+class TimetableTests(TestCase):
+    """Recurring timetable planning and clash detection"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # 2025-03-03 is a Monday; the existing session is on Wednesday 2025-03-05, 9:00-10:00
+        cls.classroom, _ = build_classroom(2, num_sessions=1, prefix='timetable', start_date=datetime.date(2025, 3, 5))
+
+    def plan(self, start_time, end_time, holidays=()):
+        rule = RecurrenceRule(
+            [0, 2], start_time, end_time, datetime.date(2025, 3, 3), datetime.date(2025, 3, 14), holidays,
+        )
+        [plan] = plan_timetable([self.classroom], rule)
+        return plan
+
+    def test_overlapping_slot_clashes(self):
+        plan = self.plan(datetime.time(9, 30), datetime.time(10, 30), holidays=[datetime.date(2025, 3, 10)])
+        self.assertEqual(
+            [session.date for session in plan.sessions], [datetime.date(2025, 3, 3), datetime.date(2025, 3, 12)]
+        )
+        self.assertEqual([day for day, _ in plan.clashes], [datetime.date(2025, 3, 5)])
+
+    def test_adjacent_slot_does_not_clash(self):
+        plan = self.plan(datetime.time(10, 0), datetime.time(11, 0))
+        self.assertEqual(len(plan.sessions), 4)
+        self.assertEqual(plan.clashes, [])
+
+        self.assertEqual(create_timetable([plan]), 4)
+        self.assertEqual(AttendanceSession.objects.filter(classroom=self.classroom).count(), 5)
+        self.assertEqual(
+            set(AttendanceSummary.objects.filter(classroom=self.classroom).values_list('sessionsHeld', flat=True)), {5}
+        )
+
+
+class ReportJobTests(TestCase):
+    """Background report jobs: claiming, running, requeueing and expiry"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.classroom, sessions = build_classroom(2, num_sessions=1, prefix='jobs')
+        AttendanceService.write_many([(sessions[0], {student.pk: False for student in cls.classroom.students.all()})])
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        job_dir = override_settings(ATTENDANCE_REPORT_JOB_DIR=directory.name)
+        job_dir.enable()
+        self.addCleanup(job_dir.disable)
+
+    def test_claims_oldest_job_once(self):
+        first = jobs.enqueue('defaulters', {'class_id': self.classroom.pk})
+        second = jobs.enqueue('defaulters', {'class_id': self.classroom.pk})
+        self.assertEqual(jobs.claim_next(), first.pk)
+        self.assertEqual(jobs.claim_next(), second.pk)
+        self.assertIsNone(jobs.claim_next())
+        self.assertEqual(set(ReportJob.objects.values_list('status', flat=True)), {'running'})
+
+    def test_run_job(self):
+        job = jobs.run_job(jobs.enqueue('defaulters', {'class_id': self.classroom.pk, 'threshold': 50}).pk)
+        self.assertEqual((job.status, job.progress), ('done', 100))
+        with open(jobs.result_path(job)) as result:
+            self.assertEqual(len(result.read().splitlines()), 3)
+
+        job = jobs.run_job(jobs.enqueue('defaulters', {'class_id': 0}).pk)
+        self.assertEqual((job.status, job.error), ('failed', "Class not found"))
+
+    def test_requeue_stale_and_cleanup(self):
+        job = jobs.enqueue('defaulters', {'class_id': self.classroom.pk})
+        jobs.claim_next()
+        self.assertEqual(jobs.requeue_stale(60), 0)
+        ReportJob.objects.filter(pk=job.pk).update(started=timezone.now() - datetime.timedelta(minutes=5))
+        self.assertEqual(jobs.requeue_stale(60), 1)
+        self.assertEqual(jobs.claim_next(), job.pk)
+
+        job = jobs.run_job(job.pk)
+        path = jobs.result_path(job)
+        self.assertEqual(jobs.cleanup_expired(), 0)
+        self.assertEqual(jobs.cleanup_expired(job.expires + datetime.timedelta(seconds=1)), 1)
+        self.assertFalse(ReportJob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+
+class SessionSweepTests(TestCase):
+    """Deactivating ended sessions in batches"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Sessions from 2025-03-10 to 2025-03-14, 9:00-10:00; the first one is marked
+        cls.classroom, cls.sessions = build_classroom(
+            2, num_sessions=5, prefix='sweep', start_date=datetime.date(2025, 3, 10),
+        )
+        cls.students = list(cls.classroom.students.values_list('studId', flat=True))
+        AttendanceService.write_many([(cls.sessions[0], {cls.students[0]: True})])
+        # During the session of 2025-03-12
+        cls.now = timezone.make_aware(datetime.datetime(2025, 3, 12, 9, 30))
+
+    def active(self):
+        return list(AttendanceSession.objects.filter(is_active=True).order_by('date').values_list('date', flat=True))
+
+    def test_deactivates_ended_sessions_in_batches(self):
+        result = sweep_sessions(now=self.now, batch_size=1)
+        self.assertEqual((result.deactivated, result.batches, result.marked_sessions), (2, 2, 0))
+        self.assertEqual(self.active(), [session.date for session in self.sessions[2:]])
+        self.assertEqual(sweep_sessions(now=self.now).deactivated, 0)
+
+    def test_marks_unsubmitted_sessions_absent(self):
+        result = sweep_sessions(now=self.now, mark_absent=True)
+        self.assertEqual((result.marked_sessions, result.marked_records), (1, 2))
+        self.assertEqual(
+            dict(AttendanceRecord.objects.filter(session=self.sessions[0]).values_list('student_id', 'status')),
+            {self.students[0]: True},
+        )
+        self.assertFalse(AttendanceRecord.objects.filter(session=self.sessions[1], status=True).exists())
+        self.assertIsNone(AttendanceSession.objects.get(pk=self.sessions[1].pk).markedAt)
+        self.assertEqual(SummaryService.sync_classroom(self.classroom, commit=False), 0)
+
+
+class ArchiveTests(TestCase):
+    """Packing sessions into bitmaps and restoring them"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.classroom, cls.sessions = build_classroom(
+            10, num_sessions=2, prefix='archive', start_date=datetime.date.today() - datetime.timedelta(days=3),
+        )
+        cls.students = list(cls.classroom.students.order_by('studId').values_list('studId', flat=True))
+        AttendanceService.write_many([
+            (session, {student_id: (index + offset) % 3 == 0 for index, student_id in enumerate(cls.students)})
+            for offset, session in enumerate(cls.sessions)
+        ])
+        AttendanceSession.objects.filter(classroom=cls.classroom).update(is_active=False)
+
+    def records(self):
+        return set(AttendanceRecord.objects.filter(session__classroom=self.classroom).values_list(
+            'session_id', 'student_id', 'status'
+        ))
+
+    def test_pack_round_trip(self):
+        for statuses in ({}, {5: True}, {student_id: student_id % 2 == 0 for student_id in range(1, 20)}):
+            with self.subTest(size=len(statuses)):
+                archived = ArchivedSession.pack(self.sessions[0].pk, statuses)
+                self.assertEqual(archived.statuses(), statuses)
+                self.assertEqual(archived.presentCount, sum(statuses.values()))
+
+    def test_compact_and_restore(self):
+        records = self.records()
+        rows = list(archive.session_rows(self.sessions[0]))
+
+        result = archive.compact_sessions(datetime.date.today())
+        self.assertEqual((result.sessions, result.records), (2, 20))
+        self.assertEqual(self.records(), set())
+        # Fetched again: the instance above has cached that it has no archive
+        self.assertEqual(list(archive.session_rows(AttendanceSession.objects.get(pk=self.sessions[0].pk))), rows)
+        self.assertEqual(SummaryService.sync_classroom(self.classroom, commit=False), 0)
+
+        self.assertEqual(archive.restore_sessions([session.pk for session in self.sessions]), 20)
+        self.assertFalse(ArchivedSession.objects.exists())
+        self.assertEqual(self.records(), records)
+        self.assertEqual(SummaryService.sync_classroom(self.classroom, commit=False), 0)
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('archive_sessions', '--before', datetime.date.today().isoformat(), stdout=out)
+        self.assertIn("Archived 2 session(s)", out.getvalue())
+        for value in ('2025-02-3x', '2025-02-30'):
+            with self.subTest(value=value):
+                with self.assertRaisesMessage(CommandError, f"Invalid date: {value}"):
+                    call_command('archive_sessions', '--before', value, stdout=out)
+
+
+class StudentHistoryTests(TestCase):
+    """Cached cross-class histories stay current when attendance or rosters change"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.first, first_sessions = build_classroom(1, num_sessions=2, prefix='history-a')
+        cls.second, cls.second_sessions = build_classroom(0, num_sessions=1, prefix='history-b')
+        cls.student = cls.first.students.get()
+        AttendanceService.write_many([(session, {cls.student.pk: True}) for session in first_sessions])
+
+    def setUp(self):
+        cache.clear()
+
+    def overall(self):
+        history = profiles.get_histories([self.student.pk])[self.student.pk]
+        return [row['className'] for row in history['classes']], history['overall']
+
+    def test_cached_until_invalidated(self):
+        self.assertEqual(self.overall(), (['history-a class'], {'held': 2, 'present': 2, 'percentage': 100.0}))
+        # Changed behind the cache's back: still served from the cache
+        AttendanceSummary.objects.filter(student=self.student).update(sessionsPresent=0)
+        self.assertEqual(self.overall()[1]['present'], 2)
+        profiles.invalidate_classrooms([self.first.pk])
+        self.assertEqual(self.overall()[1]['present'], 0)
+
+    def test_enrolment_and_marking(self):
+        self.overall()
+        self.second.students.add(self.student)
+        SummaryService.students_enrolled(self.second, [self.student.pk])
+        self.assertEqual(
+            self.overall(), (['history-a class', 'history-b class'], {'held': 3, 'present': 2, 'percentage': 66.67})
+        )
+        AttendanceService.write_many([(self.second_sessions[0], {self.student.pk: True})])
+        self.assertEqual(self.overall()[1], {'held': 3, 'present': 3, 'percentage': 100.0})
+
+
+class RegisterPDFTests(TestCase):
+    """The streamed semester register"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.classroom, cls.sessions = build_classroom(
+            0, num_sessions=2, prefix='register', start_date=datetime.date.today() - datetime.timedelta(days=2),
+        )
+        # Keys whose order depends on the collation (case, punctuation)
+        keys = ['ab-1', 'AB-2', 'ab_3', 'Ab.4', 'ab1']
+        students = [
+            Student.objects.create(studKey=key, name=f"Register {key}", department=cls.classroom.department)
+            for key in keys
+        ]
+        cls.classroom.students.add(*students)
+        SummaryService.students_enrolled(cls.classroom, [student.pk for student in students])
+        # Present in the first session on even positions; everyone but the last marked in the second
+        AttendanceService.write_many([
+            (cls.sessions[0], {student.pk: index % 2 == 0 for index, student in enumerate(students)}),
+            (cls.sessions[1], {student.pk: True for student in students[:-1]}),
+        ])
+        cls.expected = {
+            key: ['P' if index % 2 == 0 else 'A', 'P' if index < len(keys) - 1 else '-']
+            for index, key in enumerate(keys)
+        }
+
+    def rows(self):
+        """studKey -> session cells, read back from the drawn pages"""
+        pdf = b''.join(ReportGenerator.stream_register_pdf(self.classroom))
+        self.assertTrue(pdf.startswith(b'%PDF') and pdf.endswith(b'%%EOF\n'))
+        rows = {}
+        for stream in re.findall(rb'stream\n(.*?)\nendstream', pdf, re.S):
+            lines = {}
+            for x, y, text in re.findall(rb'([\d.]+) ([\d.]+) Td \((.*?)\) Tj', zlib.decompress(stream)):
+                lines.setdefault(float(y), []).append((float(x), text.decode()))
+            for cells in lines.values():
+                texts = [text for _, text in sorted(cells)]
+                if texts[0] in self.expected:
+                    rows[texts[0]] = texts[2:-1]
+        return rows
+
+    def test_cells(self):
+        self.assertEqual(self.rows(), self.expected)
+
+    def test_cells_across_pages(self):
+        with mock.patch.object(ReportGenerator, 'REGISTER_STUDENTS_PER_PAGE', 2):
+            self.assertEqual(self.rows(), self.expected)
+
+    def test_archived_sessions(self):
+        AttendanceSession.objects.filter(pk=self.sessions[0].pk).update(is_active=False)
+        archive.compact_sessions(self.sessions[1].date)
+        self.assertTrue(ArchivedSession.objects.filter(session=self.sessions[0]).exists())
+        self.assertEqual(self.rows(), self.expected)
+
+
+class ExportCommandTests(TestCase):
+    """The export_attendance management command"""
+
+    def test_rejects_invalid_dates(self):
+        for value in ('2025-02-3x', '2025-02-30'):
+            with self.subTest(value=value):
+                with self.assertRaisesMessage(CommandError, f"Invalid date: {value}"):
+                    call_command('export_attendance', '--from', value, stdout=io.StringIO())
+
+    def test_writes_filtered_csv(self):
+        classroom, sessions = build_classroom(2, num_sessions=2, prefix='export-command')
+        AttendanceService.write_many([
+            (session, {student.pk: True for student in classroom.students.all()}) for session in sessions
+        ])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'export.csv')
+            call_command('export_attendance', '--to', sessions[0].date.isoformat(), '--output', path)
+            with open(path) as export:
+                self.assertEqual(len(export.read().splitlines()), 3)
+
+
+class PDFCacheTests(TestCase):
+    """Session PDFs: ETag validation, invalidation and the size-limited disk cache"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.classroom, sessions = build_classroom(2, num_sessions=1, prefix='pdfcache')
+        cls.session = sessions[0]
+        cls.students = list(cls.classroom.students.order_by('studId'))
+        AttendanceService.write_many([(cls.session, {student.pk: True for student in cls.students})])
+        cls.admin = User.objects.create_superuser('pdfcache-admin', 'admin@example.com', 'x')
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        cache_dir = override_settings(ATTENDANCE_PDF_CACHE_DIR=self.directory)
+        cache_dir.enable()
+        self.addCleanup(cache_dir.disable)
+        self.client.force_login(self.admin)
+
+    def get(self, **headers):
+        return self.client.get(reverse('attendance-pdf'), {'session_id': self.session.pk}, **headers)
+
+    def test_etag_round_trip(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content.startswith(b'%PDF'))
+        etag = response['ETag']
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        AttendanceService.write_many([(self.session, {self.students[0].pk: False})])
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_renaming_a_student_changes_the_etag(self):
+        etag = self.get()['ETag']
+        self.students[1].name = "Renamed student"
+        self.students[1].save()
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_marking_removes_the_cached_render(self):
+        self.get()
+        path = os.path.join(self.directory, f"session-{self.session.pk}.pdf")
+        self.assertTrue(os.path.exists(path))
+        self.get()
+        self.assertEqual(get_pdf_cache().stats()['entries'], 1)
+
+        AttendanceService.write_many([(self.session, {self.students[0].pk: False})])
+        self.assertFalse(os.path.exists(path))
+        # Re-marking with the same statuses changes nothing
+        self.get()
+        AttendanceService.write_many([(self.session, {self.students[0].pk: False})])
+        self.assertTrue(os.path.exists(path))
+
+    def test_stale_render_is_a_miss(self):
+        pdf_cache = get_pdf_cache()
+        pdf_cache.put(1, 'old', b'old render')
+        self.assertEqual(pdf_cache.get(1, 'old'), b'old render')
+        self.assertIsNone(pdf_cache.get(1, 'new'))
+
+    def test_evicts_least_recently_used(self):
+        pdf_cache = PDFCache(self.directory, max_bytes=250)
+        pdf_cache.put(1, 'a', b'x' * 90)
+        pdf_cache.put(2, 'b', b'x' * 90)
+        os.utime(os.path.join(self.directory, 'session-1.pdf'), (1000, 1000))
+        os.utime(os.path.join(self.directory, 'session-2.pdf'), (2000, 2000))
+        # A hit makes session 1 the most recently used
+        self.assertIsNotNone(pdf_cache.get(1, 'a'))
+        pdf_cache.put(3, 'c', b'x' * 90)
+        self.assertIsNotNone(pdf_cache.get(1, 'a'))
+        self.assertIsNone(pdf_cache.get(2, 'b'))
+        self.assertIsNotNone(pdf_cache.get(3, 'c'))
+        self.assertLessEqual(pdf_cache.stats()['bytes'], 250)
+
+
+class CounterTests(TestCase):
+    """Dashboard counters kept by signals and services, and their reconciliation"""
+
+    TOTALS = ['students', 'teachers', 'classes', 'subjects']
+
+    def totals(self):
+        return CounterService.read(self.TOTALS)
+
+    def daily(self, day):
+        return CounterService.read([CounterService.daily('sessions', day), CounterService.daily('marked', day)])
+
+    def test_totals_follow_create_and_delete(self):
+        before = self.totals()
+        department = Department.objects.create(deptName="Counter department")
+        teacher = Teacher.objects.create(user=User.objects.create_user('counter-teacher'), department=department)
+        subject = Subject.objects.create(subName="Counter subject", credits=3, department=department)
+        classroom = Classroom.objects.create(
+            className="Counter class", year='2025-26', semester='Sem I',
+            teacher=teacher, subject=subject, department=department,
+        )
+        student = Student.objects.create(studKey='counter-1', name="Counter student", department=department)
+        self.assertEqual(self.totals(), {name: value + 1 for name, value in before.items()})
+
+        # Saving again is not creating
+        student.name = "Renamed"
+        student.save()
+        self.assertEqual(self.totals()['students'], before['students'] + 1)
+
+        for instance in (student, classroom, subject, teacher):
+            instance.delete()
+        self.assertEqual(self.totals(), before)
+
+    def test_daily_counters_follow_sessions_and_records(self):
+        day = datetime.date(2025, 3, 10)
+        other = datetime.date(2025, 3, 11)
+        classroom, sessions = build_classroom(2, num_sessions=1, prefix='counter-daily', start_date=day)
+        self.assertEqual(self.daily(day), {f'sessions:{day}': 1, f'marked:{day}': 0})
+        session = AttendanceSession.objects.create(
+            classroom=classroom, date=day, startTime=datetime.time(11, 0), endTime=datetime.time(12, 0),
+        )
+        AttendanceService.write_many([(session, {student.pk: True for student in classroom.students.all()})])
+        self.assertEqual(self.daily(day), {f'sessions:{day}': 2, f'marked:{day}': 2})
+
+        self.daily(other)
+        session.date = other
+        session.save()
+        self.assertEqual(self.daily(day), {f'sessions:{day}': 1, f'marked:{day}': 0})
+        self.assertEqual(self.daily(other), {f'sessions:{other}': 1, f'marked:{other}': 2})
+
+        classroom.students.first().delete()
+        self.assertEqual(self.daily(other)[f'marked:{other}'], 1)
+        session.delete()
+        self.assertEqual(self.daily(other), {f'sessions:{other}': 0, f'marked:{other}': 0})
+        self.assertEqual(CounterService.reconcile(commit=False), [])
+
+    def test_bulk_paths(self):
+        before = self.totals()['students']
+        # Services that bulk insert adjust the counter themselves
+        result = StudentImporter().run([{'studKey': 'counter-import', 'name': "Imported"}])
+        self.assertEqual(result.created, 1)
+        self.assertEqual(self.totals()['students'], before + 1)
+        # A bare bulk_create sends no signals: the counter drifts until reconciled
+        Student.objects.bulk_create([Student(studKey=f'counter-bulk-{i}', name="Bulk") for i in range(3)])
+        self.assertEqual(self.totals()['students'], before + 1)
+        self.assertEqual(CounterService.reconcile(commit=False), [('students', before + 1, before + 4)])
+
+    def test_reconcile_command(self):
+        self.totals()
+        Counter.objects.filter(name='students').update(value=F('value') + 5)
+        with self.assertRaises(SystemExit):
+            call_command('reconcile_counters', '--verify', stdout=io.StringIO(), stderr=io.StringIO())
+        out = io.StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn("1 repaired", out.getvalue())
+        self.assertEqual(self.totals()['students'], Student.objects.count())
+        call_command('reconcile_counters', '--verify', stdout=out)
+
+
+class DashboardScheduleTests(TestCase):
+    """A teacher's cached schedule for today follows changes to their sessions and classes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.classroom, sessions = build_classroom(1, num_sessions=1, prefix='schedule')
+        cls.session = sessions[0]
+        cls.user = cls.classroom.teacher.user
+        cls.other = Teacher.objects.create(
+            user=User.objects.create_user('schedule-other'), department=cls.classroom.department,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def schedule(self, user=None):
+        return [session['sessionId'] for session in dashboard.get_schedule(user or self.user)]
+
+    def new_session(self, day):
+        return AttendanceSession.objects.create(
+            classroom=self.classroom, date=day, startTime=datetime.time(11, 0), endTime=datetime.time(12, 0),
+        )
+
+    def test_sessions_created_moved_and_deleted(self):
+        self.assertEqual(self.schedule(), [self.session.pk])
+        session = self.new_session(dashboard.today())
+        self.assertEqual(self.schedule(), [self.session.pk, session.pk])
+
+        session.startTime, session.endTime = datetime.time(7, 0), datetime.time(8, 0)
+        session.save()
+        self.assertEqual(self.schedule(), [session.pk, self.session.pk])
+
+        session.date = dashboard.today() + datetime.timedelta(days=1)
+        session.save()
+        self.assertEqual(self.schedule(), [self.session.pk])
+        session.date = dashboard.today()
+        session.save()
+        self.assertEqual(self.schedule(), [session.pk, self.session.pk])
+
+        session.delete()
+        self.assertEqual(self.schedule(), [self.session.pk])
+
+    def test_sessions_created_in_bulk(self):
+        self.assertEqual(self.schedule(), [self.session.pk])
+        rule = RecurrenceRule(
+            [dashboard.today().weekday()], datetime.time(14, 0), datetime.time(15, 0),
+            dashboard.today(), dashboard.today(),
+        )
+        create_timetable(plan_timetable([self.classroom], rule))
+        self.assertEqual(len(self.schedule()), 2)
+
+    def test_class_reassigned(self):
+        self.assertEqual(self.schedule(), [self.session.pk])
+        self.assertEqual(self.schedule(self.other.user), [])
+        self.classroom.teacher = self.other
+        self.classroom.save()
+        self.assertEqual(self.schedule(), [])
+        self.assertEqual(self.schedule(self.other.user), [self.session.pk])
+
+    def test_subject_renamed(self):
+        dashboard.get_schedule(self.user)
+        self.classroom.subject.subName = "Renamed subject"
+        self.classroom.subject.save()
+        self.assertEqual(dashboard.get_schedule(self.user)[0]['subName'], "Renamed subject")
+
+    def test_dashboard_page(self):
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(reverse('dashboard')), self.classroom.className)
+        self.classroom.className = "Renamed class"
+        self.classroom.save()
+        self.assertContains(self.client.get(reverse('dashboard')), "Renamed class")
+
+
+class RosterAPITests(TestCase):
+    """Conditional requests against the department roster API"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.classroom, _ = build_classroom(3, num_sessions=0, prefix='roster')
+        cls.department = cls.classroom.department
+        cls.other = Department.objects.create(deptName="Other roster department")
+        cls.admin = User.objects.create_superuser('roster-admin', 'admin@example.com', 'x')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def get(self, department=None, **headers):
+        department = department or self.department
+        return self.client.get(reverse('student-roster-api'), {'department_id': department.pk}, **headers)
+
+    def assertRevalidates(self, etag, department=None):
+        """A request with the old ETag gets the new roster; the new ETag gives a 304"""
+        response = self.get(department, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.get(department, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        return response
+
+    def test_repeat_request_is_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['students']), 3)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_saving_a_student_changes_the_etag(self):
+        etag = self.get()['ETag']
+        student = Student.objects.filter(department=self.department).first()
+        student.name = "Renamed"
+        student.save()
+        response = self.assertRevalidates(etag)
+        self.assertIn("Renamed", [row['name'] for row in response.json()['students']])
+
+    def test_moving_a_student_changes_both_departments(self):
+        etags = [self.get()['ETag'], self.get(self.other)['ETag']]
+        student = Student.objects.filter(department=self.department).first()
+        student.department = self.other
+        student.save()
+        self.assertEqual(len(self.assertRevalidates(etags[0]).json()['students']), 2)
+        self.assertEqual(len(self.assertRevalidates(etags[1], self.other).json()['students']), 1)
+
+    def test_importing_students_changes_the_etag(self):
+        etag = self.get()['ETag']
+        StudentImporter().run([
+            {'studKey': 'roster-import', 'name': "Imported", 'department': self.department.deptName},
+        ])
+        self.assertEqual(len(self.assertRevalidates(etag).json()['students']), 4)
+
+
+class SweepDefaultersTests(TestCase):
+    """The sweep_defaulters command against get_defaulter_list"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.classes = []
+        for prefix, year, semester in (('sweep-a', '2025-26', 'Sem I'), ('sweep-b', '2025-26', 'Sem II'),
+                                       ('sweep-c', '2024-25', 'Sem I')):
+            classroom, sessions = build_classroom(
+                3, num_sessions=4, prefix=prefix, start_date=datetime.date(2025, 3, 3),
+            )
+            Classroom.objects.filter(pk=classroom.pk).update(year=year, semester=semester)
+            students = list(classroom.students.order_by('studId'))
+            # Student i attends the first i sessions: 0%, 25% and 50%
+            AttendanceService.write_many([
+                (session, {student.pk: index < position for position, student in enumerate(students)})
+                for index, session in enumerate(sessions)
+            ])
+            cls.classes.append(classroom)
+
+    def sweep(self, *args, fmt='csv'):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, f'defaulters.{fmt}')
+            call_command('sweep_defaulters', '--workers', '1', '--shard-size', '2', '--format', fmt,
+                         '--output', path, *args, stderr=io.StringIO())
+            with open(path, newline='') as output:
+                if fmt == 'json':
+                    return json.load(output)
+                return list(csv.DictReader(output))
+
+    def expected(self, classes, threshold):
+        return [
+            (classroom.classId, defaulter['student'].studKey, defaulter['percentage'])
+            for classroom in classes
+            for defaulter in ReportGenerator.get_defaulter_list(classroom.classId, threshold)[1]
+        ]
+
+    def test_json_output(self):
+        rows = self.sweep('--threshold', '30', fmt='json')
+        self.assertEqual(
+            [(row['classId'], row['studKey'], row['percentage']) for row in rows], self.expected(self.classes, 30),
+        )
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]['department'], self.classes[0].department.deptName)
+
+    def test_csv_output(self):
+        rows = self.sweep()
+        self.assertEqual(
+            [(int(row['classId']), row['studKey'], float(row['percentage'])) for row in rows],
+            self.expected(self.classes, 75),
+        )
+        self.assertEqual(list(rows[0]), ['classId', 'className', 'subject', 'department', 'year', 'semester',
+                                         'studKey', 'name', 'present', 'total', 'percentage'])
+
+    def test_filters(self):
+        def classes(*args):
+            return sorted({int(row['classId']) for row in self.sweep(*args)})
+
+        first, second, third = (classroom.classId for classroom in self.classes)
+        self.assertEqual(classes('--department', str(self.classes[1].department_id)), [second])
+        self.assertEqual(classes('--department', self.classes[2].department.deptName), [third])
+        self.assertEqual(classes('--year', '2025-26'), [first, second])
+        self.assertEqual(classes('--semester', 'Sem I'), [first, third])
+        self.assertEqual(classes('--year', '2025-26', '--semester', 'Sem II'), [second])
+        self.assertEqual(self.sweep('--year', '2026-27'), [])
+
+
+class BootstrapTests(TestCase):
+    """bootstrap_system is safe to re-run"""
+
+    def test_second_run_creates_nothing(self):
+        for _ in range(2):
+            call_command('bootstrap_system', '--admin-password', 'secret', stdout=io.StringIO())
+        self.assertEqual(User.objects.filter(is_superuser=True).count(), 1)
+        self.assertEqual(Department.objects.count(), 1)
+        self.assertEqual(Subject.objects.count(), 1)
+        admin = User.objects.get(username='admin')
+        self.assertTrue(admin.is_staff and admin.check_password('secret'))
+        self.assertEqual(Subject.objects.get().department, Department.objects.get())
@@ -0,0 +1,255 @@
+"""
+Weekly and monthly attendance-rate trends.
+
+AttendanceTrend holds the present and marked record counts of each class
+per week and per month, computed in the database with TruncWeek/TruncMonth
+over the records (and archived sessions) grouped by session date. Writing
+attendance calls apply_changes() with the present/marked deltas of the class
+days it touched, which adjusts the buckets in place the way SummaryService
+adjusts summaries, with one UPDATE per bucket and no aggregate. Moving or
+deleting sessions calls refresh(), which recomputes only the buckets
+containing the given days. series() then sums the buckets by
+department, subject, class or year/semester, so the report dashboard never
+aggregates raw records.
+
+Bucket counts are historical: deleting a student leaves their records in
+the buckets until rebuild_trends is run, as archived sessions do.
+"""
+import datetime
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+from .models import ArchivedSession, AttendanceRecord, AttendanceSession, AttendanceTrend
+
+PERIODS = {
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+# group -> (fields identifying a series, fields making up its label)
+GROUPS = {
+    'department': (['classroom__department_id'], ['classroom__department__deptName']),
+    'subject': (['classroom__subject_id'], ['classroom__subject__subName']),
+    'classroom': (['classroom_id'], ['classroom__className']),
+    'term': (['classroom__year', 'classroom__semester'], ['classroom__year', 'classroom__semester']),
+}
+
+# Buckets returned by series() when no start date is given
+DEFAULT_SPAN = {
+    'week': 26,
+    'month': 12,
+}
+
+
+def period_start(period, day):
+    """First day of the week (Monday) or month containing day"""
+    if period == 'week':
+        return day - datetime.timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def period_end(period, start):
+    """First day of the bucket after the one starting on start"""
+    if period == 'week':
+        return start + datetime.timedelta(days=7)
+    return (start + datetime.timedelta(days=31)).replace(day=1)
+
+
+def count_buckets(period, sessions):
+    """
+    Count present and marked records of the given sessions per class and
+    bucket, with one grouped query over the records and one over the
+    archived sessions
+    Args:
+        period: 'week' or 'month'
+        sessions: list of session IDs or an AttendanceSession queryset
+    Returns:
+        dict: (classroom_id, period start) -> [present, marked]
+    """
+    trunc = PERIODS[period]
+    counts = {}
+    records = (
+        AttendanceRecord.objects.filter(session_id__in=sessions)
+        .annotate(start=trunc('session__date'))
+        .values_list('session__classroom_id', 'start')
+        .annotate(present=Count('recordId', filter=Q(status=True)), marked=Count('recordId'))
+        .order_by()
+    )
+    archived = (
+        ArchivedSession.objects.filter(session_id__in=sessions)
+        .annotate(start=trunc('session__date'))
+        .values_list('session__classroom_id', 'start')
+        .annotate(present=Sum('presentCount'), marked=Sum('rosterSize'))
+        .order_by()
+    )
+    for rows in (records, archived):
+        for classroom_id, start, present, marked in rows:
+            totals = counts.setdefault((classroom_id, start), [0, 0])
+            totals[0] += present
+            totals[1] += marked
+    return counts
+
+
+def refresh(slots):
+    """
+    Recompute the week and month buckets containing the given class days
+    Args:
+        slots: iterable of (classroom_id, date) pairs, e.g. of sessions just marked
+    Returns:
+        int: Number of buckets written or removed
+    """
+    slots = {(classroom_id, day) for classroom_id, day in slots if classroom_id is not None}
+    written = 0
+    for period in PERIODS:
+        buckets = {(classroom_id, period_start(period, day)) for classroom_id, day in slots}
+        if not buckets:
+            continue
+        ranges = Q()
+        for classroom_id, start in buckets:
+            ranges |= Q(classroom_id=classroom_id, date__gte=start, date__lt=period_end(period, start))
+        session_ids = list(AttendanceSession.objects.filter(ranges).values_list('sessionId', flat=True))
+        counts = count_buckets(period, session_ids) if session_ids else {}
+
+        now = timezone.now()
+        AttendanceTrend.objects.bulk_create(
+            [
+                AttendanceTrend(
+                    classroom_id=classroom_id, period=period, periodStart=start,
+                    present=counts[(classroom_id, start)][0], marked=counts[(classroom_id, start)][1],
+                    lastUpdated=now,
+                )
+                for classroom_id, start in buckets if (classroom_id, start) in counts
+            ],
+            update_conflicts=True,
+            unique_fields=['classroom', 'period', 'periodStart'],
+            update_fields=['present', 'marked', 'lastUpdated'],
+        )
+        # Emptied buckets are deleted rather than stored as zero, so a class
+        # being deleted never gets a new bucket inserted on its way out
+        emptied = Q()
+        for classroom_id, start in buckets:
+            if (classroom_id, start) not in counts:
+                emptied |= Q(classroom_id=classroom_id, periodStart=start)
+        if emptied:
+            AttendanceTrend.objects.filter(emptied, period=period).delete()
+        written += len(buckets)
+    return written
+
+
+def apply_changes(deltas):
+    """
+    Adjust the week and month buckets by changes in record counts
+    Args:
+        deltas: dict of (classroom_id, date) -> [change in present, change in marked]
+    """
+    now = timezone.now()
+    for period in PERIODS:
+        buckets = {}
+        for (classroom_id, day), (present, marked) in deltas.items():
+            totals = buckets.setdefault((classroom_id, period_start(period, day)), [0, 0])
+            totals[0] += present
+            totals[1] += marked
+
+        def update(classroom_id, start, present, marked):
+            return AttendanceTrend.objects.filter(
+                classroom_id=classroom_id, period=period, periodStart=start,
+            ).update(present=F('present') + present, marked=F('marked') + marked, lastUpdated=now)
+
+        missing = [
+            (classroom_id, start, present, marked)
+            for (classroom_id, start), (present, marked) in buckets.items()
+            if (present or marked) and not update(classroom_id, start, present, marked)
+        ]
+        if missing:
+            # First records of a bucket: insert it empty (another writer may
+            # have just done so) and apply the change as for existing ones
+            AttendanceTrend.objects.bulk_create(
+                [
+                    AttendanceTrend(
+                        classroom_id=classroom_id, period=period, periodStart=start,
+                        present=0, marked=0, lastUpdated=now,
+                    )
+                    for classroom_id, start, _, _ in missing
+                ],
+                ignore_conflicts=True,
+            )
+            for bucket in missing:
+                update(*bucket)
+
+
+def rebuild(classroom_ids=None):
+    """
+    Recompute every bucket, or those of some classes, from scratch
+    Returns:
+        int: Number of buckets stored
+    """
+    sessions = AttendanceSession.objects.all()
+    trends = AttendanceTrend.objects.all()
+    if classroom_ids is not None:
+        sessions = sessions.filter(classroom_id__in=classroom_ids)
+        trends = trends.filter(classroom_id__in=classroom_ids)
+
+    trends.delete()
+    now = timezone.now()
+    stored = 0
+    for period in PERIODS:
+        buckets = [
+            AttendanceTrend(
+                classroom_id=classroom_id, period=period, periodStart=start,
+                present=present, marked=marked, lastUpdated=now,
+            )
+            for (classroom_id, start), (present, marked) in count_buckets(period, sessions).items()
+        ]
+        AttendanceTrend.objects.bulk_create(buckets, batch_size=500)
+        stored += len(buckets)
+    return stored
+
+
+def series(period='week', group='department', since=None, department_id=None):
+    """
+    Attendance-rate series summed from the stored buckets
+    Args:
+        period: 'week' or 'month'
+        group: key of GROUPS
+        since: First bucket to include (default the last DEFAULT_SPAN buckets)
+        department_id: Only include classes of this department
+    Returns:
+        list: dicts with the series 'label' and its 'points', each a dict of
+            start, present, marked and rate (percentage of marked records present)
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period '{period}'")
+    if group not in GROUPS:
+        raise ValueError(f"Unknown group '{group}'")
+    if since is None:
+        since = period_start(period, timezone.localdate())
+        for _ in range(DEFAULT_SPAN[period] - 1):
+            since = period_start(period, since - datetime.timedelta(days=1))
+
+    key_fields, label_fields = GROUPS[group]
+    buckets = AttendanceTrend.objects.filter(period=period, periodStart__gte=since)
+    if department_id:
+        buckets = buckets.filter(classroom__department_id=department_id)
+    rows = (
+        buckets.values(*dict.fromkeys(key_fields + label_fields), start=F('periodStart'))
+        .annotate(present_total=Sum('present'), marked_total=Sum('marked'))
+        .order_by(*key_fields, 'periodStart')
+    )
+
+    result = []
+    current = None
+    for row in rows:
+        key = tuple(row[field] for field in key_fields)
+        if current is None or current['key'] != key:
+            current = {'key': key, 'label': ' '.join(str(row[field]) for field in label_fields), 'points': []}
+            result.append(current)
+        present, marked = row['present_total'], row['marked_total']
+        current['points'].append({
+            'start': row['start'].isoformat(),
+            'present': present,
+            'marked': marked,
+            'rate': round(present * 100.0 / marked, 2) if marked else None,
+        })
+    for entry in result:
+        del entry['key']
+    return result
@@ -10,6 +10,8 @@ urlpatterns = [
     path('login/', views.CustomLoginView.as_view(), name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('api/students/', views.StudentAPIView.as_view(), name='student-api'),
+    path('api/v2/students/', views.StudentRosterAPIView.as_view(), name='student-roster-api'),
+    path('api/students/history/', views.StudentHistoryAPIView.as_view(), name='student-history-api'),
     
     # Dashboard
     path('dashboard/', views.DashboardView.as_view(), name='dashboard'),
@@ -17,8 +19,10 @@ urlpatterns = [
     # Student CRUD
     path('students/', views.StudentListView.as_view(), name='student-list'),
     path('students/create/', views.StudentCreateView.as_view(), name='student-create'),
+    path('students/import/', views.StudentImportView.as_view(), name='student-import'),
     path('students/<int:pk>/update/', views.StudentUpdateView.as_view(), name='student-update'),
     path('students/<int:pk>/delete/', views.StudentDeleteView.as_view(), name='student-delete'),
+    path('students/<int:pk>/attendance/', views.StudentAttendanceView.as_view(), name='student-attendance'),
     
     # Teacher CRUD
     path('teachers/', views.TeacherListView.as_view(), name='teacher-list'),
@@ -47,14 +51,26 @@ urlpatterns = [
     # Session CRUD
     path('sessions/', views.AttendanceSessionListView.as_view(), name='session-list'),
     path('sessions/create/', views.AttendanceSessionCreateView.as_view(), name='session-create'),
+    path('sessions/timetable/', views.SessionTimetableView.as_view(), name='session-timetable'),
     path('sessions/<int:pk>/update/', views.AttendanceSessionUpdateView.as_view(), name='session-update'),
     path('sessions/<int:pk>/delete/', views.AttendanceSessionDeleteView.as_view(), name='session-delete'),
     
     # Teacher Features
     path('mark-attendance/<int:session_id>/', views.MarkAttendanceView.as_view(), name='mark-attendance'),
+    path('api/sessions/<int:session_id>/attendance/', views.MarkAttendanceChangesView.as_view(), name='mark-attendance-changes'),
+    path('api/attendance/sync/', views.AttendanceSyncView.as_view(), name='attendance-sync'),
     
     # Reports
     path('reports/', views.ReportDashboardView.as_view(), name='report-dashboard'),
     path('reports/defaulters/', views.DefaulterReportView.as_view(), name='defaulter-report'),
+    path('reports/trends/', views.AttendanceTrendView.as_view(), name='attendance-trends'),
+    path('reports/analytics/', views.ClassroomAnalyticsView.as_view(), name='classroom-analytics'),
+    path('reports/projection/', views.ProjectionReportView.as_view(), name='projection-report'),
     path('reports/attendance-pdf/', views.AttendancePDFView.as_view(), name='attendance-pdf'),
+    path('reports/pdf-cache/stats/', views.PDFCacheStatsView.as_view(), name='pdf-cache-stats'),
+    path('reports/export/', views.AttendanceExportView.as_view(), name='attendance-export'),
+    path('reports/register-pdf/', views.AttendanceRegisterPDFView.as_view(), name='register-pdf'),
+    path('reports/jobs/<int:pk>/', views.ReportJobView.as_view(), name='report-job'),
+    path('reports/jobs/<int:pk>/status/', views.ReportJobStatusView.as_view(), name='report-job-status'),
+    path('reports/jobs/<int:pk>/download/', views.ReportJobDownloadView.as_view(), name='report-job-download'),
 ]
\ No newline at end of file
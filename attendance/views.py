@@ -1,63 +1,49 @@
+import json
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views import View
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.contrib.auth.mixins import UserPassesTestMixin
-from django.http import HttpResponse, JsonResponse
-from django.db.models import Count
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse,
+)
+from django.db import transaction
+from django.db.models import Count, Q
 from django.contrib.auth.models import User
-from django.utils import timezone
+from django.contrib import messages
+from django.core.exceptions import ValidationError
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_date
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition
 from .models import *
-from .services import AttendanceService, ReportGenerator
+from . import analytics, dashboard, jobs, profiles, trends
+from .services import (
+    AttendanceService, CounterService, ReportGenerator, RosterService, SummaryService, SyncService,
+)
 from .forms import *
-
-# AUTO-INITIALIZATION FUNCTION
-def initialize_system():
-    """Automatically create admin account and initial data if they don't exist"""
-    try:
-        # Create admin user if doesn't exist
-        if not User.objects.filter(username='admin').exists():
-            User.objects.create_superuser(
-                username='admin',
-                email='admin@example.com', 
-                password='123'
-            )
-            print("Admin user created: admin / admin123")
-        
-        # Create default department if none exist
-        if not Department.objects.exists():
-            Department.objects.create(deptName="Computer Engineering")
-            print("Default department created")
-            
-        # Create default subject if none exist  
-        if not Subject.objects.exists():
-            dept = Department.objects.first()
-            Subject.objects.create(
-                subName="Data Structures",
-                credits=4,
-                department=dept
-            )
-            print("Default subject created")
-            
-    except Exception as e:
-        print(f"Initialization error: {e}")
-
-# Call this function when the app starts
-initialize_system()
+from .pdfcache import get_pdf_cache, session_fingerprint
+from .exports import export_rows, iter_csv, gzip_stream
+from .importers import StudentImporter, read_rows
+from .scheduling import RecurrenceRule, plan_timetable, create_timetable
+from .pagination import KeysetPaginator, InvalidCursor
 
 class StudentAPIView(View):
     def get(self, request):
         department_id = request.GET.get('department_id')
         if department_id:
-            students = Student.objects.filter(department_id=department_id)
+            students = Student.objects.filter(department_id=department_id).values_list('studId', 'name', 'studKey')
             student_data = [
                 {
-                    'id': student.studId,
-                    'name': student.name,
-                    'studKey': student.studKey
+                    'id': stud_id,
+                    'name': name,
+                    'studKey': stud_key
                 }
-                for student in students
+                for stud_id, name, stud_key in students
             ]
             return JsonResponse({'students': student_data})
         return JsonResponse({'students': []})
@@ -86,12 +72,90 @@ class TeacherRequiredMixin(UserPassesTestMixin):
     def test_func(self):
         return self.request.user.is_authenticated and not self.request.user.is_staff
 
+class KeysetListMixin:
+    """Cursor pagination and GET filters shared by the admin list views"""
+    per_page = 50
+    filter_params = ()
+
+    def get_filters(self, request):
+        return {param: request.GET.get(param, '') for param in self.filter_params}
+
+    def paginate(self, request, queryset, ordering):
+        paginator = KeysetPaginator(queryset, ordering, self.per_page)
+        try:
+            return paginator.page(request.GET.get('cursor'))
+        except InvalidCursor:
+            return paginator.page()
+
+    def list_context(self, request, page, filters):
+        return {
+            'page': page,
+            'filters': filters,
+            # Current filters without the cursor, for building page links
+            'filter_query': urlencode({key: value for key, value in filters.items() if value}),
+            'departments': Department.objects.all(),
+        }
+
+def _roster_state(request):
+    """Roster (version, last change) of the requested department, read once per request"""
+    if not hasattr(request, '_roster_state'):
+        department_id = request.GET.get('department_id', '')
+        request._roster_state = RosterService.state(department_id) if department_id.isdigit() else None
+    return request._roster_state
+
+def roster_etag(request):
+    state = _roster_state(request)
+    if state is None:
+        return None
+    return f'"roster-v2-{request.GET["department_id"]}-{state[0]}"'
+
+def roster_last_modified(request):
+    state = _roster_state(request)
+    return state[1] if state else None
+
+class StudentRosterAPIView(AdminRequiredMixin, View):
+    """
+    Department roster for the class form's student picker. Supports prefix
+    search (?q=) on studKey and name and cursor pagination (?cursor=). Responses
+    carry validators from the department's roster version, so clients revalidate
+    with a single-row query and get a 304 while the roster is unchanged.
+    """
+    per_page = 50
+    max_per_page = 200
+
+    @method_decorator(gzip_page)
+    @method_decorator(condition(etag_func=roster_etag, last_modified_func=roster_last_modified))
+    def get(self, request):
+        if _roster_state(request) is None:
+            return JsonResponse({'error': 'Unknown or missing department_id'}, status=400)
+
+        limit = request.GET.get('limit', '')
+        per_page = min(int(limit), self.max_per_page) if limit.isdigit() and int(limit) > 0 else self.per_page
+        students = Student.objects.filter(department_id=request.GET['department_id'])
+        query = request.GET.get('q', '').strip()
+        if query:
+            students = students.filter(Q(studKey__istartswith=query) | Q(name__istartswith=query))
+
+        paginator = KeysetPaginator(students.values('studId', 'studKey', 'name'), ['studKey'], per_page)
+        try:
+            page = paginator.page(request.GET.get('cursor'))
+        except InvalidCursor:
+            return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+        response = JsonResponse({
+            'students': [
+                {'id': row['studId'], 'name': row['name'], 'studKey': row['studKey']}
+                for row in page
+            ],
+            'next': page.next_cursor,
+        })
+        # Cacheable, but always revalidated against the roster version
+        patch_cache_control(response, no_cache=True)
+        return response
+
 # Authentication Views
 class CustomLoginView(View):
     def get(self, request):
-        # Auto-initialize system on first visit
-        initialize_system()
-        
         # Fix: Check if user attribute exists
         if hasattr(request, 'user') and request.user.is_authenticated:
             return redirect('dashboard')
@@ -118,43 +182,74 @@ class DashboardView(View):
     @method_decorator(login_required)
     def get(self, request):
         if request.user.is_staff:
-            # Admin dashboard
+            # Admin dashboard - counts come from the signal-maintained counters in one query
+            today = dashboard.today()
+            sessions_today = CounterService.daily('sessions', today)
+            marked_today = CounterService.daily('marked', today)
+            counts = CounterService.read([
+                'students', 'teachers', 'classes', 'subjects', sessions_today, marked_today,
+            ])
             context = {
-                'students_count': Student.objects.count(),
-                'teachers_count': Teacher.objects.count(),
-                'classes_count': Classroom.objects.count(),
-                'subjects_count': Subject.objects.count(),
+                'students_count': counts['students'],
+                'teachers_count': counts['teachers'],
+                'classes_count': counts['classes'],
+                'subjects_count': counts['subjects'],
+                'sessions_today_count': counts[sessions_today],
+                'marked_today_count': counts[marked_today],
             }
             return render(request, 'attendance/dashboard_admin.html', context)
         else:
-            # Teacher dashboard - Show today's sessions that haven't ended yet
-            try:
-                teacher = Teacher.objects.get(user=request.user)
-                today = timezone.now().date()
-                current_time = timezone.now().time()
-    
-                # Show sessions for today that haven't ended yet
-                active_sessions = AttendanceSession.objects.filter(
-                classroom__teacher=teacher,
-                date=today,
-                endTime__gte=current_time,  # Only sessions that haven't ended
-                is_active=True
-                ).order_by('startTime')
-    
-                context = {
-                'sessions': active_sessions,
-                'teacher': teacher,
-                    }
-                return render(request, 'attendance/dashboard_teacher.html', context)
-            except Teacher.DoesNotExist:
+            # Teacher dashboard - Show today's sessions that haven't ended yet.
+            # The day's schedule is cached per teacher; ended sessions are dropped here
+            schedule = dashboard.get_schedule(request.user)
+            if schedule is None:
                 return redirect('logout')
-                
+            return render(request, 'attendance/dashboard_teacher.html', {
+                'sessions': dashboard.open_sessions(schedule),
+            })
 
 # CRUD Views for Admin
-class StudentListView(AdminRequiredMixin, View):
+class StudentListView(AdminRequiredMixin, KeysetListMixin, View):
+    filter_params = ('department_id',)
+
     def get(self, request):
+        filters = self.get_filters(request)
         students = Student.objects.all()
-        return render(request, 'attendance/student_list.html', {'students': students})
+        if filters['department_id'].isdigit():
+            students = students.filter(department_id=filters['department_id'])
+        page = self.paginate(request, students, ['studKey'])
+        context = self.list_context(request, page, filters)
+        context['students'] = page
+        return render(request, 'attendance/student_list.html', context)
+
+class StudentAttendanceView(AdminRequiredMixin, View):
+    """Attendance of one student in each of their classes and overall"""
+
+    def get(self, request, pk):
+        student = get_object_or_404(Student.objects.select_related('department'), pk=pk)
+        history = profiles.get_histories([student.pk])[student.pk]
+        return render(request, 'attendance/student_attendance.html', {'student': student, 'history': history})
+
+class StudentHistoryAPIView(AdminRequiredMixin, View):
+    """Attendance histories of a batch of students: ?student_id=1&student_id=2..."""
+    MAX_STUDENTS = 200
+
+    def get(self, request):
+        try:
+            student_ids = [int(value) for value in request.GET.getlist('student_id')]
+        except ValueError:
+            return JsonResponse({'error': "student_id must be an integer"}, status=400)
+        if len(student_ids) > self.MAX_STUDENTS:
+            return JsonResponse({'error': f"At most {self.MAX_STUDENTS} students per request"}, status=400)
+
+        students = Student.objects.filter(pk__in=student_ids).order_by('studKey').values_list(
+            'studId', 'studKey', 'name'
+        )
+        histories = profiles.get_histories([student_id for student_id, _, _ in students])
+        return JsonResponse({'students': [
+            {'studKey': stud_key, 'name': name, **histories[student_id]}
+            for student_id, stud_key, name in students
+        ]})
 
 class StudentCreateView(AdminRequiredMixin, View):
     def get(self, request):
@@ -168,6 +263,37 @@ class StudentCreateView(AdminRequiredMixin, View):
             return redirect('student-list')
         return render(request, 'attendance/student_form.html', {'form': form})
 
+class StudentImportView(AdminRequiredMixin, View):
+    # Errors listed on the page; the full report is available from the import_students command
+    MAX_ERRORS_SHOWN = 500
+
+    def get(self, request):
+        form = StudentImportForm()
+        return render(request, 'attendance/student_import.html', {'form': form})
+
+    def post(self, request):
+        form = StudentImportForm(request.POST, request.FILES)
+        if not form.is_valid():
+            return render(request, 'attendance/student_import.html', {'form': form})
+
+        upload = form.cleaned_data['file']
+        importer = StudentImporter(
+            update_existing=form.cleaned_data['update_existing'],
+            classroom=form.cleaned_data['classroom'],
+        )
+        try:
+            result = importer.run(read_rows(upload, upload.name))
+        except (ValueError, UnicodeDecodeError) as e:
+            return render(request, 'attendance/student_import.html', {
+                'form': form,
+                'error': f"Could not read file: {e}",
+            })
+        return render(request, 'attendance/student_import.html', {
+            'form': StudentImportForm(),
+            'result': result,
+            'errors': result.errors[:self.MAX_ERRORS_SHOWN],
+        })
+
 class StudentUpdateView(AdminRequiredMixin, View):
     def get(self, request, pk):
         student = get_object_or_404(Student, pk=pk)
@@ -188,10 +314,18 @@ class StudentDeleteView(AdminRequiredMixin, View):
         student.delete()
         return redirect('student-list')
 
-class TeacherListView(AdminRequiredMixin, View):
+class TeacherListView(AdminRequiredMixin, KeysetListMixin, View):
+    filter_params = ('department_id',)
+
     def get(self, request):
-        teachers = Teacher.objects.all()
-        return render(request, 'attendance/teacher_list.html', {'teachers': teachers})
+        filters = self.get_filters(request)
+        teachers = Teacher.objects.select_related('user', 'department')
+        if filters['department_id'].isdigit():
+            teachers = teachers.filter(department_id=filters['department_id'])
+        page = self.paginate(request, teachers, ['id'])
+        context = self.list_context(request, page, filters)
+        context['teachers'] = page
+        return render(request, 'attendance/teacher_list.html', context)
 
 class TeacherCreateView(AdminRequiredMixin, View):
     def get(self, request):
@@ -269,7 +403,7 @@ class DepartmentDeleteView(AdminRequiredMixin, View):
 
 class SubjectListView(AdminRequiredMixin, View):
     def get(self, request):
-        subjects = Subject.objects.all()
+        subjects = Subject.objects.select_related('department')
         return render(request, 'attendance/subject_list.html', {'subjects': subjects})
 
 class SubjectCreateView(AdminRequiredMixin, View):
@@ -304,10 +438,20 @@ class SubjectDeleteView(AdminRequiredMixin, View):
         subject.delete()
         return redirect('subject-list')
 
-class ClassroomListView(AdminRequiredMixin, View):
+class ClassroomListView(AdminRequiredMixin, KeysetListMixin, View):
+    filter_params = ('department_id',)
+
     def get(self, request):
-        classes = Classroom.objects.all()
-        return render(request, 'attendance/class_list.html', {'classes': classes})
+        filters = self.get_filters(request)
+        classes = Classroom.objects.select_related('teacher__user', 'subject').annotate(
+            student_count=Count('students')
+        )
+        if filters['department_id'].isdigit():
+            classes = classes.filter(department_id=filters['department_id'])
+        page = self.paginate(request, classes, ['className', 'classId'])
+        context = self.list_context(request, page, filters)
+        context['classes'] = page
+        return render(request, 'attendance/class_list.html', context)
 
 class ClassroomCreateView(AdminRequiredMixin, View):
     def get(self, request):
@@ -317,7 +461,9 @@ class ClassroomCreateView(AdminRequiredMixin, View):
     def post(self, request):
         form = ClassroomForm(request.POST)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                classroom = form.save()
+                SummaryService.sync_classroom(classroom)
             return redirect('class-list')
         return render(request, 'attendance/class_form.html', {'form': form})
 
@@ -331,7 +477,9 @@ class ClassroomUpdateView(AdminRequiredMixin, View):
         classroom = get_object_or_404(Classroom, pk=pk)
         form = ClassroomForm(request.POST, instance=classroom)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                form.save()
+                SummaryService.sync_classroom(classroom)
             return redirect('class-list')
         return render(request, 'attendance/class_form.html', {'form': form})
 
@@ -341,10 +489,41 @@ class ClassroomDeleteView(AdminRequiredMixin, View):
         classroom.delete()
         return redirect('class-list')
 
-class AttendanceSessionListView(AdminRequiredMixin, View):
+class AttendanceSessionListView(AdminRequiredMixin, KeysetListMixin, View):
+    filter_params = ('class_id', 'department_id', 'date_from', 'date_to', 'sort')
+    # Sort options map to orderings backed by the (date, startTime, sessionId) index
+    SORTS = {
+        '-date': ['-date', '-startTime', '-sessionId'],
+        'date': ['date', 'startTime', 'sessionId'],
+    }
+
     def get(self, request):
-        sessions = AttendanceSession.objects.all()
-        return render(request, 'attendance/session_list.html', {'sessions': sessions})
+        filters = self.get_filters(request)
+        sessions = AttendanceSession.objects.select_related('classroom')
+        if filters['class_id'].isdigit():
+            sessions = sessions.filter(classroom_id=filters['class_id'])
+        if filters['department_id'].isdigit():
+            sessions = sessions.filter(classroom__department_id=filters['department_id'])
+        try:
+            date_from = parse_date(filters['date_from']) if filters['date_from'] else None
+        except ValueError:
+            # Well-formed but impossible dates (e.g. 2025-02-30) are ignored like malformed ones
+            date_from = None
+        try:
+            date_to = parse_date(filters['date_to']) if filters['date_to'] else None
+        except ValueError:
+            date_to = None
+        if date_from:
+            sessions = sessions.filter(date__gte=date_from)
+        if date_to:
+            sessions = sessions.filter(date__lte=date_to)
+        ordering = self.SORTS.get(filters['sort'], self.SORTS['-date'])
+
+        page = self.paginate(request, sessions, ordering)
+        context = self.list_context(request, page, filters)
+        context['sessions'] = page
+        context['classes'] = Classroom.objects.order_by('className')
+        return render(request, 'attendance/session_list.html', context)
 
 class AttendanceSessionCreateView(AdminRequiredMixin, View):
     def get(self, request):
@@ -354,10 +533,49 @@ class AttendanceSessionCreateView(AdminRequiredMixin, View):
     def post(self, request):
         form = AttendanceSessionForm(request.POST)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                session = form.save()
+                SummaryService.session_created(session)
             return redirect('session-list')
         return render(request, 'attendance/session_form.html', {'form': form})
 
+class SessionTimetableView(AdminRequiredMixin, View):
+    def get(self, request):
+        form = TimetableForm()
+        return render(request, 'attendance/session_timetable.html', {'form': form})
+    
+    def post(self, request):
+        form = TimetableForm(request.POST)
+        if not form.is_valid():
+            return render(request, 'attendance/session_timetable.html', {'form': form})
+
+        data = form.cleaned_data
+        rule = RecurrenceRule(
+            weekdays=data['weekdays'],
+            start_time=data['start_time'],
+            end_time=data['end_time'],
+            start_date=data['start_date'],
+            end_date=data['end_date'],
+            holidays=data['holidays'],
+        )
+        try:
+            plans = plan_timetable(data['classrooms'], rule)
+        except ValidationError as e:
+            form.add_error(None, e)
+            return render(request, 'attendance/session_timetable.html', {'form': form})
+
+        if 'preview' in request.POST:
+            return render(request, 'attendance/session_timetable.html', {
+                'form': form,
+                'plans': plans,
+                'planned_count': sum(len(plan.sessions) for plan in plans),
+            })
+
+        created = create_timetable(plans)
+        clashes = sum(len(plan.clashes) for plan in plans)
+        messages.success(request, f"Created {created} session(s); skipped {clashes} clashing slot(s).")
+        return redirect('session-list')
+
 class AttendanceSessionUpdateView(AdminRequiredMixin, View):
     def get(self, request, pk):
         session = get_object_or_404(AttendanceSession, pk=pk)
@@ -366,22 +584,30 @@ class AttendanceSessionUpdateView(AdminRequiredMixin, View):
     
     def post(self, request, pk):
         session = get_object_or_404(AttendanceSession, pk=pk)
+        previous_classroom = session.classroom
         form = AttendanceSessionForm(request.POST, instance=session)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                session = form.save()
+                # Moving a session to another class changes the totals of both classes
+                if session.classroom_id != previous_classroom.classId:
+                    SummaryService.sync_classroom(previous_classroom)
+                    SummaryService.sync_classroom(session.classroom)
             return redirect('session-list')
         return render(request, 'attendance/session_form.html', {'form': form})
 
 class AttendanceSessionDeleteView(AdminRequiredMixin, View):
     def post(self, request, pk):
         session = get_object_or_404(AttendanceSession, pk=pk)
-        session.delete()
+        with transaction.atomic():
+            SummaryService.session_deleted(session)
+            session.delete()
         return redirect('session-list')
 
 # Teacher Views
 class MarkAttendanceView(TeacherRequiredMixin, View):
     def get(self, request, session_id):
-        session = get_object_or_404(AttendanceSession, pk=session_id)
+        session = get_object_or_404(AttendanceSession.objects.select_related('classroom__subject'), pk=session_id)
     
     # Check if session is still active (today and hasn't ended)
         if not session.is_current():
@@ -389,20 +615,18 @@ class MarkAttendanceView(TeacherRequiredMixin, View):
             'error': 'This attendance session has ended. Attendance can only be marked during the session time.'
             })
     
-    # Rest of the code remains same...
-        students = session.classroom.students.all()
-        existing_records = AttendanceRecord.objects.filter(session=session)
-        present_students = [record.student.studId for record in existing_records if record.status]
+        students = session.classroom.students.only('studId', 'studKey', 'name')
+        # student id -> status, so each row is a dict lookup instead of a list scan
+        statuses = dict(AttendanceRecord.objects.filter(session=session).values_list('student_id', 'status'))
     
         context = {
         'session': session,
-        'students': students,
-        'present_students': present_students,
+        'rows': [(student, statuses.get(student.studId, False)) for student in students],
         }
         return render(request, 'attendance/mark_attendance.html', context)
 
     def post(self, request, session_id):
-        session = get_object_or_404(AttendanceSession, pk=session_id)
+        session = get_object_or_404(AttendanceSession.objects.select_related('classroom__subject'), pk=session_id)
     
     # Check if session is still active (today and hasn't ended)
         if not session.is_current():
@@ -419,29 +643,136 @@ class MarkAttendanceView(TeacherRequiredMixin, View):
         # session.save()  # REMOVE THIS LINE
             return redirect('dashboard')
         else:
-            students = session.classroom.students.all()
+            students = session.classroom.students.only('studId', 'studKey', 'name')
+            present = set(present_student_ids)
             return render(request, 'attendance/mark_attendance.html', {
             'error': message, 
             'session': session,
-            'students': students,
-            'present_students': present_student_ids
+            'rows': [(student, student.studId in present) for student in students],
             })
 
+class MarkAttendanceChangesView(TeacherRequiredMixin, View):
+    """
+    JSON endpoint behind the mark attendance page: the page posts each toggle
+    as {"present": [student ids], "absent": [student ids]} and only those
+    records are written.
+    """
+    def post(self, request, session_id):
+        session = get_object_or_404(AttendanceSession, pk=session_id)
+        if not session.is_current():
+            return JsonResponse({'error': 'This attendance session has ended.'}, status=409)
+
+        try:
+            payload = json.loads(request.body)
+            # A string or object would be iterated character by character or key by key
+            if not isinstance(payload.get('present', []), list) or not isinstance(payload.get('absent', []), list):
+                raise TypeError()
+            present_ids = [int(student_id) for student_id in payload.get('present', [])]
+            absent_ids = [int(student_id) for student_id in payload.get('absent', [])]
+        except (ValueError, TypeError, AttributeError):
+            return JsonResponse({'error': 'Expected {"present": [ids], "absent": [ids]}'}, status=400)
+
+        try:
+            counts = AttendanceService.apply_changes(session, present_ids, absent_ids)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        return JsonResponse(counts)
+
+class AttendanceSyncView(TeacherRequiredMixin, View):
+    """
+    Batch upload from devices that marked attendance offline:
+    {"entries": [...]} with entries as described in SyncService. Every
+    entry gets its own outcome; one bad entry does not fail the others.
+
+    Sync uses the teacher's browser session and stays CSRF protected, since
+    a session cookie alone would let any site post attendance. A device
+    coming back online first GETs this URL, which returns the current CSRF
+    token (and sets the csrftoken cookie), and sends it as X-CSRFToken
+    with the queued entries. Without a logged-in session both requests are
+    redirected to the login page.
+    """
+    MAX_ENTRIES = 200
+
+    def get(self, request):
+        return JsonResponse({'csrfToken': get_token(request)})
+
+    def post(self, request):
+        try:
+            entries = json.loads(request.body)['entries']
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse({'error': 'Expected {"entries": [...]}'}, status=400)
+        if not isinstance(entries, list):
+            return JsonResponse({'error': 'entries must be a list'}, status=400)
+        if len(entries) > self.MAX_ENTRIES:
+            return JsonResponse({'error': f'At most {self.MAX_ENTRIES} entries per request'}, status=400)
+
+        return JsonResponse({'results': SyncService.sync(request.user, entries)})
+
 # Report Views
 class ReportDashboardView(AdminRequiredMixin, View):
     def get(self, request):
-        classes = Classroom.objects.all()
-        sessions = AttendanceSession.objects.all()
+        classes = Classroom.objects.select_related('subject')
+        sessions = AttendanceSession.objects.select_related('classroom')
         return render(request, 'attendance/report_dashboard.html', {
             'classes': classes,
-            'sessions': sessions
+            'sessions': sessions,
+            'departments': Department.objects.all(),
         })
 
+def enqueued_response(request, job):
+    """Answer an enqueue-mode report request: job URLs for API clients, the job page for browsers"""
+    if 'application/json' in request.headers.get('Accept', ''):
+        return JsonResponse({
+            'job_id': job.jobId,
+            'status_url': reverse('report-job-status', args=[job.jobId]),
+            'download_url': reverse('report-job-download', args=[job.jobId]),
+        }, status=202)
+    return redirect('report-job', pk=job.jobId)
+
+def report_job_state(job):
+    return {
+        'job_id': job.jobId,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'error': job.error,
+        'download_url': reverse('report-job-download', args=[job.jobId]) if job.status == 'done' else None,
+    }
+
+class ReportJobView(AdminRequiredMixin, View):
+    def get(self, request, pk):
+        job = get_object_or_404(ReportJob, pk=pk)
+        return render(request, 'attendance/report_job.html', {'job': job, 'state': report_job_state(job)})
+
+class ReportJobStatusView(AdminRequiredMixin, View):
+    def get(self, request, pk):
+        job = get_object_or_404(ReportJob, pk=pk)
+        response = JsonResponse(report_job_state(job))
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+class ReportJobDownloadView(AdminRequiredMixin, View):
+    def get(self, request, pk):
+        job = get_object_or_404(ReportJob, pk=pk, status='done')
+        try:
+            result = open(jobs.result_path(job), 'rb')
+        except FileNotFoundError:
+            raise Http404("The report file has expired")
+        return FileResponse(
+            result, as_attachment=True, filename=job.downloadName, content_type=jobs.content_type(job)
+        )
+
 class DefaulterReportView(AdminRequiredMixin, View):
     def get(self, request):
         class_id = request.GET.get('class_id')
         threshold = float(request.GET.get('threshold', 75.0))
         
+        if class_id and request.GET.get('mode') == 'enqueue':
+            get_object_or_404(Classroom, pk=class_id)
+            return enqueued_response(request, jobs.enqueue(
+                'defaulters', {'class_id': int(class_id), 'threshold': threshold}, request.user
+            ))
+
         if class_id:
             classroom, defaulters = ReportGenerator.get_defaulter_list(class_id, threshold)
             return render(request, 'attendance/defaulter_report.html', {
@@ -452,14 +783,188 @@ class DefaulterReportView(AdminRequiredMixin, View):
         
         return redirect('report-dashboard')
 
+class AttendanceTrendView(AdminRequiredMixin, View):
+    """Weekly or monthly attendance-rate series as JSON, read from the precomputed buckets"""
+
+    def get(self, request):
+        since = request.GET.get('since')
+        if since:
+            try:
+                since = parse_date(since)
+            except ValueError:
+                # Well formed but not a real date, e.g. 2025-02-30
+                since = None
+            if since is None:
+                return JsonResponse({'error': "since must be a date (YYYY-MM-DD)"}, status=400)
+        try:
+            series = trends.series(
+                period=request.GET.get('period', 'week'),
+                group=request.GET.get('group', 'department'),
+                since=since or None,
+                department_id=request.GET.get('department_id') or None,
+            )
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        return JsonResponse({'series': series})
+
+class ClassroomAnalyticsView(AdminRequiredMixin, View):
+    """Attendance analytics of a class as JSON; ?correlation=1 adds the session correlation matrix"""
+
+    def get(self, request):
+        class_id = request.GET.get('class_id', '')
+        if not class_id.isdigit():
+            return JsonResponse({'error': "class_id must be a class ID"}, status=400)
+        classroom = get_object_or_404(Classroom, pk=class_id)
+        matrix = analytics.get_matrix(classroom)
+        names = {
+            student_id: (stud_key, name)
+            for student_id, stud_key, name in Student.objects.filter(
+                pk__in=matrix.student_ids.tolist()
+            ).values_list('studId', 'studKey', 'name')
+        }
+        recent = matrix.recent_rates()
+        recent = None if recent is None else recent.tolist()
+        students = [
+            {
+                'studId': student_id,
+                'studKey': names[student_id][0],
+                'name': names[student_id][1],
+                'present': present,
+                'percentage': percentage,
+                'longestAbsenceStreak': streak,
+                'recentPercentage': None if recent is None else round(recent[index], 2),
+            }
+            for index, (student_id, present, percentage, streak) in enumerate(zip(
+                matrix.student_ids.tolist(), matrix.present_counts().tolist(),
+                matrix.percentages().tolist(), matrix.longest_absence_streaks().tolist(),
+            ))
+        ]
+        sessions = [
+            {'sessionId': session_id, 'date': str(day), 'turnout': round(turnout, 2)}
+            for session_id, day, turnout in zip(
+                matrix.session_ids.tolist(), matrix.dates.tolist(), matrix.turnout().tolist()
+            )
+        ]
+        data = {'classId': classroom.classId, 'held': matrix.held, 'students': students, 'sessions': sessions}
+        if request.GET.get('correlation') == '1':
+            # JSON has no NaN; sessions without variance come out as null
+            data['correlation'] = [
+                [None if value != value else round(value, 4) for value in row]
+                for row in matrix.session_correlation().tolist()
+            ]
+        return JsonResponse(data)
+
+class ProjectionReportView(AdminRequiredMixin, View):
+    """End-of-term projection for a department; at-risk students only unless ?all=1"""
+
+    def get(self, request):
+        department_id = request.GET.get('department_id')
+        if not department_id:
+            return redirect('report-dashboard')
+        if not department_id.isdigit():
+            return HttpResponseBadRequest("Invalid department_id")
+        try:
+            threshold = float(request.GET.get('threshold', 75.0))
+        except ValueError:
+            threshold = None
+        # Also rejects nan and inf, which float() accepts
+        if threshold is None or not 0 <= threshold <= 100:
+            return HttpResponseBadRequest("Invalid threshold, expected a percentage between 0 and 100")
+
+        department, classes = ReportGenerator.get_projection(department_id, threshold)
+        if department is None:
+            raise Http404("Department not found")
+        show_all = request.GET.get('all') == '1'
+        students = [student for classroom in classes for student in classroom['students']]
+        if not show_all:
+            # At risk: not yet sure to finish at or above the threshold
+            for classroom in classes:
+                classroom['students'] = [student for student in classroom['students'] if student['needed'] > 0]
+            classes = [classroom for classroom in classes if classroom['students']]
+        return render(request, 'attendance/projection_report.html', {
+            'department': department,
+            'classes': classes,
+            'threshold': threshold,
+            'show_all': show_all,
+            'at_risk_count': sum(1 for student in students if student['needed'] > 0),
+            'unreachable_count': sum(1 for student in students if not student['reachable']),
+        })
+
 class AttendancePDFView(AdminRequiredMixin, View):
     def get(self, request):
         session_id = request.GET.get('session_id')
         if session_id:
-            pdf_buffer = ReportGenerator.generate_attendance_pdf_for_session(session_id)
-            if pdf_buffer:
-                response = HttpResponse(pdf_buffer, content_type='application/pdf')
+            session = AttendanceSession.objects.select_related('classroom__subject', 'archive').filter(
+                pk=session_id
+            ).first()
+            if session and request.GET.get('mode') == 'enqueue':
+                return enqueued_response(request, jobs.enqueue(
+                    'session_pdf', {'session_id': session.pk}, request.user
+                ))
+            if session:
+                # The fingerprint doubles as ETag, so unchanged reports are answered with a 304
+                fingerprint = session_fingerprint(session)
+                etag = f'"{fingerprint}"'
+                not_modified = get_conditional_response(request, etag=etag)
+                if not_modified is not None:
+                    return not_modified
+
+                pdf_bytes = ReportGenerator.get_cached_attendance_pdf(session, fingerprint)
+                response = HttpResponse(pdf_bytes, content_type='application/pdf')
                 response['Content-Disposition'] = 'attachment; filename="attendance_report.pdf"'
+                response['ETag'] = etag
+                patch_cache_control(response, private=True, no_cache=True)
                 return response
         
-        return redirect('report-dashboard')
\ No newline at end of file
+        return redirect('report-dashboard')
+
+class PDFCacheStatsView(AdminRequiredMixin, View):
+    def get(self, request):
+        return JsonResponse(get_pdf_cache().stats())
+
+class AttendanceRegisterPDFView(AdminRequiredMixin, View):
+    def get(self, request):
+        class_id = request.GET.get('class_id')
+        if class_id:
+            classroom = get_object_or_404(Classroom.objects.select_related('subject'), pk=class_id)
+            if request.GET.get('mode') == 'enqueue':
+                return enqueued_response(request, jobs.enqueue(
+                    'register_pdf', {'class_id': classroom.classId}, request.user
+                ))
+            # Pages are sent as they are drawn so large registers never sit in memory
+            response = StreamingHttpResponse(
+                ReportGenerator.stream_register_pdf(classroom), content_type='application/pdf'
+            )
+            response['Content-Disposition'] = f'attachment; filename="attendance_register_{classroom.classId}.pdf"'
+            return response
+
+        return redirect('report-dashboard')
+
+class AttendanceExportView(AdminRequiredMixin, View):
+    def get(self, request):
+        filters = {}
+        for param in ('date_from', 'date_to'):
+            value = request.GET.get(param)
+            if value:
+                try:
+                    filters[param] = parse_date(value)
+                except ValueError:
+                    # Well formed but not a real date, e.g. 2025-02-30
+                    filters[param] = None
+                if filters[param] is None:
+                    return HttpResponseBadRequest(f"Invalid {param}, expected YYYY-MM-DD")
+        for param, key in (('department_id', 'department_id'), ('class_id', 'classroom_id')):
+            value = request.GET.get(param)
+            if value:
+                if not value.isdigit():
+                    return HttpResponseBadRequest(f"Invalid {param}")
+                filters[key] = int(value)
+
+        chunks = iter_csv(export_rows(**filters))
+        if request.GET.get('gzip'):
+            response = StreamingHttpResponse(gzip_stream(chunks), content_type='application/gzip')
+            response['Content-Disposition'] = 'attachment; filename="attendance_export.csv.gz"'
+        else:
+            response = StreamingHttpResponse(chunks, content_type='text/csv')
+            response['Content-Disposition'] = 'attachment; filename="attendance_export.csv"'
+        return response
\ No newline at end of file
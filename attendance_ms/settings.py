@@ -60,6 +60,15 @@ DATABASES = {
     }
 }
 
+# Local memory by default. With several worker processes use a shared backend
+# (file based, memcached, redis) so cache invalidations reach every worker.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', ''),
+    }
+}
+
 # Render PostgreSQL database - FIXED VERSION
 if 'RENDER' in os.environ:
     import dj_database_url
@@ -70,6 +79,12 @@ if 'RENDER' in os.environ:
             conn_max_age=600,
             ssl_require=True
         )
+    # gunicorn workers share the file cache on the instance
+    if 'DJANGO_CACHE_BACKEND' not in os.environ:
+        CACHES['default'] = {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(BASE_DIR, 'cache', 'django'),
+        }
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -98,6 +113,32 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache alias and lifetime of the per-teacher dashboard schedule
+ATTENDANCE_DASHBOARD_CACHE = 'default'
+ATTENDANCE_DASHBOARD_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Cache alias and lifetime of the per-class attendance matrices (analytics.py)
+ATTENDANCE_ANALYTICS_CACHE = 'default'
+ATTENDANCE_ANALYTICS_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Cache alias and lifetime of the per-student attendance histories (profiles.py)
+ATTENDANCE_PROFILE_CACHE = 'default'
+ATTENDANCE_PROFILE_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Rendered session PDFs are cached on local disk and evicted LRU beyond this size
+ATTENDANCE_PDF_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'pdf')
+ATTENDANCE_PDF_CACHE_MAX_BYTES = 100 * 1024 * 1024
+
+# Background report jobs (run_report_worker): result files and how long they are kept
+ATTENDANCE_REPORT_JOB_DIR = os.path.join(BASE_DIR, 'cache', 'jobs')
+ATTENDANCE_REPORT_JOB_TTL = 24 * 60 * 60
+
+# Session sweeper (sweep_sessions): run_report_worker also runs it every
+# INTERVAL seconds (None disables), marking unsubmitted sessions absent if MARK_ABSENT
+ATTENDANCE_SESSION_SWEEP_INTERVAL = 15 * 60
+ATTENDANCE_SESSION_SWEEP_BATCH_SIZE = 1000
+ATTENDANCE_SESSION_SWEEP_MARK_ABSENT = False
+
 LOGIN_REDIRECT_URL = '/dashboard/'
 LOGIN_URL = '/login/'
 LOGOUT_REDIRECT_URL = '/login/'
\ No newline at end of file
@@ -9,4 +9,7 @@ pip install -r requirements.txt
 python manage.py collectstatic --no-input
 
 # Run migrations
-python manage.py migrate
\ No newline at end of file
+python manage.py migrate
+
+# Create the admin account and default data if missing
+python manage.py bootstrap_system
\ No newline at end of file